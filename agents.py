@@ -0,0 +1,733 @@
+from gamemanager import GameManager
+from gamestate import GameState
+from evbot import EVBot
+from legcache import LegCache
+from compactboard import count_leg_outcomes, count_leg_scenarios
+from rng import GameRNG
+from collections import deque
+from math import log, sqrt
+import sys
+import time
+
+
+class Agent:
+    """
+    A player that chooses its own actions. Subclasses implement choose.
+    """
+
+    def choose(self, game: GameManager) -> tuple:
+        """
+        Chooses an action for the current player.
+
+        Args:
+            game (GameManager): The game, which must not be changed.
+
+        Returns:
+            tuple: One of game.legal_actions().
+        """
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """
+        Reports how much work the agent has done.
+
+        Returns:
+            dict: Agent-specific statistics, empty by default.
+        """
+        return {}
+
+
+class RollAgent(Agent):
+    """
+    An agent that always rolls.
+    """
+
+    def choose(self, game: GameManager) -> tuple:
+        return ("R",)
+
+
+class RandomAgent(Agent):
+    """
+    An agent that rolls or bets at random and never pays for hints.
+    """
+
+    def __init__(self, seed=None):
+        """
+        Initializes the agent.
+
+        Args:
+            seed: The seed for its choices, or None to seed from the system.
+        """
+        self.rng = GameRNG(seed)
+
+    def choose(self, game: GameManager) -> tuple:
+        actions = [action for action in game.legal_actions() if action != ("H",)]
+        return self.rng.choice(actions)
+
+
+class EVAgent(Agent):
+    """
+    An agent that bets on the camel with the best EV by EVBot's odds when that EV beats a threshold, and otherwise
+    rolls. With the default threshold of 1, the coin for rolling, it follows EVBot's advice.
+
+    With two_ply set, it follows EVBot.evaluate_two_ply instead, which allows for the opponent's reply.
+    """
+
+    def __init__(
+        self,
+        cache: LegCache = None,
+        threshold: float = 1.0,
+        two_ply: bool = False,
+        memo_size: int = 1_000_000,
+    ):
+        """
+        Initializes the agent.
+
+        Args:
+            cache (LegCache): The cache of leg outcomes to use. Defaults to the cache shared by every EVBot.
+            threshold (float): The EV a bet must beat.
+            two_ply (bool): Whether to look at the opponent's reply.
+            memo_size (int): The number of leg subtrees the two-ply evaluation keeps counts for before starting over.
+                The counts are also dropped when the track or die changes.
+        """
+        self.cache = cache
+        self.threshold = threshold
+        self.two_ply = two_ply
+        self.memo = {}
+        self.memo_size = memo_size
+        self.race = None
+
+    def choose(self, game: GameManager) -> tuple:
+        if self.two_ply:
+            if len(self.memo) > self.memo_size or game.rules.race != self.race:
+                self.race = game.rules.race
+                self.memo.clear()
+            result = EVBot(game, self.cache).evaluate_two_ply(self.memo)
+            return ("B", result.color) if result.action == "B" else ("R",)
+        result = EVBot(game, self.cache).evaluate()
+        camels = [camel for camel in result.camels if camel.bet_available]
+        best = max(camels, key=lambda camel: camel.ev, default=None)
+        if best is not None and best.ev > self.threshold:
+            return ("B", best.color)
+        return ("R",)
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside ExpectimaxAgent.search when the time for a move runs out.
+    """
+
+
+class TranspositionTable:
+    """
+    A fixed-size table of searched positions for ExpectimaxAgent.
+
+    Each position is reduced to one hash of the fields that change during a game (see key), and that hash picks its
+    slot. A slot keeps the hash beside the entry so a different position landing there reads as a miss, and storing
+    always replaces what was there.
+    """
+
+    def __init__(self, size: int):
+        """
+        Initializes an empty table.
+
+        Args:
+            size (int): The number of slots.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.slots = [None] * size
+        self.filled = 0
+
+    def __len__(self) -> int:
+        return self.filled
+
+    @staticmethod
+    def key(state: GameState) -> int:
+        """
+        Hashes the parts of a position that change during a game. The colors, track, die and ticket values are the
+        same for every position of a game, so they are left out.
+
+        Args:
+            state (GameState): The position.
+
+        Returns:
+            int: The hash.
+        """
+        return hash(
+            (
+                state.board,
+                state.dice,
+                state.tickets,
+                state.coins,
+                state.bets,
+                state.turn,
+            )
+        )
+
+    def get(self, key: int) -> tuple:
+        """
+        Looks up a position.
+
+        Args:
+            key (int): The position's hash, from key.
+
+        Returns:
+            tuple: The stored (depth, value, action), or None on a miss.
+        """
+        slot = self.slots[key % self.size]
+        return slot[1] if slot is not None and slot[0] == key else None
+
+    def put(self, key: int, entry: tuple) -> None:
+        """
+        Stores a position, replacing whatever held its slot.
+
+        Args:
+            key (int): The position's hash, from key.
+            entry (tuple): The (depth, value, action) to store.
+        """
+        index = key % self.size
+        if self.slots[index] is None:
+            self.filled += 1
+        self.slots[index] = (key, entry)
+
+    def clear(self) -> None:
+        """
+        Empties the table.
+        """
+        self.slots = [None] * self.size
+        self.filled = 0
+
+
+class ExpectimaxAgent(Agent):
+    """
+    An agent that searches a few turns ahead with depth-limited expectimax.
+
+    Decision nodes try rolling and betting on every camel with tickets left. Hints are left out, since they only
+    cost the player a coin. A roll is a chance node averaging over every die and face. Positions are valued as
+    player 1's coins minus player 2's, plus the expected payout of the bets both hold, from exact counts of the rest
+    of the leg that are shared between positions. Searched positions are kept in a TranspositionTable. The table
+    and the leg counts are emptied whenever the rules change, and the search deepens one turn at a time until the
+    time for the move runs out.
+    """
+
+    def __init__(
+        self,
+        time_limit: float = 1.0,
+        max_depth: int = 8,
+        table_size: int = 200_000,
+        memo_size: int = 1_000_000,
+    ):
+        """
+        Initializes the agent.
+
+        Args:
+            time_limit (float): The number of seconds to spend per move. The first depth is always searched.
+            max_depth (int): The deepest search, in turns.
+            table_size (int): The number of slots in the transposition table.
+            memo_size (int): The number of leg subtrees to keep counts for before starting over. The counts are also
+                dropped when the track or die changes.
+        """
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.table = TranspositionTable(table_size)
+        self.rules = None
+        self.memo = {}
+        self.memo_size = memo_size
+        self.deadline = None
+        self.nodes = self.probes = self.hits = 0
+        self.elapsed = 0.0
+        self.depths = []
+
+    def choose(self, game: GameManager) -> tuple:
+        state = GameState.from_game(game)
+        if state.rules != self.rules:
+            self.table.clear()
+            self.memo.clear()
+            self.rules = state.rules
+        start = time.perf_counter()
+        self.deadline = None
+        best = ("R",)
+        try:
+            for depth in range(1, self.max_depth + 1):
+                _, best = self.search(state, depth)
+                self.deadline = start + self.time_limit
+                reached = depth
+        except SearchTimeout:
+            pass
+        self.elapsed += time.perf_counter() - start
+        self.depths.append(reached)
+        return best
+
+    def search(self, state: GameState, depth: int) -> tuple[float, tuple]:
+        """
+        Values a position by expectimax to a fixed depth.
+
+        Args:
+            state (GameState): The position.
+            depth (int): The number of turns to look ahead.
+
+        Returns:
+            tuple[float, tuple]: The value to player 1 and the best action, or None at a leaf.
+
+        Raises:
+            SearchTimeout: If the deadline passes.
+        """
+        self.nodes += 1
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if state.over or depth == 0:
+            return self.evaluate(state), None
+        self.probes += 1
+        key = self.table.key(state)
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= depth:
+            self.hits += 1
+            return entry[1], entry[2]
+
+        maximize = state.turn == 0
+        best_value, best_action = None, None
+        for action in state.legal_actions():
+            if action == ("H",):
+                continue
+            if action == ("R",):
+                value = 0.0
+                for probability, outcome in state.roll_outcomes():
+                    value += (
+                        probability
+                        * self.search(state.with_action(outcome), depth - 1)[0]
+                    )
+            else:
+                value = self.search(state.with_action(action), depth - 1)[0]
+            if (
+                best_value is None
+                or (maximize and value > best_value)
+                or (not maximize and value < best_value)
+            ):
+                best_value, best_action = value, action
+        self.table.put(key, (depth, best_value, best_action))
+        return best_value, best_action
+
+    def evaluate(self, state: GameState) -> float:
+        """
+        Values a position without searching: the coin difference plus the expected payout of the bets held.
+
+        Args:
+            state (GameState): The position.
+
+        Returns:
+            float: The value to player 1.
+        """
+        if len(self.memo) > self.memo_size:
+            self.memo.clear()
+        payouts = state.expected_payouts(self.memo)
+        return state.coins[0] - state.coins[1] + payouts[0] - payouts[1]
+
+    def stats(self) -> dict:
+        """
+        Reports how the search has gone over every move so far.
+
+        Returns:
+            dict: The nodes searched, nodes per second, transposition table probes, hits, hit rate and size, and the
+                average depth completed per move.
+        """
+        return {
+            "nodes": self.nodes,
+            "nodes_per_second": self.nodes / self.elapsed if self.elapsed else 0.0,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "table_size": len(self.table),
+            "depth": sum(self.depths) / len(self.depths) if self.depths else 0.0,
+        }
+
+
+def bet_evs(state: GameState, memo: dict) -> list[float]:
+    """
+    Computes the expected payout of taking the top ticket on each camel from exact counts of the rest of the leg.
+
+    Args:
+        state (GameState): The position.
+        memo (dict): Counts of leg subtrees, shared between calls.
+
+    Returns:
+        list[float]: The EV per camel, or None for camels with no tickets left.
+    """
+    dice = tuple(c for c, roll in enumerate(state.dice) if roll == 0)
+    wins, seconds = count_leg_outcomes(
+        state.board, dice, state.faces, state.track_length, memo
+    )
+    total = count_leg_scenarios(len(dice), len(state.faces))
+    values = state.ticket_values
+    return [
+        (
+            (wins[c] * values[taken] + seconds[c] - (total - wins[c] - seconds[c]))
+            / total
+            if taken < len(values)
+            else None
+        )
+        for c, taken in enumerate(state.tickets)
+    ]
+
+
+class TreeNode:
+    """
+    A decision node of MCTSAgent's tree: a position where a player chooses an action.
+    """
+
+    __slots__ = ("state", "visits", "total", "children", "actions")
+
+    def __init__(self, state: GameState):
+        """
+        Initializes an unvisited node.
+
+        Args:
+            state (GameState): The position.
+        """
+        self.state = state
+        self.visits = 0
+        self.total = 0.0
+        self.children = {}
+        self.actions = None
+
+
+class ChanceNode:
+    """
+    A chance node of MCTSAgent's tree: a roll from a position, with one child per die and face drawn so far.
+    """
+
+    __slots__ = ("state", "visits", "total", "children")
+
+    def __init__(self, state: GameState):
+        """
+        Initializes an unvisited node.
+
+        Args:
+            state (GameState): The position the roll is made from.
+        """
+        self.state = state
+        self.visits = 0
+        self.total = 0.0
+        self.children = {}
+
+
+class MCTSAgent(Agent):
+    """
+    An agent that plays by Monte Carlo tree search.
+
+    Each iteration walks down the tree by UCT, drawing dice at chance nodes as Player.roll would, adds one node and
+    plays the game out to the end with a fast rollout policy. A game is worth 1 to player 1 for a win and 0 for a
+    loss or a tie, since ties go to player 2. Bets are added to a decision node one at a time, best placed camel
+    first, as the node's visits grow (progressive widening), so rolling is always tried first. Hints are never
+    searched since they change nothing in a GameState.
+
+    After each move the agent keeps the subtree of the action it chose, and the next move starts from the node for
+    the position actually reached, if the tree holds it.
+    """
+
+    def __init__(
+        self,
+        time_limit: float = 1.0,
+        iterations: int = None,
+        seed=None,
+        rollout: str = "ev",
+        exploration: float = 1.0,
+        widening: float = 0.5,
+        ev_dice: int = 2,
+        reuse_depth: int = 4,
+        memo_size: int = 1_000_000,
+    ):
+        """
+        Initializes the agent.
+
+        Args:
+            time_limit (float): The number of seconds to spend per move, or None for no time limit.
+            iterations (int): The number of iterations per move, or None for no limit. At least one of time_limit
+                and iterations must be set.
+            seed: The seed for dice draws and rollouts, or None to seed from the system.
+            rollout (str): "random" to play rollouts with random rolls and bets, or "ev" to bet on the camel with
+                the best EV once at most ev_dice dice are left in the leg, and otherwise roll.
+            exploration (float): The UCT exploration constant.
+            widening (float): The exponent of progressive widening: a node with n visits considers
+                1 + n ** widening actions.
+            ev_dice (int): The most dice left in a leg for which "ev" rollouts count the leg exactly.
+            reuse_depth (int): How many levels below the previous move to look for the position reached.
+            memo_size (int): The number of leg subtrees to keep counts for before starting over. The counts are also
+                dropped when the track or die changes.
+
+        Raises:
+            ValueError: If neither budget is set or the rollout policy is unknown.
+        """
+        if time_limit is None and iterations is None:
+            raise ValueError("MCTSAgent needs a time limit or an iteration budget")
+        if rollout not in ("random", "ev"):
+            raise ValueError(f"Unknown rollout policy {rollout!r}")
+        self.time_limit = time_limit
+        self.iterations = iterations
+        self.rng = GameRNG(seed)
+        self.rollout_policy = rollout
+        self.exploration = exploration
+        self.widening = widening
+        self.ev_dice = ev_dice
+        self.reuse_depth = reuse_depth
+        self.memo = {}
+        self.memo_size = memo_size
+        self.race = None
+        self.root = None
+        self.moves = self.reused = self.inherited = self.total_iterations = 0
+        self.elapsed = 0.0
+
+    def choose(self, game: GameManager) -> tuple:
+        state = GameState.from_game(game)
+        if state.rules.race != self.race:
+            self.memo.clear()
+            self.race = state.rules.race
+        root = self.find(state)
+        self.moves += 1
+        if root is None:
+            root = TreeNode(state)
+        else:
+            self.reused += 1
+            self.inherited += root.visits
+        start = time.perf_counter()
+        deadline = None if self.time_limit is None else start + self.time_limit
+        count = 0
+        while (self.iterations is None or count < self.iterations) and (
+            deadline is None or count == 0 or time.perf_counter() < deadline
+        ):
+            self.iterate(root)
+            count += 1
+        self.elapsed += time.perf_counter() - start
+        self.total_iterations += count
+        action = max(root.children, key=lambda action: root.children[action].visits)
+        self.root = root.children[action]
+        return action
+
+    def find(self, state: GameState) -> TreeNode:
+        """
+        Looks for a position below the subtree kept from the previous move.
+
+        Args:
+            state (GameState): The position reached.
+
+        Returns:
+            TreeNode: The node for the position, or None if the tree does not hold it.
+        """
+        if self.root is None:
+            return None
+        queue = deque([(self.root, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            if isinstance(node, TreeNode) and node.state == state:
+                return node
+            if depth < self.reuse_depth:
+                queue.extend((child, depth + 1) for child in node.children.values())
+        return None
+
+    def iterate(self, root: TreeNode) -> None:
+        """
+        Runs one iteration: selection, expansion, a rollout and backpropagation.
+
+        Args:
+            root (TreeNode): The root of the search.
+        """
+        node, path = root, [root]
+        while not node.state.over:
+            if isinstance(node, ChanceNode):
+                outcome = self.draw(node.state)
+                child = node.children.get(outcome)
+                if child is None:
+                    child = node.children[outcome] = TreeNode(
+                        node.state.with_action(outcome)
+                    )
+                    path.append(child)
+                    break
+                node = child
+                path.append(node)
+                continue
+            if node.actions is None:
+                node.actions = self.candidates(node.state)
+            allowed = node.actions[: 1 + int(node.visits**self.widening)]
+            action = next((a for a in allowed if a not in node.children), None)
+            if action is None:
+                node = self.select(node, allowed)
+                path.append(node)
+                continue
+            if action == ("R",):
+                node.children[action] = child = ChanceNode(node.state)
+                path.append(child)
+                outcome = self.draw(node.state)
+                child.children[outcome] = child = TreeNode(
+                    node.state.with_action(outcome)
+                )
+            else:
+                node.children[action] = child = TreeNode(node.state.with_action(action))
+            path.append(child)
+            break
+        reward = self.rollout(path[-1].state)
+        for node in path:
+            node.visits += 1
+            node.total += reward
+
+    def candidates(self, state: GameState) -> list[tuple]:
+        """
+        Orders the actions progressive widening adds: rolling, then bets on the camels furthest along.
+
+        Args:
+            state (GameState): The position.
+
+        Returns:
+            list[tuple]: The actions, hints excluded.
+        """
+        camels = sorted(
+            (
+                c
+                for c, taken in enumerate(state.tickets)
+                if taken < len(state.ticket_values)
+            ),
+            key=lambda c: state.board[c],
+            reverse=True,
+        )
+        return [("R",)] + [("B", state.colors[c]) for c in camels]
+
+    def select(self, node: TreeNode, allowed: list[tuple]):
+        """
+        Picks the child with the best UCT score for the player to move.
+
+        Args:
+            node (TreeNode): A node whose allowed actions have all been tried.
+            allowed (list[tuple]): The actions progressive widening allows.
+
+        Returns:
+            The child node.
+        """
+        scale = self.exploration * sqrt(log(node.visits))
+        sign = 1 if node.state.turn == 0 else -1
+        best, best_score = None, None
+        for action in allowed:
+            child = node.children[action]
+            mean = child.total / child.visits
+            score = (mean if sign > 0 else 1 - mean) + scale / sqrt(child.visits)
+            if best_score is None or score > best_score:
+                best, best_score = child, score
+        return best
+
+    def draw(self, state: GameState) -> tuple:
+        """
+        Draws a die and a face for a roll, as Player.roll does.
+
+        Args:
+            state (GameState): The position the roll is made from.
+
+        Returns:
+            tuple: The explicit ("R", color, roll) action.
+        """
+        unrolled = [c for c, roll in enumerate(state.dice) if roll == 0]
+        die, face = self.rng.draw(len(unrolled), len(state.faces))
+        return ("R", state.colors[unrolled[die]], state.faces[face])
+
+    def rollout(self, state: GameState) -> float:
+        """
+        Plays a position out to the end of the game with the rollout policy.
+
+        Args:
+            state (GameState): The position.
+
+        Returns:
+            float: 1 if player 1 wins, otherwise 0.
+        """
+        rng = self.rng
+        while not state.over:
+            action = ("R",)
+            if self.rollout_policy == "random":
+                bets = [
+                    c
+                    for c, taken in enumerate(state.tickets)
+                    if taken < len(state.ticket_values)
+                ]
+                pick = rng.random.randrange(len(bets) + 1)
+                if pick < len(bets):
+                    action = ("B", state.colors[bets[pick]])
+            elif state.dice.count(0) <= self.ev_dice:
+                if len(self.memo) > self.memo_size:
+                    self.memo.clear()
+                evs = bet_evs(state, self.memo)
+                best = max(
+                    (c for c, ev in enumerate(evs) if ev is not None),
+                    key=evs.__getitem__,
+                    default=None,
+                )
+                if best is not None and evs[best] > 1:
+                    action = ("B", state.colors[best])
+            if action == ("R",):
+                action = self.draw(state)
+            state = state.with_action(action)
+        return 1.0 if state.coins[0] > state.coins[1] else 0.0
+
+    def stats(self) -> dict:
+        """
+        Reports how the search has gone over every move so far.
+
+        Returns:
+            dict: The iterations run and iterations per second, the size of the kept tree in nodes and approximate
+                bytes (nodes and child tables, not the states they share), the share of moves that started from a
+                kept subtree, and the visits inherited that way.
+        """
+        nodes = size = 0
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            nodes += 1
+            size += sys.getsizeof(node) + sys.getsizeof(node.children)
+            stack.extend(node.children.values())
+        return {
+            "iterations": self.total_iterations,
+            "iterations_per_second": (
+                self.total_iterations / self.elapsed if self.elapsed else 0.0
+            ),
+            "tree_size": nodes,
+            "tree_bytes": size,
+            "reuse_ratio": self.reused / self.moves if self.moves else 0.0,
+            "inherited_visits": self.inherited,
+        }
+
+
+AGENTS = {
+    "roll": RollAgent,
+    "random": RandomAgent,
+    "ev": EVAgent,
+    "ev2": EVAgent,
+    "expectimax": ExpectimaxAgent,
+    "mcts": MCTSAgent,
+}
+
+
+def make_agent(name: str, time_limit: float = 1.0, seed=None) -> Agent:
+    """
+    Creates an agent by name.
+
+    Args:
+        name (str): "human" or one of the names in AGENTS.
+        time_limit (float): The number of seconds a search agent may spend per move.
+        seed: The seed for the random and MCTS agents, or None to seed from the system.
+
+    Returns:
+        Agent: The agent, or None for a human player.
+
+    Raises:
+        ValueError: If there is no agent with that name.
+    """
+    if name == "human":
+        return None
+    if name not in AGENTS:
+        raise ValueError(f"Unknown agent {name!r}, expected one of {tuple(AGENTS)}")
+    if name == "expectimax":
+        return ExpectimaxAgent(time_limit)
+    if name == "mcts":
+        return MCTSAgent(time_limit, seed=seed)
+    if name == "random":
+        return RandomAgent(seed)
+    if name == "ev2":
+        return EVAgent(two_ply=True)
+    return AGENTS[name]()
@@ -0,0 +1,335 @@
+from gamestate import GameState
+from rules import Rules, DEFAULT_RULES
+from compactboard import OFF_BOARD
+from numpyengine import advance, finish_places, leg_places
+import numpy as np
+
+ROLL = -1
+
+
+class BatchGames:
+    """
+    Many two-player games stored as NumPy arrays and advanced one turn at a time in lock-step.
+
+    Camels are stored camel-major like numpyengine: row c of spaces and heights holds camel c in every game. Bets
+    are kept as the total ticket value and number of tickets each player holds on each camel, which is all
+    GameManager.update_score needs. Actions are ROLL or the index of the camel to bet on; hints do not change the
+    game and are not modelled.
+    """
+
+    def __init__(self, num_games: int, seed=None, rules: Rules = DEFAULT_RULES):
+        """
+        Deals num_games new games, placing the camels like GameManager.init_camels.
+
+        Args:
+            num_games (int): The number of games.
+            seed: The seed for the random number generator, or None to seed from the system.
+            rules (Rules): The rules to play by.
+        """
+        self.rules = rules
+        self.colors = rules.colors
+        self.track_length = rules.track_length
+        self.faces = np.array(rules.faces, dtype=np.int16)
+        self.rng = np.random.default_rng(seed)
+        num_camels = len(self.colors)
+        self.spaces = np.zeros((num_camels, num_games), dtype=np.int16)
+        self.heights = np.zeros((num_camels, num_games), dtype=np.int16)
+        order = self.rng.random((num_camels, num_games)).argsort(axis=0)
+        starts = self.rng.integers(
+            rules.start_spaces, size=(num_camels, num_games), dtype=np.int16
+        )
+        stacked = np.zeros((rules.start_spaces, num_games), dtype=np.int16)
+        games = np.arange(num_games)
+        for pick, space in zip(order, starts):
+            self.spaces[pick, games] = space
+            self.heights[pick, games] = stacked[space, games]
+            stacked[space, games] += 1
+        self.rolled = np.zeros((num_camels, num_games), dtype=bool)
+        self.taken = np.zeros((num_camels, num_games), dtype=np.int8)
+        self.coins = np.full((2, num_games), rules.starting_coins, dtype=np.int32)
+        self.bet_value = np.zeros((2, num_camels, num_games), dtype=np.int16)
+        self.bet_count = np.zeros((2, num_camels, num_games), dtype=np.int16)
+        self.turn = np.zeros(num_games, dtype=np.int8)
+        self.over = np.zeros(num_games, dtype=bool)
+        self.winner = np.full(num_games, -1, dtype=np.int8)
+        self.second = np.full(num_games, -1, dtype=np.int8)
+
+    @classmethod
+    def from_state(cls, state: GameState, num_games: int, seed=None) -> "BatchGames":
+        """
+        Copies one position into every game of a new batch, for example to compare strategies from it.
+
+        Args:
+            state (GameState): The position to copy. Use GameState.from_game to start from a GameManager.
+            num_games (int): The number of copies.
+            seed: The seed for the random number generator, or None to seed from the system.
+
+        Returns:
+            BatchGames: The batch.
+        """
+        games = cls(num_games, seed, state.rules)
+
+        def column(values) -> np.ndarray:
+            return np.repeat(np.array(values)[..., None], num_games, axis=-1)
+
+        games.spaces[:] = column([space for space, _ in state.board])
+        games.heights[:] = column([height for _, height in state.board])
+        games.rolled[:] = column([roll != 0 for roll in state.dice])
+        games.taken[:] = column(state.tickets)
+        games.coins[:] = column(state.coins)
+        games.bet_value[:] = column([[sum(t) for t in bets] for bets in state.bets])
+        games.bet_count[:] = column([[len(t) for t in bets] for bets in state.bets])
+        games.turn[:] = state.turn
+        games.over[:] = state.over
+        games.winner[:] = state.winner
+        games.second[:] = state.second
+        return games
+
+    def __len__(self) -> int:
+        return len(self.turn)
+
+    def board(self, game: int) -> tuple:
+        """
+        Reads one game's board back as a compact board.
+
+        Args:
+            game (int): The index of the game.
+
+        Returns:
+            tuple: The compact board.
+        """
+        return tuple(
+            (int(space), int(height)) if space >= 0 else OFF_BOARD
+            for space, height in zip(self.spaces[:, game], self.heights[:, game])
+        )
+
+    def legal_bets(self) -> np.ndarray:
+        """
+        Finds the camels that still have tickets in each game.
+
+        Returns:
+            np.ndarray: A camel-major mask of the camels that can be bet on.
+        """
+        return self.taken < len(self.rules.tickets)
+
+    def ticket_values(self) -> np.ndarray:
+        """
+        Looks up the value of the top ticket of every camel in every game.
+
+        Returns:
+            np.ndarray: Camel-major ticket values, 0 where no tickets are left.
+        """
+        return np.array(self.rules.tickets + (0,), dtype=np.int16)[self.taken]
+
+    def leg_probabilities(
+        self, games: np.ndarray, samples: int = 64
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Estimates how likely each camel is to win and finish second in the current leg of some games, by playing
+        out the rest of the leg samples times per game.
+
+        Args:
+            games (np.ndarray): The indices of the games to estimate.
+            samples (int): The number of legs to play out per game.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The win and second place probabilities, one row per camel and one column
+                per game in games.
+        """
+        num_camels = len(self.colors)
+        columns = np.repeat(games, samples)
+        spaces, heights = self.spaces[:, columns], self.heights[:, columns]
+        rolled = self.rolled[:, columns]
+        keys = self.rng.random(rolled.shape)
+        keys[rolled] = 2
+        order = keys.argsort(axis=0)
+        remaining = (~rolled).sum(axis=0)
+        winners = np.full(len(columns), -1)
+        seconds = np.full(len(columns), -1)
+        active = np.ones(len(columns), dtype=bool)
+        for step in range(num_camels):
+            active &= step < remaining
+            if not active.any():
+                break
+            roll = self.faces[self.rng.integers(len(self.faces), size=len(columns))]
+            spaces, heights, moving, finishing = advance(
+                spaces, heights, order[step], roll, active, self.track_length
+            )
+            if finishing.any():
+                top, below = finish_places(spaces, heights, moving, self.track_length)
+                winners[finishing] = top[finishing]
+                seconds[finishing] = below[finishing]
+                active &= ~finishing
+        unfinished = winners < 0
+        top, below = leg_places(spaces, heights, self.track_length)
+        winners[unfinished] = top[unfinished]
+        seconds[unfinished] = below[unfinished]
+
+        offset = np.repeat(np.arange(len(games)), samples) * num_camels
+        probabilities = []
+        for places in (winners, seconds):
+            counts = np.bincount(
+                (offset + places)[places >= 0], minlength=len(games) * num_camels
+            )
+            probabilities.append(counts.reshape(len(games), num_camels).T / samples)
+        return tuple(probabilities)
+
+    def step(self, policies) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Plays one turn in every unfinished game.
+
+        Args:
+            policies: One policy per player. A policy is called as policy(games, mask) and returns an action for
+                every game; only the games in mask, where it is that player's turn, are used.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: The action taken, and the camel rolled and the roll (-1 and 0
+                where the action was not a roll), per game. Finished games report ROLL, -1 and 0.
+
+        Raises:
+            ValueError: If a policy bets on a camel with no tickets left.
+        """
+        num_camels, num_games = self.spaces.shape
+        games = np.arange(num_games)
+        active = ~self.over
+        actions = np.full(num_games, ROLL, dtype=np.int8)
+        for player, policy in enumerate(policies):
+            mask = active & (self.turn == player)
+            if mask.any():
+                actions[mask] = policy(self, mask)[mask]
+
+        betting = active & (actions != ROLL)
+        if betting.any():
+            camel = actions[betting]
+            index = np.flatnonzero(betting)
+            if not self.legal_bets()[camel, index].all():
+                raise ValueError("A policy bet on a camel with no tickets left")
+            player = self.turn[betting]
+            self.bet_value[player, camel, index] += self.ticket_values()[camel, index]
+            self.bet_count[player, camel, index] += 1
+            self.taken[camel, index] += 1
+
+        rolling = active & (actions == ROLL)
+        keys = np.where(self.rolled, -1.0, self.rng.random(self.rolled.shape))
+        camel = keys.argmax(axis=0)
+        roll = self.faces[self.rng.integers(len(self.faces), size=num_games)]
+        self.coins[self.turn[rolling], games[rolling]] += 1
+        self.rolled[camel[rolling], games[rolling]] = True
+        self.spaces, self.heights, moving, finishing = advance(
+            self.spaces, self.heights, camel, roll, rolling, self.track_length
+        )
+        if finishing.any():
+            top, below = finish_places(
+                self.spaces, self.heights, moving, self.track_length
+            )
+            self.winner[finishing] = top[finishing]
+            self.second[finishing] = below[finishing]
+            self.score(finishing, top, below)
+            self.spaces[moving & finishing] = -1
+            self.heights[moving & finishing] = -1
+            self.over |= finishing
+
+        leg_over = rolling & ~finishing & self.rolled.all(axis=0)
+        if leg_over.any():
+            self.score(
+                leg_over, *leg_places(self.spaces, self.heights, self.track_length)
+            )
+            self.rolled[:, leg_over] = False
+            self.taken[:, leg_over] = 0
+            self.bet_value[:, :, leg_over] = 0
+            self.bet_count[:, :, leg_over] = 0
+
+        self.turn[active & ~self.over] ^= 1
+        return (
+            np.where(active, actions, ROLL),
+            np.where(rolling, camel, -1),
+            np.where(rolling, roll, 0),
+        )
+
+    def score(self, mask: np.ndarray, winner: np.ndarray, second: np.ndarray) -> None:
+        """
+        Pays out the leg's bets in some games, following GameManager.update_score.
+
+        Args:
+            mask (np.ndarray): The games whose leg is over.
+            winner (np.ndarray): The leg's winning camel in every game (-1 if there is none).
+            second (np.ndarray): The leg's second camel in every game (-1 if there is none).
+        """
+        camels = np.arange(len(self.colors))[:, None]
+        payout = np.where(
+            camels == winner,
+            self.bet_value,
+            np.where(camels == second, self.bet_count, -self.bet_count),
+        ).sum(axis=1)
+        self.coins[:, mask] += payout[:, mask]
+
+    def play(self, policies, max_turns: int = 10_000) -> np.ndarray:
+        """
+        Plays every game to the end.
+
+        Args:
+            policies: One policy per player, as for step.
+            max_turns (int): A safety limit on the number of turns.
+
+        Returns:
+            np.ndarray: The final coins, one row per player and one column per game.
+        """
+        for _ in range(max_turns):
+            if self.over.all():
+                break
+            self.step(policies)
+        return self.coins
+
+
+def always_roll(games: BatchGames, mask: np.ndarray) -> np.ndarray:
+    """
+    A policy that rolls on every turn.
+
+    Args:
+        games (BatchGames): The batch.
+        mask (np.ndarray): The games to choose actions for.
+
+    Returns:
+        np.ndarray: ROLL for every game.
+    """
+    return np.full(len(games), ROLL, dtype=np.int8)
+
+
+class EVThreshold:
+    """
+    A policy that takes the best leg bet when its expected value beats a threshold, and rolls otherwise.
+    """
+
+    def __init__(self, threshold: float = 1.0, samples: int = 64):
+        """
+        Initializes the policy.
+
+        Args:
+            threshold (float): The expected value a bet must beat. Rolling is worth one coin, so 1 bets only when
+                betting looks better than rolling, as EVBot.evaluate advises.
+            samples (int): The number of legs played out per game to estimate the bet values.
+        """
+        self.threshold = threshold
+        self.samples = samples
+
+    def __call__(self, games: BatchGames, mask: np.ndarray) -> np.ndarray:
+        """
+        Chooses an action for the games in mask.
+
+        Args:
+            games (BatchGames): The batch.
+            mask (np.ndarray): The games to choose actions for.
+
+        Returns:
+            np.ndarray: The best camel to bet on, or ROLL, for every game.
+        """
+        actions = np.full(len(games), ROLL, dtype=np.int8)
+        index = np.flatnonzero(mask)
+        prob_win, prob_second = games.leg_probabilities(index, self.samples)
+        tickets = games.ticket_values()[:, index]
+        ev = prob_win * tickets + prob_second - (1 - prob_win - prob_second)
+        ev = np.where(games.legal_bets()[:, index], ev, -np.inf)
+        best = ev.argmax(axis=0)
+        take = ev[best, np.arange(len(index))] > self.threshold
+        actions[index[take]] = best[take]
+        return actions
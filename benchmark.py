@@ -0,0 +1,296 @@
+from gamemanager import GameManager
+from player import Player
+from evbot import EVBot
+from legcache import LegCache
+from racesim import RaceSimulator
+from rng import GameRNG
+from rules import Rules
+from compactboard import count_leg_scenarios
+import os
+import random
+import sys
+import tempfile
+import time
+
+
+def time_call(func, repeat: int = 5) -> float:
+    """
+    Time the fastest of several calls to a function.
+
+    Args:
+        func: The function to call with no arguments.
+        repeat (int): The number of calls to make.
+
+    Returns:
+        float: The fastest call in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def counting_bot(game: GameManager, engine: str) -> EVBot:
+    """
+    Make an EVBot that always counts, bypassing the cache, leg table and opening book.
+
+    Args:
+        game (GameManager): The game to evaluate.
+        engine (str): The leg evaluator to use.
+
+    Returns:
+        EVBot: The bot.
+    """
+    bot = EVBot(game, LegCache(), engine=engine)
+    bot.table = bot.book = None
+    return bot
+
+
+def bench_leg_engines(seed: int = 0) -> None:
+    """
+    Compare the leg evaluator engines with 5, 4 and 3 dice left to roll.
+
+    Args:
+        seed (int): The seed used to set up the board.
+    """
+    random.seed(seed)
+    game = GameManager(Player("Alice"), Player("Bob"))
+    game.init_camels()
+    print(f"{'dice':>4} {'python (ms)':>12} {'numpy (ms)':>12} {'speedup':>8}")
+    for color in [None, "red", "green"]:
+        if color:
+            game.dice[color] = 2
+            game.move_camels(color, 2)
+        num_dice = list(game.dice.values()).count(0)
+        times = [
+            time_call(lambda: counting_bot(game, engine).leg_outcomes())
+            for engine in ["python", "numpy"]
+        ]
+        print(
+            f"{num_dice:>4} {times[0] * 1000:>12.2f} {times[1] * 1000:>12.2f} {times[0] / times[1]:>7.1f}x"
+        )
+
+
+def bench_race_engines(seed: int = 0) -> None:
+    """
+    Compare the full-race Monte Carlo engines in races per second.
+
+    Args:
+        seed (int): The seed used to set up the board and the simulations.
+    """
+    random.seed(seed)
+    game = GameManager(Player("Alice"), Player("Bob"))
+    game.init_camels()
+    print(f"{'engine':>6} {'races':>8} {'races/s':>10}")
+    for engine, samples in [("python", 20_000), ("numpy", 500_000)]:
+        simulator = RaceSimulator(game, engine)
+        elapsed = time_call(lambda: simulator.simulate(samples, seed), repeat=3)
+        print(f"{engine:>6} {samples:>8} {samples / elapsed:>10.0f}")
+
+
+def bench_game_engines(seed: int = 0) -> None:
+    """
+    Compare whole games per second played one at a time through GameManager.apply and in lock-step with
+    BatchGames, with both players always rolling.
+
+    Args:
+        seed (int): The seed used for the games.
+    """
+    from batchengine import BatchGames, always_roll
+
+    def play_games(num_games: int) -> None:
+        for _ in range(num_games):
+            game = GameManager(Player("Alice"), Player("Bob"), rng=rng)
+            game.init_camels()
+            while not game.over:
+                game.apply(("R",))
+
+    rng = GameRNG(seed)
+    print(f"{'engine':>6} {'games':>8} {'games/s':>10}")
+    for engine, num_games, play in [
+        ("python", 2_000, lambda: play_games(2_000)),
+        (
+            "numpy",
+            100_000,
+            lambda: BatchGames(100_000, seed).play((always_roll, always_roll)),
+        ),
+    ]:
+        elapsed = time_call(play, repeat=3)
+        print(f"{engine:>6} {num_games:>8} {num_games / elapsed:>10.0f}")
+
+
+def bench_rules_scaling(
+    seed: int = 0,
+    exact_limit: int = 1_000_000,
+    samples: int = 20_000,
+    races: int = 2_000,
+) -> None:
+    """
+    Sweep the number of camels and the track length, and time a fresh leg evaluation counted exactly with each
+    engine, estimated from sampled legs, and a full-race simulation. The last column says whether exact counting
+    in Python still beats sampling at this size.
+
+    Args:
+        seed (int): The seed used to set up the boards and the simulations.
+        exact_limit (int): Skip exact counting for legs with more scenarios than this.
+        samples (int): The number of legs to sample.
+        races (int): The number of races to simulate.
+    """
+    print(
+        f"{'camels':>6} {'track':>5} {'scenarios':>10} {'python (ms)':>12} {'numpy (ms)':>11}"
+        f" {'sampled (ms)':>13} {'races/s':>8} {'use':>6}"
+    )
+    for num_camels in range(3, 8):
+        for track_length in (16, 24, 32):
+            rules = Rules.with_camels(num_camels, track_length=track_length)
+            random.seed(seed)
+            game = GameManager(
+                Player("Alice", rules), Player("Bob", rules), rules=rules
+            )
+            game.init_camels()
+            scenarios = count_leg_scenarios(num_camels, len(rules.faces))
+            exact = [
+                (
+                    time_call(
+                        lambda: counting_bot(game, engine).leg_outcomes(), repeat=1
+                    )
+                    if scenarios <= exact_limit
+                    else None
+                )
+                for engine in ["python", "numpy"]
+            ]
+            sampled = time_call(
+                lambda: counting_bot(game, "python").estimate_leg_outcomes(
+                    max_samples=min(samples, scenarios - 1), seed=seed
+                ),
+                repeat=1,
+            )
+            simulator = RaceSimulator(game)
+            elapsed = time_call(lambda: simulator.simulate(races, seed), repeat=1)
+            python, numpy = ("-" if t is None else f"{t * 1000:.1f}" for t in exact)
+            use = "exact" if exact[0] is not None and exact[0] <= sampled else "sample"
+            print(
+                f"{num_camels:>6} {track_length:>5} {scenarios:>10} {python:>12} {numpy:>11}"
+                f" {sampled * 1000:>13.1f} {races / elapsed:>8.0f} {use:>6}"
+            )
+
+
+def bench_replay(seed: int = 0, num_games: int = 2_000) -> None:
+    """
+    Log games of random legal actions, then time scanning the log, replaying every game to its end from the last
+    checkpoint, and re-checking games event by event through GameManager.
+
+    Args:
+        seed (int): The seed used for the games.
+        num_games (int): The number of games to log.
+    """
+    from eventlog import EventLog, EventArchive
+
+    rng = GameRNG(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.log")
+        with EventLog(path) as log:
+            for _ in range(num_games):
+                game = GameManager(Player("Alice"), Player("Bob"), rng=rng)
+                game.init_camels()
+                log.start(game)
+                while not game.over:
+                    actions = game.legal_actions()
+                    action = actions[rng.random.randrange(len(actions))]
+                    log.record(game, game.apply(action))
+        archive = EventArchive(path)
+        print(
+            f"{num_games} games, {sum(archive.lengths) / num_games:.0f} turns per game,"
+            f" {os.path.getsize(path) / num_games:.0f} bytes per game"
+        )
+        print(f"{'replay':>10} {'games/s':>10}")
+        for name, replay, count in [
+            ("scan", lambda: EventArchive(path).close(), num_games),
+            ("end", lambda: [archive.replay(g) for g in range(num_games)], num_games),
+            ("reproduce", lambda: [archive.reproduce(g) for g in range(200)], 200),
+        ]:
+            elapsed = time_call(replay, repeat=3)
+            print(f"{name:>10} {count / elapsed:>10.0f}")
+        archive.close()
+
+
+def write_selfplay(path: str, num_games: int, seed: int, times) -> None:
+    """
+    Write a dataset of random self-play games and report how long it took, for bench_selfplay's worker process.
+
+    Args:
+        path (str): The directory to write.
+        num_games (int): The number of games to play.
+        seed (int): The seed used for the games.
+        times: A multiprocessing queue to put the elapsed seconds on.
+    """
+    from selfplay import play_records, write_dataset
+
+    start = time.perf_counter()
+    write_dataset(path, play_records(("random", "random"), num_games, seed))
+    times.put(time.perf_counter() - start)
+
+
+def bench_selfplay(seed: int = 0, num_games: int = 5_000) -> None:
+    """
+    Time writing a self-play dataset of random games in a fresh process, and report its size on disk and the
+    process's peak resident memory.
+
+    Args:
+        seed (int): The seed used for the games.
+        num_games (int): The number of games to play.
+    """
+    from selfplay import SelfPlayDataset
+    import multiprocessing
+    import resource
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        times = context.Queue()
+        process = context.Process(
+            target=write_selfplay, args=(directory, num_games, seed, times)
+        )
+        process.start()
+        elapsed = times.get()
+        process.join()
+        dataset = SelfPlayDataset(directory)
+        records = len(dataset)
+        size = sum(
+            os.path.getsize(os.path.join(directory, file))
+            for file in os.listdir(directory)
+        )
+        start = time.perf_counter()
+        total = sum(int(chunk["result"].sum()) for chunk in dataset.chunks())
+        scan = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"{num_games} games, {records} records, {records / num_games:.0f} per game")
+    print(
+        f"write {records / elapsed:.0f} records/s, {size / records * 10**6 / 2**20:.1f} MiB per million records,"
+        f" peak RSS {peak:.0f} MiB"
+    )
+    print(f"scan {records / scan:.0f} records/s (result total {total})")
+
+
+BENCHMARKS = {
+    "legs": bench_leg_engines,
+    "races": bench_race_engines,
+    "games": bench_game_engines,
+    "scaling": bench_rules_scaling,
+    "replay": bench_replay,
+    "selfplay": bench_selfplay,
+}
+
+
+def main() -> None:
+    """
+    Run the benchmarks named on the command line, or all of them.
+    """
+    for name in sys.argv[1:] or BENCHMARKS:
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+from rules import DEFAULT_RULES
+from math import factorial
+
+TRACK_LENGTH = DEFAULT_RULES.track_length
+OFF_BOARD = (-1, -1)
+
+
+def encode_board(board: list[list], colors: list[str]) -> tuple:
+    """
+    Encode a GameManager board as an immutable tuple of (space, height) pairs.
+
+    Args:
+        board (list[list]): The board as a list of camel stacks, bottom camel first.
+        colors (list[str]): The camel colors, which fix the order of the pairs.
+
+    Returns:
+        tuple: One (space, height) pair per color. Camels that are not on the board are stored as OFF_BOARD.
+    """
+    index = {color: i for i, color in enumerate(colors)}
+    positions = [OFF_BOARD] * len(colors)
+    for space, stack in enumerate(board):
+        for height, camel in enumerate(stack):
+            positions[index[camel]] = (space, height)
+    return tuple(positions)
+
+
+def decode_board(
+    state: tuple, colors: list[str], track_length: int = TRACK_LENGTH
+) -> list[list]:
+    """
+    Decode a compact board back into the list-of-stacks layout used by GameManager.
+
+    Args:
+        state (tuple): The compact board.
+        colors (list[str]): The camel colors used to encode the board.
+        track_length (int): The number of spaces on the board.
+
+    Returns:
+        list[list]: The board as a list of camel stacks, bottom camel first.
+    """
+    board = [[] for _ in range(track_length)]
+    for (space, _), camel in sorted(zip(state, range(len(state)))):
+        if space >= 0:
+            board[space].append(colors[camel])
+    return board
+
+
+def move(
+    state: tuple, camel: int, roll: int, track_length: int = TRACK_LENGTH
+) -> tuple[tuple, int, int]:
+    """
+    Move a camel, and every camel stacked on top of it, following GameManager.move_camels.
+
+    Args:
+        state (tuple): The compact board.
+        camel (int): The index of the camel to move.
+        roll (int): The number of spaces to move the camel.
+        track_length (int): The number of spaces on the board.
+
+    Returns:
+        tuple[tuple, int, int]: The new compact board, and the indices of the winning and second camel if the
+            move crossed the finish line (-1 otherwise, or if there is no second camel).
+    """
+    space, height = state[camel]
+    if space < 0:
+        return state, -1, -1
+    target = space + roll
+    if target >= track_length:
+        moving = sorted(
+            (h, c) for c, (s, h) in enumerate(state) if s == space and h >= height
+        )
+        new_state = tuple(
+            OFF_BOARD if s == space and h >= height else (s, h) for s, h in state
+        )
+        if len(moving) > 1:
+            return new_state, moving[-1][1], moving[-2][1]
+        second, best = -1, OFF_BOARD
+        for c, position in enumerate(new_state):
+            if position[0] < track_length - 1 and position > best:
+                second, best = c, position
+        return new_state, moving[-1][1], second
+    offset = sum(1 for s, _ in state if s == target) - height
+    return (
+        tuple(
+            (target, h + offset) if s == space and h >= height else (s, h)
+            for s, h in state
+        ),
+        -1,
+        -1,
+    )
+
+
+def leaders(state: tuple, track_length: int = TRACK_LENGTH) -> tuple[int, int]:
+    """
+    Find the leading and second camel on a compact board, following GameManager.calculate_leg_winners.
+
+    Args:
+        state (tuple): The compact board.
+        track_length (int): The number of spaces on the board.
+
+    Returns:
+        tuple[int, int]: The indices of the leading and second camel (-1 if there is none).
+    """
+    winner, best = -1, OFF_BOARD
+    for c, position in enumerate(state):
+        if 0 < position[0] < track_length and position > best:
+            winner, best = c, position
+    second, runner_up = -1, OFF_BOARD
+    for c, position in enumerate(state):
+        if 0 < position[0] < best[0] and position > runner_up:
+            second, runner_up = c, position
+    return winner, second
+
+
+def canonicalize(state: tuple, dice: tuple[int, ...]) -> tuple[tuple, tuple, tuple]:
+    """
+    Relabel the camels in board order so that boards differing only by camel colors share one encoding.
+
+    Args:
+        state (tuple): The compact board.
+        dice (tuple[int, ...]): The indices of the camels whose dice have not been rolled.
+
+    Returns:
+        tuple[tuple, tuple, tuple]: The canonical board, the canonical indices of the unrolled dice, and the labels
+            mapping each canonical index back to its camel index.
+    """
+    rolling = set(dice)
+    labels = tuple(sorted(range(len(state)), key=lambda c: (state[c], c in rolling)))
+    return (
+        tuple(state[c] for c in labels),
+        tuple(i for i, c in enumerate(labels) if c in rolling),
+        labels,
+    )
+
+
+def relabel(values: tuple, labels: tuple) -> tuple:
+    """
+    Map per-camel values from canonical indices back to camel indices.
+
+    Args:
+        values (tuple): One value per canonical index.
+        labels (tuple): The labels returned by canonicalize.
+
+    Returns:
+        tuple: One value per camel index.
+    """
+    relabeled = [None] * len(labels)
+    for value, camel in zip(values, labels):
+        relabeled[camel] = value
+    return tuple(relabeled)
+
+
+def count_leg_scenarios(num_dice: int, num_faces: int = 3) -> int:
+    """
+    Count the equally likely roll orders and faces of the dice left in a leg.
+
+    Args:
+        num_dice (int): The number of dice left to roll.
+        num_faces (int): The number of faces on a die.
+
+    Returns:
+        int: num_dice! * num_faces^num_dice.
+    """
+    return factorial(num_dice) * num_faces**num_dice
+
+
+def count_leg_outcomes(
+    board: tuple,
+    dice: tuple[int, ...],
+    outcomes: list[int] = DEFAULT_RULES.faces,
+    track_length: int = TRACK_LENGTH,
+    memo: dict = None,
+) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """
+    Count how often each camel wins and finishes second over every roll order and face of the remaining dice.
+
+    The scenarios are walked as a tree over (die, face) so shared roll prefixes are only simulated once, and
+    subtrees are memoized on their canonical board (see canonicalize), so subtrees that differ only by which camel
+    is where are counted once. When a camel crosses the finish line, every scenario below that point is credited at
+    once.
+
+    Args:
+        board (tuple): The compact board.
+        dice (tuple[int, ...]): The indices of the camels whose dice have not been rolled.
+        outcomes (list[int]): The faces of a die.
+        track_length (int): The number of spaces on the board.
+        memo (dict): Canonical subtree counts to share between calls with the same outcomes and track length.
+
+    Returns:
+        tuple[tuple[int, ...], tuple[int, ...]]: The win and second place counts per camel index.
+    """
+    num_camels = len(board)
+    weights = [count_leg_scenarios(n, len(outcomes)) for n in range(len(dice))]
+    memo = {} if memo is None else memo
+
+    def count(state: tuple, remaining: tuple) -> tuple[list, list]:
+        # state is canonical, so the counts are per canonical index.
+        key = (state, remaining)
+        if key in memo:
+            return memo[key]
+        wins, seconds = [0] * num_camels, [0] * num_camels
+        if not remaining:
+            winner, second = leaders(state, track_length)
+            if winner >= 0:
+                wins[winner] = 1
+            if second >= 0:
+                seconds[second] = 1
+            memo[key] = wins, seconds
+            return wins, seconds
+        weight = weights[len(remaining) - 1]
+        for i, camel in enumerate(remaining):
+            rest = remaining[:i] + remaining[i + 1 :]
+            for roll in outcomes:
+                child, winner, second = move(state, camel, roll, track_length)
+                if winner >= 0:
+                    wins[winner] += weight
+                    if second >= 0:
+                        seconds[second] += weight
+                    continue
+                child, child_dice, labels = canonicalize(child, rest)
+                child_wins, child_seconds = count(child, child_dice)
+                for c, label in enumerate(labels):
+                    wins[label] += child_wins[c]
+                    seconds[label] += child_seconds[c]
+        memo[key] = wins, seconds
+        return wins, seconds
+
+    board, dice, labels = canonicalize(board, dice)
+    wins, seconds = count(board, dice)
+    return relabel(wins, labels), relabel(seconds, labels)
@@ -1,31 +1,76 @@
 from gamemanager import GameManager
-from itertools import permutations, product
-from copy import deepcopy
+from compactboard import (
+    encode_board,
+    decode_board,
+    move,
+    leaders,
+    canonicalize,
+    relabel,
+    count_leg_scenarios,
+    count_leg_outcomes,
+)
+from legcache import LegCache
+from legtable import LegTable, default_table
+from openingbook import OpeningBook, default_book
+from tickets import TicketTents
+from evresult import EVResult, CamelEV, TwoPlyResult
+from gamestate import GameState
+from rng import GameRNG
+from rules import DEFAULT_RULES
+from math import sqrt
 import colorama
+import time
 
 colorama.init(autoreset=True)
 
+LEG_CACHE = LegCache()
+ENGINES = ("python", "numpy")
+SAMPLE_BATCH = 256
+
 
 class EVBot:
     """
     A bot that calculates the expected value (EV) of bets in a camel racing game using Monte Carlo simulations.
     """
 
-    def __init__(self, game: GameManager):
+    def __init__(
+        self,
+        game: GameManager,
+        cache: LegCache = None,
+        engine: str = "python",
+        parallel=None,
+        table: LegTable = None,
+        book: OpeningBook = None,
+    ):
         """
         Initializes the EVBot with a given game state.
 
         Args:
             game (GameManager): The game manager instance containing the current game state.
+            cache (LegCache): The cache of leg outcomes to use. Defaults to a cache shared by every EVBot.
+            engine (str): The leg evaluator to use, either "python" or "numpy" (requires NumPy).
+            parallel (ParallelEngine): A worker pool to split exact leg counts across, or None to count here.
+            table (LegTable): A precomputed table of late-leg outcomes. Defaults to legtable.bin if it has been built.
+            book (OpeningBook): A precomputed book of first-leg outcomes. Defaults to openingbook.bin if it exists.
         """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
         self.game = game
-        self.outcomes = [1, 2, 3]
+        self.cache = LEG_CACHE if cache is None else cache
+        self.engine = engine
+        self.parallel = parallel
+        self.table = default_table() if table is None else table
+        self.book = default_book() if book is None else book
+        self.outcomes = list(game.rules.faces)
+        self.track_length = game.rules.track_length
         self.color_dict = {
             "RED": colorama.Fore.RED,
             "GREEN": colorama.Fore.GREEN,
             "BLUE": colorama.Fore.BLUE,
             "YELLOW": colorama.Fore.YELLOW,
             "PURPLE": colorama.Fore.MAGENTA,
+            "WHITE": colorama.Fore.WHITE,
+            "BLACK": colorama.Fore.LIGHTBLACK_EX,
         }
 
     def simulate_move(
@@ -41,24 +86,15 @@ class EVBot:
         Returns:
             tuple[list[list], str, str]: A tuple containing the new game board, the winning camel, and the second camel.
         """
-        board_copy = deepcopy(board)
-        for i, stack in enumerate(board_copy):
-            if camel in stack:
-                camel_index = stack.index(camel)
-                moving_camels = stack[camel_index:]
-                board_copy[i] = stack[:camel_index]
-                if i + roll >= len(board_copy):
-                    winning_camel = moving_camels[-1]
-                    if len(moving_camels) > 1:
-                        second_camel = moving_camels[-2]
-                        return board_copy, winning_camel, second_camel
-                    for stack in reversed(board_copy[:-1]):
-                        if stack:
-                            second_camel = stack[-1]
-                            return board_copy, winning_camel, second_camel
-                else:
-                    board_copy[i + roll].extend(moving_camels)
-        return board_copy, "", ""
+        colors = self.game.colors
+        state, winner, second = move(
+            encode_board(board, colors), colors.index(camel), roll, len(board)
+        )
+        return (
+            decode_board(state, colors, len(board)),
+            colors[winner] if winner >= 0 else "",
+            colors[second] if second >= 0 else "",
+        )
 
     def find_simulated_winner(self, board: list[list]) -> tuple[str, str]:
         """
@@ -69,63 +105,387 @@ class EVBot:
         Returns:
             tuple[str, str]: A tuple containing the winning camel and the second camel.
         """
-        for i in range(15, 0, -1):
-            if board[i]:
-                winning_camel = board[i][-1]
-                for j in range(i - 1, 0, -1):
-                    if board[j]:
-                        return winning_camel, board[j][-1]
-                return winning_camel, ""
-        return "", ""
+        colors = self.game.colors
+        winner, second = leaders(encode_board(board, colors), len(board))
+        return (
+            colors[winner] if winner >= 0 else "",
+            colors[second] if second >= 0 else "",
+        )
 
-    def calculate_ev(self) -> str:
+    def count_leg_scenarios(self, num_dice: int) -> int:
         """
-        Calculates the expected value (EV) of bets for each camel based on simulated game outcomes.
+        Counts the roll orders and faces that can still happen this leg.
 
+        Args:
+            num_dice (int): The number of dice left to roll.
         Returns:
-            str: A string describing the EV, probability of winning, and probability of being runner-up for each camel,
-                along with a recommendation for which camel to bet on.
+            int: The number of equally likely scenarios, num_dice! * len(self.outcomes)^num_dice.
+        """
+        return count_leg_scenarios(num_dice, len(self.outcomes))
+
+    def count_leg_outcomes(
+        self, board: tuple, dice: tuple[int, ...]
+    ) -> tuple[tuple[int, ...], tuple[int, ...]]:
+        """
+        Counts how often each camel wins and finishes second over every roll order and face of the remaining dice.
+
+        Args:
+            board (tuple): The compact board.
+            dice (tuple[int, ...]): The indices of the camels whose dice have not been rolled.
+        Returns:
+            tuple[tuple[int, ...], tuple[int, ...]]: The win and second place counts per camel index.
+        """
+        return count_leg_outcomes(board, dice, self.outcomes, self.track_length)
+
+    def cache_key(self, board: tuple, dice: tuple[int, ...]) -> tuple:
+        """
+        Builds the key of a canonical leg in the cache.
+
+        Args:
+            board (tuple): The canonical compact board.
+            dice (tuple[int, ...]): The indices of the camels whose dice have not been rolled.
+        Returns:
+            tuple: (board, dice) under the standard track and die, and (board, dice, race) otherwise.
+        """
+        race = self.game.rules.race
+        return (board, dice) if race == DEFAULT_RULES.race else (board, dice, race)
+
+    def leg_outcomes(self) -> tuple[tuple[int, ...], tuple[int, ...], int]:
+        """
+        Looks up, or counts and caches, the outcomes of the rest of the current leg.
+
+        Camel colors only matter for labelling results, so the board and dice are relabelled into canonical form
+        before the lookup and the counts are mapped back to real colors afterwards. Ticket values are not part of
+        the cache key, so EVs can be recomputed from a cached entry after bets. Games with a non-standard track or
+        die are keyed by those rules too, and skip the opening book and leg table.
+
+        Returns:
+            tuple[tuple[int, ...], tuple[int, ...], int]: The win and second place counts per camel index, and the
+                number of scenarios they were counted over.
+        """
+        colors = self.game.colors
+        board, dice, labels = canonicalize(
+            encode_board(self.game.board, colors),
+            tuple(i for i, color in enumerate(colors) if self.game.dice[color] == 0),
+        )
+        key = self.cache_key(board, dice)
+        outcomes = self.cache.get(key)
+        for lookup in (self.book, self.table) if len(key) == 2 else ():
+            if outcomes is None and lookup is not None:
+                outcomes = lookup.get(board, dice)
+                if outcomes is not None:
+                    self.cache.put(key, outcomes)
+        if outcomes is None:
+            if self.parallel is not None:
+                wins, seconds = self.parallel.count_leg_outcomes(
+                    board, dice, self.outcomes, self.track_length
+                )
+            elif self.engine == "numpy":
+                import numpyengine
+
+                wins, seconds = numpyengine.count_leg_outcomes(
+                    board, dice, self.outcomes, self.track_length
+                )
+            else:
+                wins, seconds = self.count_leg_outcomes(board, dice)
+            outcomes = wins, seconds, self.count_leg_scenarios(len(dice))
+            self.cache.put(key, outcomes)
+        wins, seconds, total = outcomes
+        return relabel(wins, labels), relabel(seconds, labels), total
+
+    def leg_probabilities(self) -> tuple[tuple[float, ...], tuple[float, ...]]:
+        """
+        Calculates the probability of each camel winning and finishing second in the current leg.
+
+        Returns:
+            tuple[tuple[float, ...], tuple[float, ...]]: The win and second place probabilities per camel index.
+        """
+        wins, seconds, total = self.leg_outcomes()
+        return (
+            tuple(count / total for count in wins),
+            tuple(count / total for count in seconds),
+        )
+
+    def sample_leg_outcomes(
+        self, board: tuple, dice: tuple[int, ...], num_samples: int, rng: GameRNG
+    ) -> tuple[list[int], list[int]]:
+        """
+        Counts how often each camel wins and finishes second over randomly drawn roll orders and faces.
+
+        Args:
+            board (tuple): The compact board.
+            dice (tuple[int, ...]): The indices of the camels whose dice have not been rolled.
+            num_samples (int): The number of legs to simulate.
+            rng (GameRNG): The random stream to draw rolls from.
+        Returns:
+            tuple[list[int], list[int]]: The win and second place counts per camel index.
+        """
+        wins, seconds = [0] * len(board), [0] * len(board)
+        outcomes, track_length = self.outcomes, self.track_length
+        for _ in range(num_samples):
+            state, winner, remaining = board, -1, list(dice)
+            while remaining:
+                die, face = rng.draw(len(remaining), len(outcomes))
+                state, winner, second = move(
+                    state, remaining.pop(die), outcomes[face], track_length
+                )
+                if winner >= 0:
+                    break
+            if winner < 0:
+                winner, second = leaders(state, track_length)
+            if winner >= 0:
+                wins[winner] += 1
+            if second >= 0:
+                seconds[second] += 1
+        return wins, seconds
+
+    def estimate_leg_outcomes(
+        self, time_budget: float = None, max_samples: int = None, seed=None
+    ) -> tuple[tuple[int, ...], tuple[int, ...], int, bool]:
+        """
+        Counts the outcomes of the rest of the current leg within a time or sample budget.
+
+        Legs are sampled until the budget runs out. As soon as exhaustive enumeration looks affordable within the
+        budget, or is already cached, the exact counts are returned instead.
+
+        Args:
+            time_budget (float): The number of seconds to spend, or None for no time limit.
+            max_samples (int): The number of legs to sample at most, or None for no sample limit.
+            seed: The seed for sampling, or None to seed from the system.
+        Returns:
+            tuple[tuple[int, ...], tuple[int, ...], int, bool]: The win and second place counts per camel index, the
+                number of scenarios they were counted over, and whether the counts are exact.
+        Raises:
+            ValueError: If max_samples is less than 1 or time_budget is negative.
+        """
+        if max_samples is not None and max_samples < 1:
+            raise ValueError(f"max_samples must be at least 1, not {max_samples}")
+        if time_budget is not None and time_budget < 0:
+            raise ValueError(f"time_budget must not be negative, not {time_budget}")
+        start = time.perf_counter()
+        colors = self.game.colors
+        board, dice, labels = canonicalize(
+            encode_board(self.game.board, colors),
+            tuple(i for i, color in enumerate(colors) if self.game.dice[color] == 0),
+        )
+        scenarios = self.count_leg_scenarios(len(dice))
+        if (
+            time_budget is None and (max_samples is None or max_samples >= scenarios)
+        ) or self.cache_key(board, dice) in self.cache:
+            return *self.leg_outcomes(), True
+
+        rng = GameRNG(seed)
+        wins, seconds = [0] * len(board), [0] * len(board)
+        drawn = 0
+        while max_samples is None or drawn < max_samples:
+            batch = (
+                SAMPLE_BATCH
+                if max_samples is None
+                else min(SAMPLE_BATCH, max_samples - drawn)
+            )
+            batch_wins, batch_seconds = self.sample_leg_outcomes(
+                board, dice, batch, rng
+            )
+            for c in range(len(board)):
+                wins[c] += batch_wins[c]
+                seconds[c] += batch_seconds[c]
+            drawn += batch
+            elapsed = time.perf_counter() - start
+            if time_budget is None:
+                continue
+            if (
+                drawn >= scenarios
+                or scenarios * elapsed / drawn <= time_budget - elapsed
+            ):
+                return *self.leg_outcomes(), True
+            if elapsed >= time_budget:
+                break
+        return (
+            relabel(tuple(wins), labels),
+            relabel(tuple(seconds), labels),
+            drawn,
+            False,
+        )
+
+    def evaluate(
+        self, time_budget: float = None, max_samples: int = None, seed=None
+    ) -> EVResult:
         """
-        available_dice = [key for key in self.game.dice if self.game.dice[key] == 0]
-        win_counts = {color: 0 for color in self.game.colors}
-        second_counts = {color: 0 for color in self.game.colors}
-        camel_roll_orders = list(permutations(available_dice))
-        combinations = list(product(self.outcomes, repeat=len(available_dice)))
-
-        for order in camel_roll_orders:
-            for combo in combinations:
-                game_board_copy = deepcopy(self.game.board)
-                for i in range(len(combo)):
-                    game_board_copy, winning_camel, second_camel = self.simulate_move(
-                        order[i], combo[i], game_board_copy
-                    )
-                    if winning_camel:
-                        break
-                if not winning_camel:
-                    winning_camel, second_camel = self.find_simulated_winner(
-                        game_board_copy
-                    )
-                win_counts[winning_camel] += 1
-                second_counts[second_camel] += 1
-
-        total_outcomes = len(camel_roll_orders) * len(combinations)
-        ev_values = {color: 0 for color in self.game.colors}
+        Calculates the odds and expected value (EV) of a bet on each camel, and the recommended action.
+
+        With a time or sample budget, the odds may be estimated from sampled legs (see estimate_leg_outcomes), in
+        which case the result carries their standard errors and is flagged as inexact.
+
+        Args:
+            time_budget (float): The number of seconds to spend, or None for no time limit.
+            max_samples (int): The number of legs to sample at most, or None for no sample limit.
+            seed: The seed for sampling, or None to seed from the system.
+        Returns:
+            EVResult: The odds and EV of every camel, and whether to bet ("B") on a color or roll ("R").
+        Raises:
+            ValueError: If max_samples is less than 1 or time_budget is negative.
+        """
+        wins, seconds, total_outcomes, exact = self.estimate_leg_outcomes(
+            time_budget, max_samples, seed
+        )
+        camels = []
         max_ev, max_ev_camel = -1, None
-        ev_values_string = []
+        cards = self.game.cards
+        tents = isinstance(cards, TicketTents)
 
-        for color in win_counts:
-            prob_win = win_counts[color] / total_outcomes
-            prob_second = second_counts[color] / total_outcomes
-            not_1st_or_2nd = 1 - (
-                (win_counts[color] + second_counts[color]) / total_outcomes
+        for color, win_count, second_count in zip(self.game.colors, wins, seconds):
+            prob_win = win_count / total_outcomes
+            prob_second = second_count / total_outcomes
+            not_1st_or_2nd = 1 - ((win_count + second_count) / total_outcomes)
+            if tents:
+                bet_available = color in cards and cards.remaining(color) > 0
+            else:
+                bet_available = bool(color in cards and cards[color])
+            ev = 0
+            if bet_available:
+                top = cards.top(color) if tents else cards[color][0]
+                ev = prob_win * top + prob_second - not_1st_or_2nd
+                if max_ev_camel is None or ev > max_ev:
+                    max_ev, max_ev_camel = ev, color
+            win_stderr = second_stderr = 0.0
+            if not exact:
+                win_stderr = sqrt(prob_win * (1 - prob_win) / total_outcomes)
+                second_stderr = sqrt(prob_second * (1 - prob_second) / total_outcomes)
+            camels.append(
+                CamelEV(
+                    color,
+                    prob_win,
+                    prob_second,
+                    ev,
+                    bet_available,
+                    win_stderr,
+                    second_stderr,
+                )
             )
-            if color in self.game.cards and self.game.cards[color]:
-                ev_values[color] = (
-                    prob_win * self.game.cards[color][0] + prob_second - not_1st_or_2nd
+
+        if max_ev > 1:
+            return EVResult(tuple(camels), "B", max_ev_camel, exact, total_outcomes)
+        return EVResult(tuple(camels), "R", None, exact, total_outcomes)
+
+    def position_value(self, state: GameState, player: int, memo: dict) -> float:
+        """
+        Values a position for a player as their lead in coins plus the expected payout of the bets both players hold.
+
+        Args:
+            state (GameState): The position.
+            player (int): The index of the player.
+            memo (dict): Leg subtree counts shared between positions.
+        Returns:
+            float: The value.
+        """
+        payouts = state.expected_payouts(memo)
+        return (
+            state.coins[player]
+            - state.coins[1 - player]
+            + payouts[player]
+            - payouts[1 - player]
+        )
+
+    def reply_value(
+        self, state: GameState, player: int, memo: dict
+    ) -> tuple[float, tuple]:
+        """
+        Values a position for a player after their opponent's best reply: a bet, or a roll averaged over every die
+        and face. Hints change nothing in a GameState and are not considered.
+
+        Args:
+            state (GameState): The position, with the opponent to move.
+            player (int): The index of the player.
+            memo (dict): Leg subtree counts shared between positions.
+        Returns:
+            tuple[float, tuple]: The value, and the reply that holds the player to it.
+        """
+        best_value, best_reply = None, None
+        for reply in state.legal_actions():
+            if reply == ("H",):
+                continue
+            if reply == ("R",):
+                value = sum(
+                    probability
+                    * self.position_value(state.with_action(outcome), player, memo)
+                    for probability, outcome in state.roll_outcomes()
                 )
-                if max_ev_camel is None or ev_values[color] > max_ev:
-                    max_ev, max_ev_camel = ev_values[color], color
             else:
+                value = self.position_value(state.with_action(reply), player, memo)
+            if best_value is None or value < best_value:
+                best_value, best_reply = value, reply
+        return best_value, best_reply
+
+    def evaluate_two_ply(self, memo: dict = None) -> TwoPlyResult:
+        """
+        Compares betting now with rolling now, taking into account that the opponent moves next and may take the
+        next ticket or roll and change the board.
+
+        Every position two plies ahead is valued from exact counts of the rest of its leg. The counts share one memo,
+        and the positions reached by rolls are subtrees of the current leg, so after the first count nearly every
+        other one is a lookup. A roll that ends the leg or the race is valued once the leg is scored, without a
+        reply, since the reply belongs to the next leg.
+
+        Args:
+            memo (dict): Leg subtree counts to share, for example between moves of the same game. Defaults to a new
+                memo for this evaluation.
+        Returns:
+            TwoPlyResult: The value of rolling and of each bet, and whether to bet ("B") on a color or roll ("R").
+        """
+        memo = {} if memo is None else memo
+        state = GameState.from_game(self.game)
+        player = state.turn
+        base = self.position_value(state, player, memo)
+
+        roll = 0.0
+        for probability, outcome in state.roll_outcomes():
+            child = state.with_action(outcome)
+            if child.over or not any(child.dice):
+                value = self.position_value(child, player, memo)
+            else:
+                value = self.reply_value(child, player, memo)[0]
+            roll += probability * value
+
+        bets, replies = [], []
+        for color, taken in zip(state.colors, state.tickets):
+            if taken < len(state.ticket_values):
+                value, reply = self.reply_value(
+                    state.with_action(("B", color)), player, memo
+                )
+                bets.append(value - base)
+                replies.append(reply)
+            else:
+                bets.append(None)
+                replies.append(None)
+
+        roll -= base
+        best = max(
+            (i for i, value in enumerate(bets) if value is not None),
+            key=bets.__getitem__,
+            default=None,
+        )
+        if best is not None and bets[best] > roll:
+            action, color = "B", state.colors[best]
+        else:
+            action, color = "R", None
+        return TwoPlyResult(
+            state.colors, roll, tuple(bets), tuple(replies), action, color
+        )
+
+    def format_ev(self, result: EVResult) -> str:
+        """
+        Renders an evaluation as colored text for the terminal.
+
+        Args:
+            result (EVResult): The evaluation to render.
+        Returns:
+            str: A string describing the EV, probability of winning, and probability of being runner-up for each camel,
+                along with a recommendation for which camel to bet on.
+        """
+        ev_values_string = []
+        for camel in result.camels:
+            color = camel.color
+            if not camel.bet_available:
                 ev_values_string.append(
                     f"{self.color_dict[color.upper()]}{color}"
                     + (" " * (6 - len(color) + 1))
@@ -133,16 +493,41 @@ class EVBot:
                 )
                 continue
 
-            ev_values_string.append(
-                f"{self.color_dict[color.upper()]}{color}"
-                + (" " * (6 - len(color) + 1))
-                + f"- P(Winning): {prob_win:.2f}   P(Runner-Up): {prob_second:.2f}   EV: {ev_values[color]:.2f} {colorama.Fore.WHITE}\n"
-            )
+            if result.exact:
+                ev_values_string.append(
+                    f"{self.color_dict[color.upper()]}{color}"
+                    + (" " * (6 - len(color) + 1))
+                    + f"- P(Winning): {camel.prob_win:.2f}   P(Runner-Up): {camel.prob_second:.2f}   EV: {camel.ev:.2f} {colorama.Fore.WHITE}\n"
+                )
+            else:
+                ev_values_string.append(
+                    f"{self.color_dict[color.upper()]}{color}"
+                    + (" " * (6 - len(color) + 1))
+                    + f"- P(Winning): {camel.prob_win:.2f}±{camel.win_stderr:.2f}   P(Runner-Up): {camel.prob_second:.2f}±{camel.second_stderr:.2f}   EV: {camel.ev:.2f} {colorama.Fore.WHITE}\n"
+                )
 
-        if max_ev > 1:
+        if result.action == "B":
             ev_values_string.append(
-                f"\nYou should bet on {self.color_dict[max_ev_camel.upper()]}{max_ev_camel}."
+                f"\nYou should bet on {self.color_dict[result.color.upper()]}{result.color}."
             )
         else:
             ev_values_string.append("\nYou should roll.")
         return "".join(ev_values_string)
+
+    def calculate_ev(
+        self, time_budget: float = None, max_samples: int = None, seed=None
+    ) -> str:
+        """
+        Calculates the expected value (EV) of bets for each camel based on simulated game outcomes.
+
+        Args:
+            time_budget (float): The number of seconds to spend, or None for no time limit.
+            max_samples (int): The number of legs to sample at most, or None for no sample limit.
+            seed: The seed for sampling, or None to seed from the system.
+        Returns:
+            str: A string describing the EV, probability of winning, and probability of being runner-up for each camel,
+                along with a recommendation for which camel to bet on.
+        Raises:
+            ValueError: If max_samples is less than 1 or time_budget is negative.
+        """
+        return self.format_ev(self.evaluate(time_budget, max_samples, seed))
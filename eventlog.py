@@ -0,0 +1,323 @@
+from gamemanager import GameManager
+from gameevent import GameEvent
+from gamestate import GameState
+from snapshot import pack_game, unpack_game, unpack_state, record_struct
+from rules import Rules, DEFAULT_RULES
+from bisect import bisect_right
+import mmap
+import struct
+
+MAGIC = b"CUPLOG01"
+HEADER = struct.Struct("<8sBBBB")
+EVENT = struct.Struct("<BBbbbhh")
+KINDS = ("start", "checkpoint", "roll", "bet", "hint", "leg_end", "game_end")
+START, CHECKPOINT, ROLL, BET, HINT = range(5)
+
+
+def pack_header(rules: Rules) -> bytes:
+    """
+    Packs the header of a log, which records the shape of the rules so snapshots can be read back.
+
+    Args:
+        rules (Rules): The rules the games are played by.
+
+    Returns:
+        bytes: The header.
+    """
+    return HEADER.pack(
+        MAGIC,
+        len(rules.colors),
+        rules.track_length,
+        len(rules.faces),
+        len(rules.tickets),
+    )
+
+
+class EventLog:
+    """
+    An append-only binary log of games.
+
+    Each game starts with a snapshot of its opening position, followed by one fixed-size record per event that
+    GameManager.apply reports. A checkpoint snapshot is written at the start of every new leg, so EventArchive can
+    seek to any turn by replaying at most one leg. Games are expected to be logged one after another.
+    """
+
+    def __init__(self, path: str, rules: Rules = DEFAULT_RULES):
+        """
+        Opens a log for appending, writing the header if the file is new.
+
+        Args:
+            path (str): The log file.
+            rules (Rules): The rules the games are played by.
+
+        Raises:
+            ValueError: If the file is not an event log or was written under different rules.
+        """
+        self.rules = rules
+        self.index = {color: i for i, color in enumerate(rules.colors)}
+        self.file = open(path, "ab+")
+        self.file.seek(0)
+        header = self.file.read(HEADER.size)
+        if not header:
+            self.file.write(pack_header(rules))
+        elif header != pack_header(rules):
+            self.file.close()
+            raise ValueError(f"{path} is not an event log for these rules")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Flushes and closes the log.
+        """
+        self.file.close()
+
+    def start(self, game: GameManager) -> None:
+        """
+        Logs the opening position of a new game.
+
+        Args:
+            game (GameManager): The game, after init_camels.
+        """
+        self.file.write(bytes((START,)) + pack_game(game))
+
+    def record(self, game: GameManager, events: list[GameEvent]) -> None:
+        """
+        Logs the events of one action, and a checkpoint if they started a new leg.
+
+        Args:
+            game (GameManager): The game, after the action.
+            events (list[GameEvent]): The events GameManager.apply returned.
+        """
+        index = self.index
+        records = []
+        for event in events:
+            coins = event.coins or (0, 0)
+            records.append(
+                EVENT.pack(
+                    KINDS.index(event.kind),
+                    event.player,
+                    index[event.color.lower()] if event.color else -1,
+                    event.value,
+                    index[event.second.lower()] if event.second else -1,
+                    *coins,
+                )
+            )
+            if event.kind == "leg_end" and not game.over:
+                records.append(bytes((CHECKPOINT,)) + pack_game(game))
+        self.file.write(b"".join(records))
+
+
+class EventArchive:
+    """
+    A read-only, memory-mapped event log that replays games without any rendering.
+
+    Opening the archive scans the records once to find where each game and checkpoint starts. A turn is one action
+    (a roll, bet or hint), so turn 0 is the opening position.
+    """
+
+    def __init__(self, path: str, rules: Rules = DEFAULT_RULES):
+        """
+        Opens a log written by EventLog.
+
+        Args:
+            path (str): The log file.
+            rules (Rules): The rules the games were played by.
+
+        Raises:
+            ValueError: If the file is not an event log or was written under different rules.
+        """
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[: HEADER.size] != pack_header(rules):
+            raise ValueError(f"{path} is not an event log for these rules")
+        self.rules = rules
+        self.snapshot_size = record_struct(len(rules.colors)).size
+        self.checkpoints = []
+        self.lengths = []
+        data, offset, turn = self.data, HEADER.size, 0
+        while offset < len(data):
+            kind = data[offset]
+            if kind == START or kind == CHECKPOINT:
+                if kind == START:
+                    self.checkpoints.append(([], []))
+                    self.lengths.append(0)
+                    turn = 0
+                self.checkpoints[-1][0].append(turn)
+                self.checkpoints[-1][1].append(offset)
+                offset += 1 + self.snapshot_size
+            else:
+                if kind <= HINT:
+                    turn += 1
+                    self.lengths[-1] = turn
+                offset += EVENT.size
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def close(self) -> None:
+        """
+        Unmaps the log.
+        """
+        self.data.close()
+
+    def records(self, offset: int):
+        """
+        Walks the records of one game from a start or checkpoint record.
+
+        Args:
+            offset (int): The position of the start or checkpoint record.
+
+        Yields:
+            tuple[int, int]: The kind and position of each record, up to the start of the next game.
+        """
+        data = self.data
+        yield data[offset], offset
+        offset += 1 + self.snapshot_size
+        while offset < len(data):
+            kind = data[offset]
+            if kind == START:
+                return
+            yield kind, offset
+            offset += 1 + self.snapshot_size if kind == CHECKPOINT else EVENT.size
+
+    def events(self, game: int) -> list[GameEvent]:
+        """
+        Decodes every event of a game.
+
+        Args:
+            game (int): The index of the game in the log.
+
+        Returns:
+            list[GameEvent]: The events, as GameManager.apply reported them.
+        """
+        colors = self.rules.colors
+        events = []
+        for kind, offset in self.records(self.checkpoints[game][1][0]):
+            if kind <= CHECKPOINT:
+                continue
+            _, player, color, value, second, *coins = EVENT.unpack_from(
+                self.data, offset
+            )
+            events.append(
+                GameEvent(
+                    KINDS[kind],
+                    player,
+                    colors[color] if color >= 0 else "",
+                    value,
+                    colors[second] if second >= 0 else "",
+                    tuple(coins) if kind > HINT else (),
+                )
+            )
+        return events
+
+    def actions(self, game: int) -> list[tuple]:
+        """
+        Lists the actions of a game with the dice results made explicit, ready for GameManager.apply.
+
+        Args:
+            game (int): The index of the game in the log.
+
+        Returns:
+            list[tuple]: ("R", color, roll), ("B", color) and ("H",) actions, in order.
+        """
+        return [
+            (
+                ("R", event.color, event.value)
+                if event.kind == "roll"
+                else ("B", event.color) if event.kind == "bet" else ("H",)
+            )
+            for event in self.events(game)
+            if event.kind in KINDS[ROLL : HINT + 1]
+        ]
+
+    def replay(self, game: int, turn: int = None) -> GameState:
+        """
+        Rebuilds a game at a turn by loading the last checkpoint before it and re-applying at most one leg of actions
+        in a single GameState.with_actions.
+
+        Args:
+            game (int): The index of the game in the log.
+            turn (int): The number of actions to have been taken, or None for the end of the game.
+
+        Returns:
+            GameState: The state after turn actions.
+
+        Raises:
+            IndexError: If the game has fewer turns.
+        """
+        length = self.lengths[game]
+        turn = length if turn is None else turn
+        if not 0 <= turn <= length:
+            raise IndexError(f"Game {game} has {length} turns, not {turn}")
+        turns, offsets = self.checkpoints[game]
+        checkpoint = bisect_right(turns, turn) - 1
+        at, start = turns[checkpoint], offsets[checkpoint]
+        data, colors = self.data, self.rules.colors
+        state = unpack_state(data, start + 1, self.rules)
+        actions, offset = [], start + 1 + self.snapshot_size
+        for _ in range(turn - at):
+            kind = data[offset]
+            while kind > HINT:
+                offset += EVENT.size
+                kind = data[offset]
+            if kind == ROLL:
+                actions.append(("R", colors[data[offset + 2]], data[offset + 3]))
+            elif kind == BET:
+                actions.append(("B", colors[data[offset + 2]]))
+            else:
+                actions.append(("H",))
+            offset += EVENT.size
+        return state.with_actions(actions)
+
+    def reproduce(
+        self, game: int, names: tuple[str, str] = ("Player 1", "Player 2")
+    ) -> GameManager:
+        """
+        Replays a game from its opening position through GameManager.apply and checks every event matches the log.
+
+        Args:
+            game (int): The index of the game in the log.
+            names (tuple[str, str]): The names of the players.
+
+        Returns:
+            GameManager: The game at its last logged turn.
+
+        Raises:
+            RuntimeError: If the engine reports different events than were logged.
+        """
+        manager = unpack_game(
+            self.data, self.checkpoints[game][1][0] + 1, self.rules, names
+        )
+        logged = self.events(game)
+        replayed = []
+        for action in self.actions(game):
+            replayed.extend(
+                GameEvent(
+                    event.kind,
+                    event.player,
+                    event.color.lower(),
+                    event.value,
+                    event.second.lower(),
+                    event.coins,
+                )
+                for event in manager.apply(action)
+            )
+        if replayed != logged:
+            mismatch = next(
+                (
+                    i
+                    for i, pair in enumerate(zip(replayed, logged))
+                    if pair[0] != pair[1]
+                ),
+                min(len(replayed), len(logged)),
+            )
+            raise RuntimeError(
+                f"Game {game} diverges from the log at event {mismatch}: "
+                f"{replayed[mismatch:mismatch + 1]} != {logged[mismatch:mismatch + 1]}"
+            )
+        return manager
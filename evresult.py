@@ -0,0 +1,135 @@
+from dataclasses import dataclass, asdict
+
+
+@dataclass(frozen=True, slots=True)
+class CamelEV:
+    """
+    The leg odds and bet value of a single camel.
+    """
+
+    color: str
+    prob_win: float
+    prob_second: float
+    ev: float
+    bet_available: bool
+    win_stderr: float = 0.0
+    second_stderr: float = 0.0
+
+    def win_interval(self, z: float = 1.96) -> tuple[float, float]:
+        """
+        Get a confidence interval for the probability of this camel winning the leg.
+
+        Args:
+            z (float): The number of standard errors on either side, 1.96 for 95% confidence.
+
+        Returns:
+            tuple[float, float]: The lower and upper bounds, clipped to [0, 1].
+        """
+        return (
+            max(0.0, self.prob_win - z * self.win_stderr),
+            min(1.0, self.prob_win + z * self.win_stderr),
+        )
+
+    def second_interval(self, z: float = 1.96) -> tuple[float, float]:
+        """
+        Get a confidence interval for the probability of this camel finishing second in the leg.
+
+        Args:
+            z (float): The number of standard errors on either side, 1.96 for 95% confidence.
+
+        Returns:
+            tuple[float, float]: The lower and upper bounds, clipped to [0, 1].
+        """
+        return (
+            max(0.0, self.prob_second - z * self.second_stderr),
+            min(1.0, self.prob_second + z * self.second_stderr),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class EVResult:
+    """
+    The result of an EVBot evaluation: the odds of every camel and the recommended action.
+
+    samples is the number of leg scenarios the odds were computed over; exact is False when they were sampled.
+    """
+
+    camels: tuple[CamelEV, ...]
+    action: str
+    color: str = None
+    exact: bool = True
+    samples: int = 0
+
+    def __getitem__(self, color: str) -> CamelEV:
+        """
+        Look up the odds of a camel by color.
+
+        Args:
+            color (str): The color of the camel.
+
+        Returns:
+            CamelEV: The odds and bet value of that camel.
+        """
+        for camel in self.camels:
+            if camel.color == color:
+                return camel
+        raise KeyError(color)
+
+    def to_dict(self) -> dict:
+        """
+        Convert the result to plain Python types for serialization.
+
+        Returns:
+            dict: The result as nested dictionaries and lists.
+        """
+        return asdict(self)
+
+
+@dataclass(frozen=True, slots=True)
+class TwoPlyResult:
+    """
+    The result of EVBot.evaluate_two_ply: what rolling and each bet are worth once the opponent has replied.
+
+    Values are the expected change in the current player's lead in coins, counting the bets both players hold at
+    their expected payout. bets and replies follow colors, with None for camels that have no tickets left; replies
+    holds the opponent's best answer to each bet.
+    """
+
+    colors: tuple[str, ...]
+    roll: float
+    bets: tuple[float, ...]
+    replies: tuple[tuple, ...]
+    action: str
+    color: str = None
+
+    def to_dict(self) -> dict:
+        """
+        Convert the result to plain Python types for serialization.
+
+        Returns:
+            dict: The result as a dictionary.
+        """
+        return asdict(self)
+
+
+@dataclass(frozen=True, slots=True)
+class RaceOdds:
+    """
+    Monte Carlo estimates of which camel wins the whole race and which finishes last.
+    """
+
+    colors: tuple[str, ...]
+    prob_win: tuple[float, ...]
+    prob_lose: tuple[float, ...]
+    win_stderr: tuple[float, ...]
+    lose_stderr: tuple[float, ...]
+    samples: int
+
+    def to_dict(self) -> dict:
+        """
+        Convert the estimates to plain Python types for serialization.
+
+        Returns:
+            dict: The estimates as a dictionary of lists.
+        """
+        return asdict(self)
@@ -0,0 +1,33 @@
+from dataclasses import asdict, dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class GameEvent:
+    """
+    Something that happened when GameManager.apply stepped the game.
+
+    The fields used depend on the kind of event:
+        roll: color is the die rolled and value the number of spaces moved.
+        bet: color is the camel bet on and value the ticket taken.
+        hint: value is the number of coins paid.
+        leg_end: color and second are the leg's winning and second camels, and coins are the players' coins after
+            the leg was scored.
+        game_end: color and second are the race's winning and second camels, coins are the final scores, and value
+            is the index of the winning player.
+    """
+
+    kind: str
+    player: int
+    color: str = ""
+    value: int = 0
+    second: str = ""
+    coins: tuple[int, ...] = ()
+
+    def to_dict(self) -> dict:
+        """
+        Convert the event to plain Python types for serialization.
+
+        Returns:
+            dict: The event as a dictionary.
+        """
+        return asdict(self)
@@ -1,4 +1,8 @@
 from player import Player
+from gameevent import GameEvent
+from rng import GameRNG
+from tickets import TicketTents
+from rules import Rules, DEFAULT_RULES
 import random
 
 
@@ -7,38 +11,136 @@ class GameManager:
     Manages the state and rules of Camel Up.
     """
 
-    def __init__(self, Player1, Player2):
+    def __init__(
+        self,
+        Player1,
+        Player2,
+        debug: bool = False,
+        rng: GameRNG = None,
+        rules: Rules = DEFAULT_RULES,
+    ):
         """
         Initialize the GameManager with players and game state.
 
         Args:
             Player1 (Player): The first player.
             Player2 (Player): The second player.
+            debug (bool): Whether to check the camel position index against the board after every move.
+            rng (GameRNG): The random stream for setup and rolls, or None to use the global random module.
+            rules (Rules): The rules to play by. The players should be created with the same rules.
         """
-        self.colors = ["red", "green", "blue", "yellow", "purple"]
-        self.cards = {color: [5, 3, 2, 2] for color in self.colors}
+        self.rules = rules
+        self.colors = list(rules.colors)
+        self.cards = TicketTents(self.colors, values=rules.tickets)
         self.dice = {color: 0 for color in self.colors}
         self.current_player = Player1
-        self.board = [[] for _ in range(16)]
+        self.board = [[] for _ in range(rules.track_length)]
         self.player_scores = [0, 0]
         self.winning_camel = ""
         self.second_camel = ""
         self.over = False
         self.players = [Player1, Player2]
         self.player_names = [Player1.name, Player2.name]
+        self.debug = debug
+        self.rng = rng
+        self.reindex()
 
     def init_camels(self) -> list[list]:
         """
         Initialize the camels on the board at random positions.
         """
+        rng = random if self.rng is None else self.rng
         dice = self.colors.copy()
-        for _ in range(5):
-            pick = random.choice(dice)
+        spaces = list(range(self.rules.start_spaces))
+        for _ in range(len(self.colors)):
+            pick = rng.choice(dice)
             dice.remove(pick)
-            position = random.choice([0, 1, 2])
+            position = rng.choice(spaces)
             self.board[position].append(pick)
+        self.reindex()
         return self.board
 
+    def reindex(self) -> None:
+        """
+        Rebuild the camel position index and leader pointer from the board.
+
+        The index is kept up to date by move_camels. Direct edits to the board are noticed by index_valid at the start
+        of move_camels and calculate_leg_winners and reindexed automatically, so calling this by hand is only needed
+        to rebuild eagerly.
+        """
+        self.positions = {
+            camel: (space, height)
+            for space, stack in enumerate(self.board)
+            for height, camel in enumerate(stack)
+        }
+        self.leader = self.occupied_below(len(self.board))
+        self.indexed_board = self.board
+
+    def index_valid(self) -> bool:
+        """
+        Cheaply check the camel position index against the board: one lookup per camel and a count of the camels.
+
+        Returns:
+            bool: Whether every indexed camel is where the index says and no camel is missing from the index.
+        """
+        board = self.board
+        if board is not self.indexed_board:
+            return False
+        for camel, (space, height) in self.positions.items():
+            stack = board[space]
+            if height >= len(stack) or stack[height] != camel:
+                return False
+        return sum(map(len, board)) == len(self.positions)
+
+    def check_index(self) -> None:
+        """
+        Verify the camel position index and leader pointer against the board.
+
+        Raises:
+            RuntimeError: If the index is out of sync with the board.
+        """
+        positions, leader = self.positions, self.leader
+        self.reindex()
+        if positions != self.positions or leader != self.leader:
+            raise RuntimeError(
+                f"Camel index {positions}, leader {leader} does not match the board {self.board}"
+            )
+
+    def locate(self, camel: str) -> tuple[int, int]:
+        """
+        Find a camel on the board using the position index.
+
+        Args:
+            camel (str): The color of the camel.
+
+        Returns:
+            tuple[int, int]: The space and height of the camel, or None if it is not on the board.
+        """
+        position = (
+            self.positions.get(camel) if self.board is self.indexed_board else None
+        )
+        if position is not None:
+            stack = self.board[position[0]]
+            if position[1] < len(stack) and stack[position[1]] == camel:
+                return position
+        self.reindex()
+        return self.positions.get(camel)
+
+    def occupied_below(self, space: int) -> int:
+        """
+        Find the nearest occupied space below a space.
+
+        Args:
+            space (int): The space to search below.
+
+        Returns:
+            int: The highest occupied space lower than space, or -1 if there is none.
+        """
+        for i in range(space - 1, -1, -1):
+            if self.board[i]:
+                return i
+        return -1
+
     def move_camels(self, camel: str, roll: int) -> None:
         """
         Move the camels on the board according to the roll.
@@ -47,43 +149,65 @@ class GameManager:
             camel (str): The color of the camel to move.
             roll (int): The number of spaces to move the camel.
         """
-        for i, stack in enumerate(self.board):
-            if camel in stack:
-                camel_index = stack.index(camel)
-                moving_camels = stack[camel_index:]
-                self.board[i] = stack[:camel_index]
-                if i + roll >= len(self.board):
-                    self.over = True
-                    self.winning_camel = moving_camels[-1].upper()
-                    self.second_camel = (
-                        moving_camels[-2].upper()
-                        if len(moving_camels) > 1
-                        else next(
-                            (
-                                stack[-1].upper()
-                                for stack in reversed(self.board[:-1])
-                                if stack
-                            ),
-                            "",
-                        )
-                    )
-                else:
-                    self.board[i + roll].extend(moving_camels)
-                    self.calculate_leg_winners()
-                break
+        if not self.index_valid():
+            self.reindex()
+        position = self.locate(camel)
+        if position is None:
+            return
+        i, camel_index = position
+        stack = self.board[i]
+        moving_camels = stack[camel_index:]
+        self.board[i] = stack[:camel_index]
+        if i + roll >= len(self.board):
+            for moving_camel in moving_camels:
+                del self.positions[moving_camel]
+            self.leader = self.occupied_below(self.leader + 1)
+            behind = (
+                self.leader
+                if self.leader < len(self.board) - 1
+                else self.occupied_below(self.leader)
+            )
+            self.over = True
+            self.winning_camel = moving_camels[-1].upper()
+            self.second_camel = (
+                moving_camels[-2].upper()
+                if len(moving_camels) > 1
+                else self.board[behind][-1].upper() if behind >= 0 else ""
+            )
+        else:
+            target = self.board[i + roll]
+            for height, moving_camel in enumerate(moving_camels, len(target)):
+                self.positions[moving_camel] = (i + roll, height)
+            target.extend(moving_camels)
+            if i + roll > self.leader:
+                self.leader = i + roll
+            self.find_leaders()
+        if self.debug:
+            self.check_index()
 
     def calculate_leg_winners(self) -> None:
         """
         Calculate the winners based on the camel positions on the board.
         """
-        winning_camel_found = False
-        for i in range(15, 0, -1):
-            if len(self.board[i]) > 0:
-                if not winning_camel_found:
-                    self.winning_camel = self.board[i][-1]
-                    winning_camel_found = True
-                else:
-                    self.second_camel = self.board[i][-1]
+        if not self.index_valid():
+            self.reindex()
+        if self.debug:
+            self.check_index()
+        self.find_leaders()
+
+    def find_leaders(self) -> None:
+        """
+        Set the leg's winning and second camel from the leader pointer, scanning down only to the next occupied space.
+        Both are reset first, so a leg with no camel past the start or behind the leader has no winner or second, as
+        in compactboard.leaders.
+        """
+        board, leader = self.board, self.leader
+        self.winning_camel = self.second_camel = ""
+        if leader > 0:
+            self.winning_camel = board[leader][-1]
+            for i in range(leader - 1, 0, -1):
+                if board[i]:
+                    self.second_camel = board[i][-1]
                     break
 
     def update_score(self) -> None:
@@ -93,28 +217,192 @@ class GameManager:
         self.player_scores = [player.coins for player in self.players]
         for p, player in enumerate(self.players):
             for camel, bets in player.cards.items():
-                if camel == self.winning_camel:
+                if camel == self.winning_camel.lower():
                     self.player_scores[p] += sum(bets)
-                elif camel == self.second_camel:
+                elif camel == self.second_camel.lower():
                     self.player_scores[p] += len(bets)
                 else:
                     self.player_scores[p] -= len(bets)
 
     def leg_reset(self) -> None:
         """
-        Reset the leg of the game, including cards, dice, and player bets.
+        Reset the leg of the game, including cards, dice, and player bets, in place.
         """
-        self.cards = {
-            color: [5, 3, 2, 2]
-            for color in ["red", "green", "blue", "yellow", "purple"]
-        }
-        self.dice = {color: 0 for color in ["red", "green", "blue", "yellow", "purple"]}
+        if isinstance(self.cards, TicketTents):
+            self.cards.reset()
+        else:
+            self.cards = TicketTents(self.colors, values=self.rules.tickets)
+        for color in self.dice:
+            self.dice[color] = 0
         self.current_player = (
             self.players[1]
             if self.current_player == self.players[0]
             else self.players[0]
         )
         for player in self.players:
-            player.cards = {
-                color: [] for color in ["red", "green", "blue", "yellow", "purple"]
-            }
+            for bets in player.cards.values():
+                bets.clear()
+
+    @property
+    def turn(self) -> int:
+        """
+        The index of the player whose turn it is.
+        """
+        return self.players.index(self.current_player)
+
+    def switch_turn(self) -> None:
+        """
+        Pass the turn to the other player.
+        """
+        self.current_player = self.players[1 - self.turn]
+
+    def score_leg(self) -> None:
+        """
+        Pay out the leg's bets and store the new scores as the players' coins.
+        """
+        self.update_score()
+        for player, score in zip(self.players, self.player_scores):
+            player.coins = score
+
+    def winning_player(self) -> int:
+        """
+        Find the player with the most coins. Ties go to the second player.
+
+        Returns:
+            int: The index of the winning player.
+        """
+        return 0 if self.players[0].coins > self.players[1].coins else 1
+
+    def legal_actions(self) -> list[tuple]:
+        """
+        List the actions the current player can take.
+
+        Returns:
+            list[tuple]: ("R",) to roll, ("B", color) for each camel with tickets left, and ("H",) if the player can
+                pay for a hint. Empty once the game is over.
+        """
+        if self.over:
+            return []
+        actions = [("R",)]
+        cards = self.cards
+        if isinstance(cards, TicketTents):
+            actions.extend(
+                ("B", color) for color in self.colors if cards.remaining(color)
+            )
+        else:
+            actions.extend(("B", color) for color in self.colors if cards[color])
+        if self.current_player.coins > 0:
+            actions.append(("H",))
+        return actions
+
+    def apply(self, action: tuple) -> list[GameEvent]:
+        """
+        Take an action for the current player and advance the game, without any input or output.
+
+        Rolling and betting pass the turn; a hint keeps it. When the last die of a leg is rolled, the leg is scored
+        and reset, and the other player starts the next leg. When a camel crosses the finish line, the final leg is
+        scored and the game ends.
+
+        Args:
+            action (tuple): ("R",) to roll a random die, ("R", color, roll) to roll a chosen die and result, ("B",
+                color) to bet on a camel, or ("H",) to pay for a hint.
+
+        Returns:
+            list[GameEvent]: What happened, in order.
+
+        Raises:
+            ValueError: If the game is over or the action is not legal.
+            IndexError: If there are no tickets left for the chosen camel.
+        """
+        if self.over:
+            raise ValueError("The game is over")
+        player = self.turn
+        if action[0] == "R":
+            if len(action) == 3:
+                color, roll = action[1:]
+                if self.dice.get(color) != 0 or roll not in self.rules.faces:
+                    raise ValueError(f"Cannot roll {roll} on the {color} die")
+                self.current_player.coins += 1
+            else:
+                color, roll = self.current_player.roll(
+                    [color for color in self.colors if self.dice[color] == 0],
+                    self.rng,
+                    self.rules.faces,
+                )
+            self.dice[color] = roll
+            self.move_camels(color, roll)
+            events = [GameEvent("roll", player, color, roll)]
+            if self.over:
+                self.score_leg()
+                coins = tuple(player.coins for player in self.players)
+                winner, second = self.winning_camel.lower(), self.second_camel.lower()
+                events.append(GameEvent("leg_end", player, winner, 0, second, coins))
+                events.append(
+                    GameEvent(
+                        "game_end", player, winner, self.winning_player(), second, coins
+                    )
+                )
+            elif all(self.dice.values()):
+                self.calculate_leg_winners()
+                self.score_leg()
+                events.append(
+                    GameEvent(
+                        "leg_end",
+                        player,
+                        self.winning_camel,
+                        0,
+                        self.second_camel,
+                        tuple(player.coins for player in self.players),
+                    )
+                )
+                self.leg_reset()
+            else:
+                self.switch_turn()
+            return events
+        if action[0] == "B":
+            color = action[1]
+            if color not in self.cards:
+                raise ValueError(f"Unknown camel {color!r}")
+            self.cards = self.current_player.take_bet(color, self.cards)
+            ticket = self.current_player.cards[color][-1]
+            self.switch_turn()
+            return [GameEvent("bet", player, color, ticket)]
+        if action[0] == "H":
+            if self.current_player.coins <= 0:
+                raise ValueError("Not enough coins for a hint")
+            self.current_player.coins -= 1
+            return [GameEvent("hint", player, value=1)]
+        raise ValueError(f"Unknown action {action!r}")
+
+    def to_bytes(self) -> bytes:
+        """
+        Pack the game into a fixed-size binary snapshot (see snapshot.pack_game).
+
+        Returns:
+            bytes: The snapshot. Player names and the rules are not included.
+        """
+        from snapshot import pack_game
+
+        return pack_game(self)
+
+    @classmethod
+    def from_bytes(
+        cls,
+        data,
+        rules: Rules = DEFAULT_RULES,
+        names: tuple[str, str] = ("Player 1", "Player 2"),
+    ) -> "GameManager":
+        """
+        Build a game from a snapshot made by to_bytes.
+
+        Args:
+            data: The snapshot.
+            rules (Rules): The rules the game was played by.
+            names (tuple[str, str]): The names of the players.
+
+        Returns:
+            GameManager: A new game manager with new players.
+        """
+        from snapshot import unpack_game
+
+        return unpack_game(data, 0, rules, names)
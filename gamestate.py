@@ -0,0 +1,431 @@
+from gamemanager import GameManager
+from player import Player
+from compactboard import (
+    TRACK_LENGTH,
+    encode_board,
+    decode_board,
+    move,
+    leaders,
+    count_leg_outcomes,
+    count_leg_scenarios,
+)
+from rng import GameRNG
+from tickets import TicketTents
+from rules import Rules, DEFAULT_RULES
+from dataclasses import dataclass
+import random
+
+OUTCOMES = DEFAULT_RULES.faces
+TICKET_VALUES = DEFAULT_RULES.tickets
+
+
+@dataclass(frozen=True, slots=True)
+class GameState:
+    """
+    An immutable snapshot of a two-player game that search code can step through without copying.
+
+    Every field is a tuple, so with_action builds the next state by replacing only the fields an action touches and
+    sharing the rest with its parent. Undoing a move is just keeping a reference to the previous state. States are
+    hashable and can key a transposition table.
+    """
+
+    colors: tuple[str, ...]
+    board: tuple
+    dice: tuple[int, ...]
+    tickets: tuple[int, ...]
+    coins: tuple[int, ...]
+    bets: tuple[tuple[tuple[int, ...], ...], ...]
+    turn: int = 0
+    winner: int = -1
+    second: int = -1
+    track_length: int = TRACK_LENGTH
+    faces: tuple[int, ...] = OUTCOMES
+    ticket_values: tuple[int, ...] = TICKET_VALUES
+
+    @property
+    def over(self) -> bool:
+        """
+        Whether a camel has crossed the finish line.
+        """
+        return self.winner >= 0
+
+    @property
+    def rules(self) -> Rules:
+        """
+        The rules this state is played by.
+        """
+        return Rules(self.colors, self.track_length, self.faces, self.ticket_values)
+
+    @classmethod
+    def from_game(cls, game: GameManager) -> "GameState":
+        """
+        Capture the state of a GameManager.
+
+        Args:
+            game (GameManager): The game manager instance containing the current game state.
+
+        Returns:
+            GameState: The captured state.
+
+        Raises:
+            ValueError: If a ticket stack is not what is left of the rules' tickets after taking from the top.
+        """
+        colors = tuple(game.colors)
+        ticket_values = game.rules.tickets
+        cards = game.cards
+        if (
+            isinstance(cards, TicketTents)
+            and cards.colors == colors
+            and cards.values == ticket_values
+        ):
+            tickets = cards.taken
+        else:
+            tickets = []
+            for color in colors:
+                taken = len(ticket_values) - len(cards[color])
+                if tuple(cards[color]) != ticket_values[taken:]:
+                    raise ValueError(f"Unexpected {color} tickets {cards[color]}")
+                tickets.append(taken)
+        winner = second = -1
+        if game.over:
+            winner = colors.index(game.winning_camel.lower())
+            if game.second_camel:
+                second = colors.index(game.second_camel.lower())
+        return cls(
+            colors,
+            encode_board(game.board, colors),
+            tuple(game.dice[color] for color in colors),
+            tuple(tickets),
+            tuple(player.coins for player in game.players),
+            tuple(
+                tuple(tuple(player.cards[color]) for color in colors)
+                for player in game.players
+            ),
+            game.turn,
+            winner,
+            second,
+            len(game.board),
+            game.rules.faces,
+            ticket_values,
+        )
+
+    def to_game(self, names: tuple[str, str] = ("Player 1", "Player 2")) -> GameManager:
+        """
+        Build a GameManager in this state.
+
+        Args:
+            names (tuple[str, str]): The names of the players.
+
+        Returns:
+            GameManager: A new game manager with new players.
+        """
+        rules = self.rules
+        game = GameManager(
+            Player(names[0], rules), Player(names[1], rules), rules=rules
+        )
+        game.board = decode_board(self.board, self.colors, self.track_length)
+        game.dice = dict(zip(self.colors, self.dice))
+        game.cards = TicketTents(self.colors, self.tickets, self.ticket_values)
+        for player, coins, bets in zip(game.players, self.coins, self.bets):
+            player.coins = coins
+            player.cards = {
+                color: list(tickets) for color, tickets in zip(self.colors, bets)
+            }
+        game.current_player = game.players[self.turn]
+        if self.over:
+            game.over = True
+            game.winning_camel = self.colors[self.winner].upper()
+            game.second_camel = (
+                self.colors[self.second].upper() if self.second >= 0 else ""
+            )
+        else:
+            game.reindex()
+            game.calculate_leg_winners()
+        return game
+
+    def legal_actions(self) -> list[tuple]:
+        """
+        List the actions the current player can take, in the format of GameManager.legal_actions.
+
+        Returns:
+            list[tuple]: The legal actions. Empty once the game is over.
+        """
+        if self.over:
+            return []
+        actions = [("R",)]
+        actions.extend(
+            ("B", color)
+            for color, taken in zip(self.colors, self.tickets)
+            if taken < len(self.ticket_values)
+        )
+        if self.coins[self.turn] > 0:
+            actions.append(("H",))
+        return actions
+
+    def roll_outcomes(self) -> list[tuple[float, tuple]]:
+        """
+        List every die and face a roll can produce, for expanding a chance node.
+
+        Returns:
+            list[tuple[float, tuple]]: The probability of each outcome and the explicit ("R", color, roll) action.
+        """
+        unrolled = [color for color, roll in zip(self.colors, self.dice) if roll == 0]
+        probability = 1 / (len(unrolled) * len(self.faces))
+        return [
+            (probability, ("R", color, roll))
+            for color in unrolled
+            for roll in self.faces
+        ]
+
+    def with_action(self, action: tuple, rng: GameRNG = None) -> "GameState":
+        """
+        Take an action for the current player, following the rules of GameManager.apply.
+
+        Args:
+            action (tuple): ("R",) to roll a random die, ("R", color, roll) to roll a chosen die and result, ("B",
+                color) to bet on a camel, or ("H",) to pay for a hint.
+            rng (GameRNG): The random stream used for ("R",), or None to use the global random module.
+
+        Returns:
+            GameState: The next state. This state is left unchanged.
+
+        Raises:
+            ValueError: If the game is over or the action is not legal.
+            IndexError: If there are no tickets left for the chosen camel.
+        """
+        if self.over:
+            raise ValueError("The game is over")
+        turn = self.turn
+        if action[0] == "R":
+            if len(action) == 3:
+                camel, roll = self.colors.index(action[1]), action[2]
+                if self.dice[camel] or roll not in self.faces:
+                    raise ValueError(f"Cannot roll {roll} on the {action[1]} die")
+            else:
+                unrolled = [c for c, roll in enumerate(self.dice) if roll == 0]
+                if rng is None:
+                    camel, roll = random.choice(unrolled), random.choice(self.faces)
+                else:
+                    die, face = rng.draw(len(unrolled), len(self.faces))
+                    camel, roll = unrolled[die], self.faces[face]
+            coins = list(self.coins)
+            coins[turn] += 1
+            dice = self.dice[:camel] + (roll,) + self.dice[camel + 1 :]
+            board, winner, second = move(self.board, camel, roll, self.track_length)
+            if winner >= 0:
+                return GameState(
+                    self.colors,
+                    board,
+                    dice,
+                    self.tickets,
+                    self.score_leg(coins, winner, second),
+                    self.bets,
+                    turn,
+                    winner,
+                    second,
+                    self.track_length,
+                    self.faces,
+                    self.ticket_values,
+                )
+            if all(dice):
+                empty = ((),) * len(self.colors)
+                return GameState(
+                    self.colors,
+                    board,
+                    (0,) * len(self.colors),
+                    (0,) * len(self.colors),
+                    self.score_leg(coins, *leaders(board, self.track_length)),
+                    (empty,) * len(self.bets),
+                    1 - turn,
+                    -1,
+                    -1,
+                    self.track_length,
+                    self.faces,
+                    self.ticket_values,
+                )
+            return GameState(
+                self.colors,
+                board,
+                dice,
+                self.tickets,
+                tuple(coins),
+                self.bets,
+                1 - turn,
+                -1,
+                -1,
+                self.track_length,
+                self.faces,
+                self.ticket_values,
+            )
+        if action[0] == "B":
+            if action[1] not in self.colors:
+                raise ValueError(f"Unknown camel {action[1]!r}")
+            camel = self.colors.index(action[1])
+            taken = self.tickets[camel]
+            if taken >= len(self.ticket_values):
+                raise IndexError(f"There are no {action[1]} tickets left")
+            player_bets = self.bets[turn]
+            player_bets = (
+                player_bets[:camel]
+                + (player_bets[camel] + (self.ticket_values[taken],),)
+                + player_bets[camel + 1 :]
+            )
+            return GameState(
+                self.colors,
+                self.board,
+                self.dice,
+                self.tickets[:camel] + (taken + 1,) + self.tickets[camel + 1 :],
+                self.coins,
+                self.bets[:turn] + (player_bets,) + self.bets[turn + 1 :],
+                1 - turn,
+                -1,
+                -1,
+                self.track_length,
+                self.faces,
+                self.ticket_values,
+            )
+        if action[0] == "H":
+            if self.coins[turn] <= 0:
+                raise ValueError("Not enough coins for a hint")
+            coins = self.coins[:turn] + (self.coins[turn] - 1,) + self.coins[turn + 1 :]
+            return GameState(
+                self.colors,
+                self.board,
+                self.dice,
+                self.tickets,
+                coins,
+                self.bets,
+                turn,
+                -1,
+                -1,
+                self.track_length,
+                self.faces,
+                self.ticket_values,
+            )
+        raise ValueError(f"Unknown action {action!r}")
+
+    def with_actions(self, actions: list[tuple]) -> "GameState":
+        """
+        Take several explicit actions in a row, as with_action would one at a time, but build only the final state.
+        Replaying a logged leg this way skips every intermediate GameState.
+
+        Args:
+            actions (list[tuple]): ("R", color, roll), ("B", color) and ("H",) actions, in order.
+
+        Returns:
+            GameState: The state after every action. This state is left unchanged.
+
+        Raises:
+            ValueError: If the game ends before the last action, or an action is not legal or not explicit.
+            IndexError: If there are no tickets left for a chosen camel.
+        """
+        if not actions:
+            return self
+        colors, faces, values = self.colors, self.faces, self.ticket_values
+        board, turn, winner, second = self.board, self.turn, self.winner, self.second
+        dice, tickets, coins = list(self.dice), list(self.tickets), list(self.coins)
+        bets = [list(player_bets) for player_bets in self.bets]
+        for action in actions:
+            if winner >= 0:
+                raise ValueError("The game is over")
+            if action[0] == "R":
+                if len(action) != 3:
+                    raise ValueError("Only explicit rolls can be taken in a batch")
+                camel, roll = colors.index(action[1]), action[2]
+                if dice[camel] or roll not in faces:
+                    raise ValueError(f"Cannot roll {roll} on the {action[1]} die")
+                coins[turn] += 1
+                dice[camel] = roll
+                board, winner, second = move(board, camel, roll, self.track_length)
+                if winner >= 0:
+                    coins = list(self.score_leg(coins, winner, second, bets))
+                    continue
+                if all(dice):
+                    leg = leaders(board, self.track_length)
+                    coins = list(self.score_leg(coins, *leg, bets))
+                    dice, tickets = [0] * len(colors), [0] * len(colors)
+                    bets = [[()] * len(colors) for _ in bets]
+                turn = 1 - turn
+            elif action[0] == "B":
+                if action[1] not in colors:
+                    raise ValueError(f"Unknown camel {action[1]!r}")
+                camel = colors.index(action[1])
+                if tickets[camel] >= len(values):
+                    raise IndexError(f"There are no {action[1]} tickets left")
+                bets[turn][camel] += (values[tickets[camel]],)
+                tickets[camel] += 1
+                turn = 1 - turn
+            elif action[0] == "H":
+                if coins[turn] <= 0:
+                    raise ValueError("Not enough coins for a hint")
+                coins[turn] -= 1
+            else:
+                raise ValueError(f"Unknown action {action!r}")
+        return GameState(
+            colors,
+            board,
+            tuple(dice),
+            tuple(tickets),
+            tuple(coins),
+            tuple(tuple(player_bets) for player_bets in bets),
+            turn,
+            winner,
+            second,
+            self.track_length,
+            faces,
+            values,
+        )
+
+    def score_leg(
+        self, coins: list[int], winner: int, second: int, bets: list = None
+    ) -> tuple[int, ...]:
+        """
+        Pay out the leg's bets, following GameManager.update_score.
+
+        Args:
+            coins (list[int]): The players' coins before scoring.
+            winner (int): The index of the leg's winning camel, or -1.
+            second (int): The index of the leg's second camel, or -1.
+            bets (list): The bets to pay out, laid out like the bets field, or None for this state's bets.
+
+        Returns:
+            tuple[int, ...]: The players' coins after scoring.
+        """
+        scores = list(coins)
+        for p, player_bets in enumerate(self.bets if bets is None else bets):
+            for camel, tickets in enumerate(player_bets):
+                if camel == winner:
+                    scores[p] += sum(tickets)
+                elif camel == second:
+                    scores[p] += len(tickets)
+                else:
+                    scores[p] -= len(tickets)
+        return tuple(scores)
+
+    def expected_payouts(self, memo: dict = None) -> tuple[float, ...]:
+        """
+        Value the bets each player holds by exact counts of the rest of the leg.
+
+        Args:
+            memo (dict): Leg subtree counts to share between calls, as in compactboard.count_leg_outcomes.
+
+        Returns:
+            tuple[float, ...]: The expected payout of each player's bets, 0 for a player with none.
+        """
+        if self.over or not any(any(bets) for bets in self.bets):
+            return (0.0,) * len(self.bets)
+        dice = tuple(c for c, roll in enumerate(self.dice) if roll == 0)
+        wins, seconds = count_leg_outcomes(
+            self.board, dice, self.faces, self.track_length, memo
+        )
+        total = count_leg_scenarios(len(dice), len(self.faces))
+        return tuple(
+            sum(
+                wins[c] * sum(tickets)
+                + (2 * seconds[c] + wins[c] - total) * len(tickets)
+                for c, tickets in enumerate(bets)
+                if tickets
+            )
+            / total
+            for bets in self.bets
+        )
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+
+class LegCache:
+    """
+    A bounded cache of leg outcomes with least-recently-used eviction.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        """
+        Initializes an empty cache.
+
+        Args:
+            capacity (int): The maximum number of entries to keep.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def get(self, key):
+        """
+        Looks up an entry and marks it as the most recently used.
+
+        Args:
+            key: The board and remaining dice key.
+        Returns:
+            The cached value, or None on a miss.
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        """
+        Stores an entry, evicting the least recently used entry if the cache is full.
+
+        Args:
+            key: The board and remaining dice key.
+            value: The value to cache.
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Removes every entry and resets the statistics.
+        """
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """
+        Reports how well the cache is doing.
+
+        Returns:
+            dict: The hits, misses, evictions, hit rate, current size and capacity of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.entries),
+            "capacity": self.capacity,
+        }
@@ -0,0 +1,236 @@
+from compactboard import TRACK_LENGTH, count_leg_outcomes, count_leg_scenarios
+from rules import Rules, DEFAULT_RULES
+from itertools import combinations, combinations_with_replacement
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b"CUPLEG1\0"
+HEADER = struct.Struct("<8sBBBxI")
+KEY = struct.Struct("<Q")
+MAX_TRACK_LENGTH = 16
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "legtable.bin")
+_default_table = None
+
+
+def pack_key(
+    board: tuple, dice: tuple[int, ...], track_length: int = TRACK_LENGTH
+) -> int:
+    """
+    Packs a canonical board and its unrolled dice into a table key.
+
+    Args:
+        board (tuple): A canonical compact board (see compactboard.canonicalize).
+        dice (tuple[int, ...]): The canonical indices of the unrolled dice.
+        track_length (int): The number of spaces on the board, at most MAX_TRACK_LENGTH.
+
+    Returns:
+        int: The key, or -1 if the board has a camel off the board or outside the packed range.
+    """
+    key = 0
+    for space, height in board:
+        if not (0 <= space < track_length and 0 <= height < 8):
+            return -1
+        key = key << 7 | space << 3 | height
+    for camel in dice:
+        key |= 1 << camel << 7 * len(board)
+    return key
+
+
+def canonical_boards(num_camels: int = 5, track_length: int = TRACK_LENGTH):
+    """
+    Generates every canonical board: each way of stacking num_camels interchangeable camels on the track.
+
+    Args:
+        num_camels (int): The number of camels.
+        track_length (int): The number of spaces on the board.
+
+    Yields:
+        tuple: A canonical compact board, camels sorted by (space, height).
+    """
+    for spaces in combinations_with_replacement(range(track_length), num_camels):
+        board = []
+        for i, space in enumerate(spaces):
+            height = board[-1][1] + 1 if i and spaces[i - 1] == space else 0
+            board.append((space, height))
+        yield tuple(board)
+
+
+def count_board_entries(
+    board: tuple, max_dice: int, rules: Rules = DEFAULT_RULES
+) -> list[tuple]:
+    """
+    Counts the leg outcomes of one board for every set of up to max_dice unrolled dice.
+
+    Args:
+        board (tuple): A canonical compact board.
+        max_dice (int): The largest number of unrolled dice to tabulate.
+        rules (Rules): The rules that give the track length and die faces.
+
+    Returns:
+        list[tuple]: One (key, win counts, second place counts) entry per set of dice.
+    """
+    entries, memo = [], {}
+    for num_dice in range(1, max_dice + 1):
+        for dice in combinations(range(len(board)), num_dice):
+            wins, seconds = count_leg_outcomes(
+                board, dice, rules.faces, rules.track_length, memo
+            )
+            entries.append((pack_key(board, dice, rules.track_length), wins, seconds))
+    return entries
+
+
+def build_table(
+    path: str = DEFAULT_PATH,
+    max_dice: int = 3,
+    boards=None,
+    parallel=None,
+    rules: Rules = DEFAULT_RULES,
+) -> int:
+    """
+    Enumerates the leg outcomes of every canonical board with up to max_dice dice left and writes them to a table.
+
+    The file is a fixed header, the sorted keys as little-endian uint64, then the win and second place counts of
+    each key as uint8, in key order.
+
+    Args:
+        path (str): The file to write.
+        max_dice (int): The largest number of unrolled dice to tabulate (at most 3, so counts fit in a byte).
+        boards: The canonical boards to tabulate. Defaults to every canonical board.
+        parallel (ParallelEngine): A worker pool to spread the boards across, or None to count here.
+        rules (Rules): The rules to count under. The track may be at most MAX_TRACK_LENGTH spaces.
+
+    Returns:
+        int: The number of entries written.
+    """
+    if not 1 <= max_dice <= 3:
+        raise ValueError("max_dice must be between 1 and 3")
+    if rules.track_length > MAX_TRACK_LENGTH:
+        raise ValueError(
+            f"Leg table keys hold at most {MAX_TRACK_LENGTH} spaces, got {rules.track_length}"
+        )
+    num_camels = len(rules.colors)
+    if boards is None:
+        boards = canonical_boards(num_camels, rules.track_length)
+    boards = list(boards)
+    if parallel is not None:
+        results = parallel.map(
+            count_board_entries,
+            boards,
+            [max_dice] * len(boards),
+            [rules] * len(boards),
+        )
+    else:
+        results = (count_board_entries(board, max_dice, rules) for board in boards)
+    entries = sorted(entry for result in results for entry in result)
+    num_camels = len(boards[0]) if boards else num_camels
+    with open(path, "wb") as file:
+        file.write(
+            HEADER.pack(
+                MAGIC, num_camels, rules.track_length, len(rules.faces), len(entries)
+            )
+        )
+        file.write(b"".join(KEY.pack(key) for key, _, _ in entries))
+        file.write(b"".join(bytes(wins + seconds) for _, wins, seconds in entries))
+    return len(entries)
+
+
+class LegTable:
+    """
+    A read-only, memory-mapped table of leg outcomes for boards with only a few dice left to roll.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """
+        Opens a table written by build_table. Nothing is parsed beyond the header.
+
+        Args:
+            path (str): The table file.
+        """
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.num_camels, self.track_length, self.num_faces, self.count = (
+            HEADER.unpack_from(self.data)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a leg table")
+        self.values_offset = HEADER.size + KEY.size * self.count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        """
+        Unmaps the table.
+        """
+        self.data.close()
+
+    def get(
+        self, board: tuple, dice: tuple[int, ...]
+    ) -> tuple[tuple[int, ...], tuple[int, ...], int]:
+        """
+        Looks up the outcomes of a canonical board by binary search over the mapped keys.
+
+        Args:
+            board (tuple): A canonical compact board.
+            dice (tuple[int, ...]): The canonical indices of the unrolled dice.
+
+        Returns:
+            tuple[tuple[int, ...], tuple[int, ...], int]: The win and second place counts per canonical index and
+                the number of scenarios they were counted over, or None if the state is not in the table.
+        """
+        key = (
+            pack_key(board, dice, self.track_length)
+            if len(board) == self.num_camels
+            else -1
+        )
+        if key < 0:
+            return None
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.data, HEADER.size + KEY.size * middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if (
+            low == self.count
+            or KEY.unpack_from(self.data, HEADER.size + KEY.size * low)[0] != key
+        ):
+            return None
+        offset = self.values_offset + 2 * self.num_camels * low
+        counts = tuple(self.data[offset : offset + 2 * self.num_camels])
+        return (
+            counts[: self.num_camels],
+            counts[self.num_camels :],
+            count_leg_scenarios(len(dice), self.num_faces),
+        )
+
+
+def default_table() -> LegTable:
+    """
+    Opens the table at DEFAULT_PATH once per process.
+
+    Returns:
+        LegTable: The default table, or None if it has not been built.
+    """
+    global _default_table
+    if _default_table is None and os.path.exists(DEFAULT_PATH):
+        _default_table = LegTable(DEFAULT_PATH)
+    return _default_table
+
+
+def main() -> None:
+    """
+    Build the default table, or the table named on the command line.
+    """
+    from parallelengine import ParallelEngine
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    with ParallelEngine() as parallel:
+        print(f"Wrote {build_table(path, parallel=parallel)} entries to {path}")
+
+
+if __name__ == "__main__":
+    main()
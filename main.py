@@ -2,12 +2,93 @@ from gamemanager import GameManager
 from playgame import PlayGame
 from player import Player
 from mainmenu import MainMenu
+from eventlog import EventLog
+from agents import AGENTS, make_agent
+from tournament import run_tournament
+from parallelengine import ParallelEngine
+import argparse
+import os
+import time
 
 
-def main() -> None:
+def tournament(args: argparse.Namespace) -> None:
+    """
+    Play two agents against each other and print the results as they come in.
+
+    Args:
+        args (argparse.Namespace): The parsed tournament command line.
+    """
+    names = tuple(args.agents)
+    workers = args.workers or os.cpu_count() or 1
+
+    def progress(stats) -> None:
+        print(
+            f"\r{stats.games}/{args.games} games, {names[0]} win rate {stats.score.mean:.3f}",
+            end="",
+            flush=True,
+        )
+
+    start = time.perf_counter()
+    with ParallelEngine(workers) as parallel:
+        stats = run_tournament(
+            names,
+            args.games,
+            args.seed,
+            parallel if workers > 1 else None,
+            args.time_limit,
+            progress,
+        )
+    print()
+    print(stats.report(time.perf_counter() - start, workers))
+
+
+def main(argv: list[str] = None) -> None:
     """
     Main function to initialize and run the game loop.
+
+    Args:
+        argv (list[str]): The command line arguments, or None to read sys.argv.
     """
+    parser = argparse.ArgumentParser(description="Play Camel Up in the terminal.")
+    parser.add_argument(
+        "--log", metavar="PATH", help="append the game to an event log at PATH"
+    )
+    for seat in ("--player1", "--player2"):
+        parser.add_argument(
+            seat,
+            choices=["human", *AGENTS],
+            default="human",
+            help="who plays this seat (default: human)",
+        )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        help="seconds a search agent may think per move (default: 1, or 0.1 in a tournament)",
+    )
+    commands = parser.add_subparsers(dest="command")
+    matches = commands.add_parser(
+        "tournament", help="play two bots against each other across worker processes"
+    )
+    matches.add_argument("agents", nargs=2, choices=list(AGENTS), metavar="AGENT")
+    matches.add_argument(
+        "--games", type=int, default=100, help="number of games (default: 100)"
+    )
+    matches.add_argument(
+        "--seed", type=int, default=0, help="seed of the game schedule (default: 0)"
+    )
+    matches.add_argument(
+        "--workers", type=int, help="worker processes (default: one per CPU)"
+    )
+    args = parser.parse_args(argv)
+    if args.command == "tournament":
+        if args.time_limit is None:
+            args.time_limit = 0.1
+        tournament(args)
+        return
+    if args.time_limit is None:
+        args.time_limit = 1.0
+    agents = [make_agent(args.player1, args.time_limit)]
+    agents.append(make_agent(args.player2, args.time_limit))
     menu = MainMenu()
 
     while True:
@@ -19,17 +100,31 @@ def main() -> None:
             game = GameManager(Player1=Player(player1), Player2=Player(player2))
             play_game = PlayGame(game)
             game.init_camels()
-            og_coins = [game.players[0].coins, game.players[1].coins]
+            log = EventLog(args.log) if args.log else None
+            if log:
+                log.start(game)
             while not game.over:
-                play_game.display_game()
-                play_game.take_turn()
-                if play_game.num_dice_rolled == 5:
-                    play_game.num_dice_rolled = 0
-                    game.calculate_leg_winners()
-                    play_game.display_leg_results(og_coins)
-                    og_coins = [game.players[0].coins, game.players[1].coins]
-                    game.leg_reset()
+                agent = agents[game.turn]
+                if agent is None:
+                    events = play_game.take_turn()
+                else:
+                    action = agent.choose(game)
+                    events = play_game.take_turn(
+                        action[0], action[1] if action[0] == "B" else None, True
+                    )
+                if log:
+                    log.record(game, events)
+            if log:
+                log.close()
             play_game.game_over()
+            for name, agent in zip(game.player_names, agents):
+                if agent is not None and agent.stats():
+                    print(
+                        f"{name}: "
+                        + ", ".join(
+                            f"{key} {value:.4g}" for key, value in agent.stats().items()
+                        )
+                    )
             break
 
         elif choice == 2:
@@ -0,0 +1,200 @@
+from compactboard import TRACK_LENGTH
+from itertools import permutations, product
+from math import factorial
+import numpy as np
+
+
+def enumerate_scenarios(
+    dice: tuple[int, ...], outcomes: list[int]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Lays out every roll order and face combination of the remaining dice as integer arrays.
+
+    Args:
+        dice (tuple[int, ...]): The indices of the camels whose dice have not been rolled.
+        outcomes (list[int]): The faces of a die.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The camel moved and the roll at each step, one row per scenario.
+    """
+    orders = np.array(list(permutations(dice)), dtype=np.int8).reshape(
+        factorial(len(dice)), len(dice)
+    )
+    faces = np.array(list(product(outcomes, repeat=len(dice))), dtype=np.int8).reshape(
+        len(outcomes) ** len(dice), len(dice)
+    )
+    return (
+        np.repeat(orders, len(faces), axis=0),
+        np.tile(faces, (len(orders), 1)),
+    )
+
+
+def advance(
+    spaces: np.ndarray,
+    heights: np.ndarray,
+    camel: np.ndarray,
+    roll: np.ndarray,
+    active: np.ndarray,
+    track_length: int = TRACK_LENGTH,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Moves one camel, and every camel stacked on top of it, on each active board, following GameManager.move_camels.
+
+    Boards are stored camel-major: row c of spaces and heights holds camel c on every board, so per-board reductions
+    over the camels are a handful of whole-row operations. Boards where the move crosses the finish line are left
+    in place so the caller can read off the finishing stack.
+
+    Args:
+        spaces (np.ndarray): The space of every camel, one row per camel and one column per board.
+        heights (np.ndarray): The height of every camel in its stack, laid out like spaces.
+        camel (np.ndarray): The camel to move on each board.
+        roll (np.ndarray): The number of spaces to move on each board.
+        active (np.ndarray): Which boards to move.
+        track_length (int): The number of spaces on the board.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The new spaces and heights, the camels that moved (or
+            would have moved past the finish line), and the boards whose move crossed the finish line.
+    """
+    columns = np.arange(len(camel))
+    space = spaces[camel, columns]
+    height = heights[camel, columns]
+    target = space + roll
+    valid = active & (space >= 0)
+    moving = (spaces == space) & (heights >= height) & valid
+    finishing = valid & (target >= track_length)
+    landing = moving & ~finishing
+    base = (spaces == target).sum(axis=0, dtype=spaces.dtype)
+    spaces = np.where(landing, target, spaces)
+    heights = np.where(landing, heights + (base - height), heights)
+    return spaces, heights, moving, finishing
+
+
+def finish_places(
+    spaces: np.ndarray,
+    heights: np.ndarray,
+    moving: np.ndarray,
+    track_length: int = TRACK_LENGTH,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the winning and second camel on boards where a move crossed the finish line, following compactboard.move.
+
+    Args:
+        spaces (np.ndarray): The spaces returned by advance, with the finishing stack left in place.
+        heights (np.ndarray): The heights returned by advance.
+        moving (np.ndarray): The camels that moved, as returned by advance.
+        track_length (int): The number of spaces on the board.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The winning and second camel on every board (-1 if there is no second camel).
+            Only the boards whose move finished are meaningful.
+    """
+    columns = np.arange(spaces.shape[1])
+    rank = np.where(moving, heights, -1)
+    top = rank.argmax(axis=0)
+    rank[top, columns] = -1
+    below = rank.argmax(axis=0)
+    stacked = rank[below, columns] >= 0
+    behind = np.where(
+        ~moving & (spaces >= 0) & (spaces < track_length - 1),
+        spaces * (len(spaces) + 1) + heights,
+        -1,
+    )
+    leader = behind.argmax(axis=0)
+    leader = np.where(behind[leader, columns] >= 0, leader, -1)
+    return top, np.where(stacked, below, leader)
+
+
+def leg_places(
+    spaces: np.ndarray, heights: np.ndarray, track_length: int = TRACK_LENGTH
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the leading and second camel on every board, following compactboard.leaders.
+
+    Args:
+        spaces (np.ndarray): The space of every camel, one row per camel and one column per board.
+        heights (np.ndarray): The height of every camel in its stack, laid out like spaces.
+        track_length (int): The number of spaces on the board.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The leading and second camel on every board (-1 if there is none).
+    """
+    columns = np.arange(spaces.shape[1])
+    rank = np.where(
+        (spaces > 0) & (spaces < track_length),
+        spaces * (len(spaces) + 1) + heights,
+        -1,
+    )
+    top = rank.argmax(axis=0)
+    found = rank[top, columns] >= 0
+    rank = np.where(spaces < spaces[top, columns], rank, -1)
+    below = rank.argmax(axis=0)
+    return (
+        np.where(found, top, -1),
+        np.where(found & (rank[below, columns] >= 0), below, -1),
+    )
+
+
+def count_leg_outcomes(
+    board: tuple,
+    dice: tuple[int, ...],
+    outcomes: list[int],
+    track_length: int = TRACK_LENGTH,
+) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """
+    Counts how often each camel wins and finishes second, advancing every scenario of the leg in lock-step.
+
+    Args:
+        board (tuple): The compact board.
+        dice (tuple[int, ...]): The indices of the camels whose dice have not been rolled.
+        outcomes (list[int]): The faces of a die.
+        track_length (int): The number of spaces on the board.
+
+    Returns:
+        tuple[tuple[int, ...], tuple[int, ...]]: The win and second place counts per camel index.
+    """
+    num_camels = len(board)
+    camels, rolls = enumerate_scenarios(dice, outcomes)
+    num_scenarios = len(camels)
+    spaces, heights = tile_board(board, num_scenarios)
+    winners = np.full(num_scenarios, -1, dtype=np.int16)
+    seconds = np.full(num_scenarios, -1, dtype=np.int16)
+    active = np.ones(num_scenarios, dtype=bool)
+
+    for step in range(len(dice)):
+        spaces, heights, moving, finishing = advance(
+            spaces, heights, camels[:, step], rolls[:, step], active, track_length
+        )
+        if finishing.any():
+            top, below = finish_places(spaces, heights, moving, track_length)
+            winners[finishing] = top[finishing]
+            seconds[finishing] = below[finishing]
+            active &= ~finishing
+
+    if active.any():
+        top, below = leg_places(spaces, heights, track_length)
+        winners[active] = top[active]
+        seconds[active] = below[active]
+
+    win_counts = np.bincount(winners[winners >= 0], minlength=num_camels)
+    second_counts = np.bincount(seconds[seconds >= 0], minlength=num_camels)
+    return tuple(win_counts.tolist()), tuple(second_counts.tolist())
+
+
+def tile_board(board: tuple, num_boards: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Copies a compact board into the camel-major arrays used by advance.
+
+    Args:
+        board (tuple): The compact board.
+        num_boards (int): The number of copies to make.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The spaces and heights, one row per camel and one column per copy.
+    """
+    spaces = np.array([s for s, _ in board], dtype=np.int16)
+    heights = np.array([h for _, h in board], dtype=np.int16)
+    return (
+        np.repeat(spaces[:, None], num_boards, axis=1),
+        np.repeat(heights[:, None], num_boards, axis=1),
+    )
@@ -0,0 +1,260 @@
+from gamemanager import GameManager
+from player import Player
+from compactboard import (
+    encode_board,
+    decode_board,
+    canonicalize,
+    relabel,
+    count_leg_outcomes,
+    count_leg_scenarios,
+)
+from racesim import RaceSimulator
+from rules import Rules, DEFAULT_RULES
+from evresult import RaceOdds
+from itertools import combinations_with_replacement
+import os
+import struct
+import sys
+
+MAGIC = b"CUPBOOK1"
+HEADER = struct.Struct("<8sBBBxII")
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "openingbook.bin"
+)
+_default_book = None
+
+
+def entry_struct(num_camels: int) -> struct.Struct:
+    """
+    Lays out one book entry: the canonical board, the first-leg win and second place counts, and the race win and
+    last place counts.
+
+    Args:
+        num_camels (int): The number of camels.
+
+    Returns:
+        struct.Struct: The entry layout.
+    """
+    return struct.Struct(f"<{2 * num_camels}b{2 * num_camels}H{2 * num_camels}I")
+
+
+def opening_boards(rules: Rules = DEFAULT_RULES):
+    """
+    Generates every canonical board that GameManager.init_camels can deal.
+
+    Args:
+        rules (Rules): The rules that give the number of camels and the spaces they can start on.
+
+    Yields:
+        tuple: A canonical compact board, camels sorted by (space, height).
+    """
+    spaces = range(rules.start_spaces)
+    for starts in combinations_with_replacement(spaces, len(rules.colors)):
+        board = []
+        for i, space in enumerate(starts):
+            height = board[-1][1] + 1 if i and starts[i - 1] == space else 0
+            board.append((space, height))
+        yield tuple(board)
+
+
+def evaluate_opening(
+    board: tuple,
+    race_samples: int = 0,
+    seed: int = 0,
+    engine: str = "python",
+    rules: Rules = DEFAULT_RULES,
+) -> tuple:
+    """
+    Counts the first-leg outcomes of one opening and, optionally, estimates its race equity.
+
+    Args:
+        board (tuple): A canonical opening board.
+        race_samples (int): The number of full races to play, or 0 to skip the race estimate.
+        seed (int): The seed for the race simulation.
+        engine (str): The race simulator to use, either "python" or "numpy" (requires NumPy).
+        rules (Rules): The rules to count and race under.
+
+    Returns:
+        tuple: The board, the leg win and second place counts, and the race win and last place counts.
+    """
+    dice = tuple(range(len(board)))
+    wins, seconds = count_leg_outcomes(board, dice, rules.faces, rules.track_length)
+    race_wins, race_losses = (0,) * len(board), (0,) * len(board)
+    if race_samples:
+        game = GameManager(Player("Alice", rules), Player("Bob", rules), rules=rules)
+        game.board = decode_board(board, game.colors[: len(board)])
+        odds = RaceSimulator(game, engine).simulate(samples=race_samples, seed=seed)
+        race_wins = tuple(round(p * race_samples) for p in odds.prob_win)
+        race_losses = tuple(round(p * race_samples) for p in odds.prob_lose)
+    return board, wins, seconds, race_wins, race_losses
+
+
+def build_book(
+    path: str = DEFAULT_PATH,
+    race_samples: int = 0,
+    seed: int = 0,
+    engine: str = "python",
+    parallel=None,
+    rules: Rules = DEFAULT_RULES,
+) -> int:
+    """
+    Evaluates every opening and writes the results to a book.
+
+    The file is a fixed header followed by one fixed-width entry per opening, in board order.
+
+    Args:
+        path (str): The file to write.
+        race_samples (int): The number of full races to play per opening, or 0 to store leg counts only.
+        seed (int): The seed for the race simulations.
+        engine (str): The race simulator to use, either "python" or "numpy" (requires NumPy).
+        parallel (ParallelEngine): A worker pool to spread the openings across, or None to evaluate them here.
+        rules (Rules): The rules whose openings to evaluate.
+
+    Returns:
+        int: The number of openings written.
+    """
+    boards = list(opening_boards(rules))
+    args = [
+        boards,
+        [race_samples] * len(boards),
+        [seed] * len(boards),
+        [engine] * len(boards),
+        [rules] * len(boards),
+    ]
+    entries = list(
+        parallel.map(evaluate_opening, *args)
+        if parallel
+        else map(evaluate_opening, *args)
+    )
+    entry = entry_struct(len(boards[0]))
+    with open(path, "wb") as file:
+        file.write(
+            HEADER.pack(
+                MAGIC,
+                len(boards[0]),
+                rules.track_length,
+                len(rules.faces),
+                len(entries),
+                race_samples,
+            )
+        )
+        for board, wins, seconds, race_wins, race_losses in entries:
+            file.write(
+                entry.pack(
+                    *[value for position in board for value in position],
+                    *wins,
+                    *seconds,
+                    *race_wins,
+                    *race_losses,
+                )
+            )
+    return len(entries)
+
+
+class OpeningBook:
+    """
+    The precomputed first-leg and race odds of every opening board, loaded into memory.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """
+        Reads a book written by build_book.
+
+        Args:
+            path (str): The book file.
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        magic, self.num_camels, self.track_length, self.num_faces, count, samples = (
+            HEADER.unpack_from(data)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        self.race_samples = samples
+        self.entries = {}
+        entry = entry_struct(self.num_camels)
+        n = self.num_camels
+        for i in range(count):
+            values = entry.unpack_from(data, HEADER.size + entry.size * i)
+            board = tuple(zip(values[0 : 2 * n : 2], values[1 : 2 * n : 2]))
+            self.entries[board] = values[2 * n :]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, board: tuple) -> bool:
+        return board in self.entries
+
+    def get(
+        self, board: tuple, dice: tuple[int, ...]
+    ) -> tuple[tuple[int, ...], tuple[int, ...], int]:
+        """
+        Looks up the first-leg outcomes of a canonical opening board.
+
+        Args:
+            board (tuple): A canonical compact board.
+            dice (tuple[int, ...]): The canonical indices of the unrolled dice.
+
+        Returns:
+            tuple[tuple[int, ...], tuple[int, ...], int]: The win and second place counts per canonical index and
+                the number of scenarios they were counted over, or None if the state is not an opening.
+        """
+        values = self.entries.get(board)
+        if values is None or len(dice) != self.num_camels:
+            return None
+        n = self.num_camels
+        return values[:n], values[n : 2 * n], count_leg_scenarios(n, self.num_faces)
+
+    def race_odds(self, game: GameManager) -> RaceOdds:
+        """
+        Looks up the race equity of a game that has not rolled any dice yet.
+
+        Args:
+            game (GameManager): The game manager instance containing the current game state.
+
+        Returns:
+            RaceOdds: The stored estimates for the game's colors, or None if the game is not at an opening or the
+                book was built without race estimates.
+        """
+        if not self.race_samples or any(game.dice.values()):
+            return None
+        board, _, labels = canonicalize(encode_board(game.board, game.colors), ())
+        values = self.entries.get(board)
+        if values is None:
+            return None
+        n = self.num_camels
+        simulator = RaceSimulator(game)
+        return simulator.make_odds(
+            relabel(values[2 * n : 3 * n], labels),
+            relabel(values[3 * n :], labels),
+            self.race_samples,
+        )
+
+
+def default_book() -> OpeningBook:
+    """
+    Loads the book at DEFAULT_PATH once per process.
+
+    Returns:
+        OpeningBook: The default book, or None if it has not been built.
+    """
+    global _default_book
+    if _default_book is None and os.path.exists(DEFAULT_PATH):
+        _default_book = OpeningBook(DEFAULT_PATH)
+    return _default_book
+
+
+def main() -> None:
+    """
+    Build the default book, with the number of races per opening given on the command line.
+    """
+    from parallelengine import ParallelEngine
+
+    race_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with ParallelEngine() as parallel:
+        count = build_book(race_samples=race_samples, engine="numpy", parallel=parallel)
+    print(f"Wrote {count} openings to {DEFAULT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
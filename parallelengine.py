@@ -0,0 +1,129 @@
+from compactboard import TRACK_LENGTH, move, count_leg_outcomes, count_leg_scenarios
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+
+def count_leg_shard(
+    board: tuple,
+    dice: tuple[int, ...],
+    outcomes: list[int],
+    track_length: int = TRACK_LENGTH,
+) -> tuple[tuple[int, ...], tuple[int, ...]]:
+    """
+    Counts the leg outcomes below one (first die, face) branch in a worker process.
+
+    Args:
+        board (tuple): The compact board after the first roll.
+        dice (tuple[int, ...]): The indices of the camels whose dice are still to be rolled.
+        outcomes (list[int]): The faces of a die.
+        track_length (int): The number of spaces on the board.
+
+    Returns:
+        tuple[tuple[int, ...], tuple[int, ...]]: The win and second place counts per camel index.
+    """
+    return count_leg_outcomes(board, dice, outcomes, track_length)
+
+
+class ParallelEngine:
+    """
+    A persistent pool of worker processes that EVBot and RaceSimulator can split their work across.
+    """
+
+    def __init__(self, workers: int = None):
+        """
+        Initializes the engine. Worker processes are started on first use and kept until shutdown.
+
+        Args:
+            workers (int): The number of worker processes. Defaults to the number of CPUs.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def map(self, func, *iterables):
+        """
+        Runs a function over the workers, yielding results in submission order.
+
+        Only a couple of tasks per worker are queued ahead, so closing the generator early cancels the rest.
+
+        Args:
+            func: A picklable function.
+            *iterables: The arguments to call the function with, as in the built-in map.
+
+        Yields:
+            The result of each call, in order.
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        pending = deque()
+        try:
+            for args in zip(*iterables):
+                pending.append(self.executor.submit(func, *args))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def count_leg_outcomes(
+        self,
+        board: tuple,
+        dice: tuple[int, ...],
+        outcomes: list[int],
+        track_length: int = TRACK_LENGTH,
+    ) -> tuple[tuple[int, ...], tuple[int, ...]]:
+        """
+        Counts how often each camel wins and finishes second, with one task per first die and face.
+
+        Args:
+            board (tuple): The compact board.
+            dice (tuple[int, ...]): The indices of the camels whose dice have not been rolled.
+            outcomes (list[int]): The faces of a die.
+            track_length (int): The number of spaces on the board.
+
+        Returns:
+            tuple[tuple[int, ...], tuple[int, ...]]: The win and second place counts per camel index, identical to
+                EVBot.count_leg_outcomes.
+        """
+        if not dice:
+            return count_leg_shard(board, dice, outcomes, track_length)
+        wins, seconds = [0] * len(board), [0] * len(board)
+        weight = count_leg_scenarios(len(dice) - 1, len(outcomes))
+        children, rests = [], []
+        for i, camel in enumerate(dice):
+            for roll in outcomes:
+                child, winner, second = move(board, camel, roll, track_length)
+                if winner >= 0:
+                    wins[winner] += weight
+                    if second >= 0:
+                        seconds[second] += weight
+                else:
+                    children.append(child)
+                    rests.append(dice[:i] + dice[i + 1 :])
+        for child_wins, child_seconds in self.map(
+            count_leg_shard,
+            children,
+            rests,
+            [outcomes] * len(children),
+            [track_length] * len(children),
+        ):
+            for c in range(len(board)):
+                wins[c] += child_wins[c]
+                seconds[c] += child_seconds[c]
+        return tuple(wins), tuple(seconds)
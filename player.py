@@ -1,3 +1,5 @@
+from rules import Rules, DEFAULT_RULES
+from tickets import TicketTents
 import random
 
 
@@ -6,41 +8,44 @@ class Player:
     Represents a player in Camel Up.
     """
 
-    def __init__(self, name: str):
+    __slots__ = ("coins", "cards", "name")
+
+    def __init__(self, name: str, rules: Rules = DEFAULT_RULES):
         """
         Initialize a new player with a name, starting coins, and an empty card collection.
 
         Args:
             name (str): The name of the player.
+            rules (Rules): The rules of the game the player will join.
         """
-        self.coins = 3
-        self.cards = {
-            "red": [],
-            "green": [],
-            "blue": [],
-            "yellow": [],
-            "purple": [],
-        }
+        self.coins = rules.starting_coins
+        self.cards = {color: [] for color in rules.colors}
         self.name = name
 
-    def roll(self, dice: list) -> tuple:
+    def roll(
+        self, dice: list, rng=None, faces: tuple[int, ...] = DEFAULT_RULES.faces
+    ) -> tuple:
         """
         Roll a die from the available dice and return the result.
         The player earns 1 coin each time they roll.
 
         Args:
             dice (list): List of available dice colors.
+            rng (GameRNG): The random stream to roll with, or None to use the global random module.
+            faces (tuple[int, ...]): The faces of a die.
 
         Returns:
-            tuple: A tuple containing the color of the die rolled and the result of the roll (1, 2, or 3).
+            tuple: A tuple containing the color of the die rolled and the result of the roll (1, 2, or 3 by default).
                    Returns an empty tuple if no dice are available.
         """
         self.coins += 1
         if not dice:
             return ()
 
+        if rng is not None:
+            return rng.roll(dice, faces)
         pick = random.choice(dice)
-        roll_result = random.choice([1, 2, 3])
+        roll_result = random.choice(faces)
         return (pick, roll_result)
 
     def take_bet(self, color: str, cards: dict) -> dict:
@@ -49,12 +54,16 @@ class Player:
 
         Args:
             color (str): The color of the bet.
-            cards (dict): A dictionary of cards available in the game.
+            cards (dict): The cards available in the game, as TicketTents or a dictionary of lists.
 
         Returns:
-            dict: Updated dictionary of cards after the bet has been placed.
+            dict: The same cards, updated in place after the bet has been placed.
+
+        Raises:
+            IndexError: If there are no cards left for the color.
         """
-        cards_copy = cards.copy()
-        self.cards[color].append(cards_copy[color][0])
-        cards_copy[color].pop(0)
-        return cards_copy
+        if isinstance(cards, TicketTents):
+            self.cards[color].append(cards.take(color))
+        else:
+            self.cards[color].append(cards[color].pop(0))
+        return cards
@@ -1,9 +1,31 @@
 import colorama
 import os
 from gamemanager import GameManager
+from gameevent import GameEvent
+from player import Player
 from evbot import EVBot
 
 
+def short_names(colors: list[str]) -> dict[str, str]:
+    """
+    Find the shortest prefix of each camel color that no other color starts with, so players can type it instead.
+
+    Args:
+        colors (list[str]): The camel colors.
+
+    Returns:
+        dict[str, str]: The color for each short name, such as "bla" for black when blue is also racing.
+    """
+    names = {}
+    for color in colors:
+        for length in range(1, len(color) + 1):
+            prefix = color[:length]
+            if not any(other.startswith(prefix) for other in colors if other != color):
+                names[prefix] = color
+                break
+    return names
+
+
 class PlayGame:
     """
     Manages the display and player actions
@@ -17,49 +39,86 @@ class PlayGame:
             game_manager (GameManager): The game manager for the game.
         """
         self.manager = game_manager
-        self.current_player = game_manager.current_player
-        self.current_name = game_manager.player_names[0]
         self.color_dict = {
             "RED": colorama.Fore.RED,
             "GREEN": colorama.Fore.GREEN,
             "BLUE": colorama.Fore.BLUE,
             "YELLOW": colorama.Fore.YELLOW,
             "PURPLE": colorama.Fore.MAGENTA,
+            "WHITE": colorama.Fore.WHITE,
+            "BLACK": colorama.Fore.LIGHTBLACK_EX,
         }
-        self.num_dice_rolled = 0
+        self.leg_start_coins = [player.coins for player in game_manager.players]
         colorama.init(autoreset=True)
 
+    @property
+    def current_player(self) -> Player:
+        """
+        The player whose turn it is.
+        """
+        return self.manager.current_player
+
+    @property
+    def current_name(self) -> str:
+        """
+        The name of the player whose turn it is.
+        """
+        return self.manager.player_names[self.manager.turn]
+
+    @property
+    def num_dice_rolled(self) -> int:
+        """
+        The number of dice rolled so far this leg.
+        """
+        return sum(1 for roll in self.manager.dice.values() if roll)
+
     def clear(self) -> None:
         """
         Clear the console screen.
         """
         os.system("cls" if os.name == "nt" else "clear")
 
-    def take_turn(self, action=None, color=None, skip_evbot=False) -> None:
+    def take_turn(self, action=None, color=None, skip_evbot=False) -> list[GameEvent]:
         """
         Handle the player's turn by getting the player's action and executing it.
+
+        Args:
+            action (str): The action to take ("B", "R" or "H"), or None to ask the player.
+            color (str): The camel to bet on, or None to ask the player.
+            skip_evbot (bool): Whether to skip printing the EVBot hint and waiting for ENTER, as for a bot's turn.
+
+        Returns:
+            list[GameEvent]: What happened during the turn.
         """
         self.display_game()
-        if not action:
-            action = self.get_player_action()
+        while True:
+            if not action:
+                action = self.get_player_action()
+            if action == "B" and not color:
+                if not any(self.manager.cards.values()):
+                    print("There are no betting cards remaining!")
+                    action = None
+                    continue
+                color = self.get_bet_color()
+                if color is None:
+                    action = None
+                    continue
+            if action == "H" and self.current_player.coins <= 0:
+                print("You don't have enough coins to buy a hint!")
+                action = None
+                continue
+            break
+
         if action == "B":
-            self.handle_bet(color)
+            events = self.handle_bet(color)
         elif action == "R":
-            self.handle_roll()
-        elif action == "H":
-            if self.current_player.coins <= 0:
-                if not skip_evbot:
-                    print("You don't have enough coins to buy a hint!")
-                self.take_turn(action=skip_evbot)
-            self.handle_hint(skip_evbot=skip_evbot)
-            self.take_turn(
-                action=skip_evbot
-            )  # hacky but necessary for the test case for turn handling with hints
-            self.switch_turn()
+            events = self.handle_roll()
         else:
-            return  # we only get here for the aforementioned test case where action is True
-
-        self.switch_turn()
+            events = self.handle_hint(skip_evbot=skip_evbot)
+        if not self.manager.over and any(event.kind == "leg_end" for event in events):
+            self.display_leg_results(self.leg_start_coins)
+            self.leg_start_coins = [player.coins for player in self.manager.players]
+        return events
 
     def get_player_action(self) -> str:
         """
@@ -81,20 +140,17 @@ class PlayGame:
             else:
                 print("Sorry, that's not a valid move.")
 
-    def handle_bet(self, color=None) -> None:
+    def handle_bet(self, color: str) -> list[GameEvent]:
         """
-        Handle the bet action by prompting the player to choose a bet color.
+        Handle the bet action by taking the top ticket of a color for the current player.
+
+        Args:
+            color (str): The camel to bet on.
+
+        Returns:
+            list[GameEvent]: What happened.
         """
-        if not color:
-            if all(len(color_arr) == 0 for color_arr in self.manager.cards.values()):
-                print("There are no betting cards remaining!")
-                return
-            color = self.get_bet_color()
-            if color is None:
-                self.take_turn()
-                self.switch_turn()
-                return
-        self.manager.cards = self.current_player.take_bet(color, self.manager.cards)
+        return self.manager.apply(("B", color))
 
     def get_bet_color(self) -> str:
         """
@@ -103,14 +159,14 @@ class PlayGame:
         Returns:
             str: The bet color
         """
-        camel_colors = ["red", "green", "blue", "yellow", "purple"]
-        camel_short = ["r", "g", "b", "y", "p"]
+        camel_colors = self.manager.colors
+        camel_short = short_names(camel_colors)
         while True:
             color = input(
-                'Which bet (red, green, blue, yellow, purple) would you like to place (or "exit" to go back)? '
+                f'Which bet ({", ".join(camel_colors)}) would you like to place (or "exit" to go back)? '
             ).lower()
             if color in camel_short:
-                color = camel_colors[camel_short.index(color)]
+                color = camel_short[color]
                 if len(self.manager.cards[color]) != 0:
                     return color
                 else:
@@ -125,38 +181,36 @@ class PlayGame:
             else:
                 print("Sorry, that's not a valid card.")
 
-    def handle_roll(self) -> None:
+    def handle_roll(self) -> list[GameEvent]:
         """
-        Handle the roll action by rolling available dice and moving camels accordingly.
+        Handle the roll action by rolling an available die and moving camels accordingly.
+
+        Returns:
+            list[GameEvent]: What happened, including the end of the leg or game if the roll caused it.
         """
-        available_dice = [
-            key for key in self.manager.dice if self.manager.dice[key] == 0
-        ]
-        color, number = self.current_player.roll(available_dice)
-        self.manager.dice[color] = number
-        self.num_dice_rolled += 1
-        self.manager.move_camels(color, number)
+        return self.manager.apply(("R",))
+
+    def handle_hint(self, skip_evbot=False) -> list[GameEvent]:
+        """
+        Handle the hint action by charging a coin and printing EVBot's advice. The player keeps their turn.
+
+        Args:
+            skip_evbot (bool): Whether to skip printing the EVBot hint and waiting for ENTER, as for a bot's turn.
 
-    def handle_hint(self, skip_evbot=False) -> None:
-        self.current_player.coins -= 1
+        Returns:
+            list[GameEvent]: What happened.
+        """
+        events = self.manager.apply(("H",))
         if not skip_evbot:
             print(EVBot(self.manager).calculate_ev())
-        input("Press ENTER to continue...")
+            input("Press ENTER to continue...")
+        return events
 
     def switch_turn(self) -> None:
         """
         Switch the turn to the other player.
         """
-        self.current_player = (
-            self.manager.players[1]
-            if self.current_player == self.manager.players[0]
-            else self.manager.players[0]
-        )
-        self.current_name = (
-            self.manager.player_names[1]
-            if self.current_name == self.manager.player_names[0]
-            else self.manager.player_names[0]
-        )
+        self.manager.switch_turn()
 
     def display_game(self) -> None:
         """
@@ -188,7 +242,7 @@ class PlayGame:
             str: The current ticket tents state as a formatted string.
         """
         state = ["   Ticket Tents: "]
-        for key in ["red", "green", "blue", "yellow", "purple"]:
+        for key in self.manager.colors:
             if len(self.manager.cards[key]) != 0:
                 state.append(
                     self.color_dict[key.upper()]
@@ -208,7 +262,7 @@ class PlayGame:
             str: The dice tents state as a formatted string.
         """
         state = [colorama.Fore.WHITE + "Dice Tents: "]
-        for die in ["red", "green", "blue", "yellow", "purple"]:
+        for die in self.manager.colors:
             if self.manager.dice[die] != 0:
                 state.append(
                     self.color_dict[die.upper()] + str(self.manager.dice[die]) + " "
@@ -226,9 +280,9 @@ class PlayGame:
             str: The current board state as a formatted string.
         """
         state = []
-        for row in range(4, -1, -1):
+        for row in range(len(self.manager.colors) - 1, -1, -1):
             state.append("🌴  ")
-            for pos in range(16):
+            for pos in range(len(self.manager.board)):
                 if len(self.manager.board[pos]) > row:
                     camel = self.manager.board[pos][row]
                     if len(camel) != 0:
@@ -259,7 +313,7 @@ class PlayGame:
             str: The current board positions as a formatted string.
         """
         state = ["    " + colorama.Fore.WHITE]
-        for i in range(1, 17):
+        for i in range(1, len(self.manager.board) + 1):
             state.append(str(i) + "  ")
         state.append("\n\n")
         return "".join(state)
@@ -348,15 +402,11 @@ class PlayGame:
 
     def get_player_scores_update(self, og_coins: list) -> str:
         """
-        Update and get the players' scores for the leg.
+        Get the players' scores for the leg once GameManager has scored it.
 
         Returns:
             str: The formatted string of the players' updated scores for the leg.
         """
-        self.manager.update_score()
-        self.manager.players[0].coins = self.manager.player_scores[0]
-        self.manager.players[1].coins = self.manager.player_scores[1]
-
         spacer = 0
         if self.manager.player_scores[0] > 9:
             spacer += 1
@@ -394,16 +444,8 @@ class PlayGame:
         Display the winner of the game.
         """
         self.clear()
-        self.manager.update_score()
-        player1_score = self.manager.player_scores[0]
-        player2_score = self.manager.player_scores[1]
-
-        if player1_score > player2_score:
-            winner = self.manager.players[0]
-            second = self.manager.players[1]
-        else:
-            winner = self.manager.players[1]
-            second = self.manager.players[0]
+        winner = self.manager.players[self.manager.winning_player()]
+        second = self.manager.players[1 - self.manager.winning_player()]
 
         game_over = [
             "\n\n",
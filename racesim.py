@@ -0,0 +1,229 @@
+from gamemanager import GameManager
+from compactboard import encode_board, move
+from evresult import RaceOdds
+from rng import GameRNG
+from math import sqrt
+import random
+
+ENGINES = ("python", "numpy")
+
+
+class RaceSimulator:
+    """
+    Estimates the overall winner and loser of the race by playing random dice until a camel crosses the finish line.
+    """
+
+    def __init__(self, game: GameManager, engine: str = "python"):
+        """
+        Initializes the simulator from the current state of a game, including the dice already rolled this leg.
+
+        Args:
+            game (GameManager): The game manager instance containing the current game state.
+            engine (str): The simulator to use, either "python" or "numpy" (requires NumPy).
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+        self.colors = tuple(game.colors)
+        self.board = encode_board(game.board, game.colors)
+        self.rolled = tuple(game.dice[color] != 0 for color in game.colors)
+        self.outcomes = list(game.rules.faces)
+        self.track_length = len(game.board)
+        self.engine = engine
+
+    def simulate(
+        self,
+        samples: int = 100_000,
+        seed=None,
+        tolerance: float = None,
+        batch_size: int = 50_000,
+        parallel=None,
+    ) -> RaceOdds:
+        """
+        Plays random races from the current state and counts each camel's wins and last places.
+
+        Races are played in batches, each with its own random stream derived from the seed, so the same seed gives
+        the same result whether the batches run here or across any number of worker processes.
+
+        Args:
+            samples (int): The maximum number of races to play.
+            seed: The seed for the random number generator, or None to seed from the system.
+            tolerance (float): Stop early once every standard error is at most this, or None to play every race.
+            batch_size (int): The number of races played between convergence checks.
+            parallel (ParallelEngine): The worker pool to play batches on, or None to play them here.
+
+        Returns:
+            RaceOdds: The estimated probabilities of winning and finishing last, with their standard errors.
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(64)
+        sizes = [
+            min(batch_size, samples - start) for start in range(0, samples, batch_size)
+        ]
+        seeds = [seed] * len(sizes)
+        batches = (
+            parallel.map(self.play_batch, range(len(sizes)), sizes, seeds)
+            if parallel
+            else map(self.play_batch, range(len(sizes)), sizes, seeds)
+        )
+        wins, losses = [0] * len(self.colors), [0] * len(self.colors)
+        played = 0
+        for size, (batch_wins, batch_losses) in zip(sizes, batches):
+            for c in range(len(self.colors)):
+                wins[c] += batch_wins[c]
+                losses[c] += batch_losses[c]
+            played += size
+            odds = self.make_odds(wins, losses, played)
+            if (
+                tolerance is not None
+                and max(odds.win_stderr + odds.lose_stderr) <= tolerance
+            ):
+                if parallel:
+                    batches.close()
+                break
+        return odds
+
+    def play_batch(
+        self, index: int, num_races: int, seed
+    ) -> tuple[list[int], list[int]]:
+        """
+        Plays one batch of races on the random stream reserved for that batch.
+
+        Args:
+            index (int): The position of the batch in the simulation.
+            num_races (int): The number of races to play.
+            seed: The seed of the whole simulation.
+
+        Returns:
+            tuple[list[int], list[int]]: The number of wins and last places per camel index.
+        """
+        if self.engine == "numpy":
+            import numpy as np
+
+            rng = np.random.default_rng(
+                np.random.SeedSequence(seed, spawn_key=(index,))
+            )
+            return self.play_numpy(num_races, rng)
+        return self.play_python(num_races, GameRNG(seed).child(index))
+
+    def make_odds(self, wins: list[int], losses: list[int], played: int) -> RaceOdds:
+        """
+        Converts win and last place counts into probabilities with standard errors.
+
+        Args:
+            wins (list[int]): The number of races won by each camel.
+            losses (list[int]): The number of races each camel finished last.
+            played (int): The number of races played.
+
+        Returns:
+            RaceOdds: The estimated probabilities and their standard errors.
+        """
+        prob_win = tuple(count / played for count in wins)
+        prob_lose = tuple(count / played for count in losses)
+        return RaceOdds(
+            self.colors,
+            prob_win,
+            prob_lose,
+            tuple(sqrt(p * (1 - p) / played) for p in prob_win),
+            tuple(sqrt(p * (1 - p) / played) for p in prob_lose),
+            played,
+        )
+
+    def play_python(self, num_races: int, rng: GameRNG) -> tuple[list[int], list[int]]:
+        """
+        Plays races one at a time on the compact board.
+
+        Args:
+            num_races (int): The number of races to play.
+            rng (GameRNG): The random stream to draw rolls from.
+
+        Returns:
+            tuple[list[int], list[int]]: The number of wins and last places per camel index.
+        """
+        wins, losses = [0] * len(self.colors), [0] * len(self.colors)
+        camels = range(len(self.colors))
+        for _ in range(num_races):
+            state = self.board
+            dice = [c for c in camels if not self.rolled[c]] or list(camels)
+            while True:
+                die, face = rng.draw(len(dice), len(self.outcomes))
+                camel = dice.pop(die)
+                state, winner, _ = move(
+                    state, camel, self.outcomes[face], self.track_length
+                )
+                if winner >= 0:
+                    break
+                if not dice:
+                    dice = list(camels)
+            on_board = [c for c in camels if state[c][0] >= 0]
+            wins[winner] += 1
+            losses[min(on_board, key=state.__getitem__) if on_board else camel] += 1
+        return wins, losses
+
+    def play_numpy(self, num_races: int, rng) -> tuple[list[int], list[int]]:
+        """
+        Plays a batch of races in lock-step with NumPy, one die per race at a time, dropping finished races as it goes.
+
+        Every race rolls one die per step, so all races share the same leg boundaries and each leg's roll order is
+        drawn for the whole batch at once.
+
+        Args:
+            num_races (int): The number of races to play.
+            rng (np.random.Generator): The random number generator to draw rolls from.
+
+        Returns:
+            tuple[list[int], list[int]]: The number of wins and last places per camel index.
+        """
+        import numpy as np
+        from numpyengine import advance, tile_board
+
+        num_camels = len(self.colors)
+        spaces, heights = tile_board(self.board, num_races)
+        dice = np.array(
+            [c for c in range(num_camels) if not self.rolled[c]] or range(num_camels)
+        )
+        outcomes = np.array(self.outcomes, dtype=spaces.dtype)
+        winners = np.zeros(num_races, dtype=np.int64)
+        losers = np.zeros(num_races, dtype=np.int64)
+        races = np.arange(num_races)
+        behind_all = np.iinfo(spaces.dtype).max
+        order = np.empty((0, num_races), dtype=dice.dtype)
+
+        while len(races):
+            if not len(order):
+                order = dice[rng.random((len(dice), len(races))).argsort(axis=0)]
+                dice = np.arange(num_camels)
+            camel, order = order[0], order[1:]
+            roll = outcomes[rng.integers(len(outcomes), size=len(races))]
+            spaces, heights, moving, finishing = advance(
+                spaces,
+                heights,
+                camel,
+                roll,
+                np.ones(len(races), dtype=bool),
+                self.track_length,
+            )
+            if finishing.any():
+                done = np.flatnonzero(finishing)
+                stack = moving[:, done]
+                top = np.where(stack, heights[:, done], -1).argmax(axis=0)
+                behind = np.where(
+                    ~stack & (spaces[:, done] >= 0),
+                    spaces[:, done] * (num_camels + 1) + heights[:, done],
+                    behind_all,
+                )
+                last = behind.argmin(axis=0)
+                last = np.where(
+                    behind[last, np.arange(len(done))] < behind_all, last, camel[done]
+                )
+                winners[races[done]] = top
+                losers[races[done]] = last
+                racing = ~finishing
+                races = races[racing]
+                spaces = spaces[:, racing]
+                heights = heights[:, racing]
+                order = order[:, racing]
+
+        return (
+            np.bincount(winners, minlength=num_camels).tolist(),
+            np.bincount(losers, minlength=num_camels).tolist(),
+        )
@@ -0,0 +1,107 @@
+from rules import DEFAULT_RULES
+import random
+
+FACES = len(DEFAULT_RULES.faces)
+DRAW_RANGE = 180
+
+
+class GameRNG:
+    """
+    A seedable random stream for one game or simulator, with a fast path for dice rolls.
+
+    Rolls are drawn from a buffer of random bytes refilled in blocks. Each roll uses a single byte: bytes of 180 or
+    more are rejected, and since 180 is a multiple of 3 * n for every n up to 5 dice, the remaining byte picks
+    both the die and the face uniformly. Other numbers of dice or faces that do not divide 180 fall back to
+    random.randrange. Independent streams for workers are split off with child or spawn, so a
+    whole run can be reproduced from one seed.
+    """
+
+    def __init__(self, seed=None, block_size: int = 256):
+        """
+        Initializes the stream.
+
+        Args:
+            seed: The seed, an int or str, or None to seed from the system.
+            block_size (int): The number of random bytes to draw per refill.
+        """
+        self.seed = random.SystemRandom().getrandbits(64) if seed is None else seed
+        self.random = random.Random(self.seed)
+        self.block_size = block_size
+        self.buffer = b""
+        self.position = 0
+        self.spawned = 0
+
+    def child(self, index: int) -> "GameRNG":
+        """
+        Derives the independent stream with a given index, without advancing this stream.
+
+        Args:
+            index (int): The index of the child stream.
+
+        Returns:
+            GameRNG: The stream seeded with "<seed>/<index>".
+        """
+        return GameRNG(f"{self.seed}/{index}", self.block_size)
+
+    def spawn(self, count: int) -> list["GameRNG"]:
+        """
+        Splits off new independent streams, for example one per worker or per game.
+
+        Args:
+            count (int): The number of streams to create.
+
+        Returns:
+            list[GameRNG]: Streams that have not been handed out by an earlier spawn.
+        """
+        children = [self.child(self.spawned + i) for i in range(count)]
+        self.spawned += count
+        return children
+
+    def draw(self, num_dice: int, faces: int = FACES) -> tuple[int, int]:
+        """
+        Picks one of the remaining dice and a face for it.
+
+        Args:
+            num_dice (int): The number of dice to pick from.
+            faces (int): The number of faces on a die.
+
+        Returns:
+            tuple[int, int]: The index of the die and the index of the face, from 0 to faces - 1.
+        """
+        if DRAW_RANGE % (faces * num_dice):
+            value = self.random.randrange(faces * num_dice)
+            return value // faces, value % faces
+        while self.position >= len(self.buffer):
+            self.buffer = bytes(
+                b for b in self.random.randbytes(self.block_size) if b < DRAW_RANGE
+            )
+            self.position = 0
+        value = self.buffer[self.position] % (faces * num_dice)
+        self.position += 1
+        return value // faces, value % faces
+
+    def roll(self, dice: list, faces: tuple[int, ...]) -> tuple:
+        """
+        Rolls one of the available dice, like Player.roll.
+
+        Args:
+            dice (list): List of available dice colors.
+            faces (tuple[int, ...]): The faces of a die, as in Rules.faces.
+
+        Returns:
+            tuple: The color of the die rolled and the result of the roll.
+        """
+        die, face = self.draw(len(dice), len(faces))
+        return dice[die], faces[face]
+
+    def choice(self, seq):
+        """
+        Picks a random element, for setup code such as GameManager.init_camels.
+
+        Args:
+            seq: A non-empty sequence.
+
+        Returns:
+            A random element of seq.
+        """
+        return self.random.choice(seq)
@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+
+CAMEL_COLORS = ("red", "green", "blue", "yellow", "purple", "white", "black")
+
+
+@dataclass(frozen=True, slots=True)
+class Rules:
+    """
+    The parameters of a game of Camel Up that every module reads instead of hard-coding.
+
+    The defaults are the standard game. Other rules are meant for experiments such as scaling benchmarks: the
+    precomputed leg table and opening book only cover the standard track and die.
+    """
+
+    colors: tuple[str, ...] = CAMEL_COLORS[:5]
+    track_length: int = 16
+    faces: tuple[int, ...] = (1, 2, 3)
+    tickets: tuple[int, ...] = (5, 3, 2, 2)
+    start_spaces: int = 3
+    starting_coins: int = 3
+
+    def __post_init__(self):
+        """
+        Checks the rules are playable.
+
+        Raises:
+            ValueError: If a parameter is out of range.
+        """
+        if not self.colors or len(set(self.colors)) != len(self.colors):
+            raise ValueError(f"Camel colors must be distinct, got {self.colors}")
+        if not self.faces or min(self.faces) < 1:
+            raise ValueError(f"Die faces must be positive, got {self.faces}")
+        if not 0 < self.start_spaces < self.track_length:
+            raise ValueError(
+                f"Cannot start on {self.start_spaces} spaces of a {self.track_length} space track"
+            )
+
+    @classmethod
+    def with_camels(cls, num_camels: int, **changes) -> "Rules":
+        """
+        Makes rules for a different number of camels, taking their colors from CAMEL_COLORS.
+
+        Args:
+            num_camels (int): The number of camels, at most len(CAMEL_COLORS).
+            **changes: Any other parameters to change.
+
+        Returns:
+            Rules: The rules.
+
+        Raises:
+            ValueError: If there are not enough colors.
+        """
+        if not 0 < num_camels <= len(CAMEL_COLORS):
+            raise ValueError(
+                f"Expected 1 to {len(CAMEL_COLORS)} camels, got {num_camels}"
+            )
+        return cls(CAMEL_COLORS[:num_camels], **changes)
+
+    @property
+    def race(self) -> tuple:
+        """
+        The parameters that decide where camels finish, used to key leg outcomes.
+        """
+        return self.track_length, self.faces
+
+
+DEFAULT_RULES = Rules()
@@ -0,0 +1,275 @@
+from gamemanager import GameManager
+from player import Player
+from agents import make_agent
+from snapshot import pack_game, record_struct
+from rng import GameRNG
+from rules import Rules, DEFAULT_RULES
+from dataclasses import dataclass
+import numpy as np
+import os
+import sys
+
+COLUMNS = {
+    "game": np.int32,
+    "features": np.int16,
+    "action": np.int8,
+    "leg_winner": np.int8,
+    "leg_second": np.int8,
+    "result": np.int16,
+}
+CHUNK_SIZE = 1 << 16
+HINT = -1
+
+
+@dataclass(frozen=True, slots=True)
+class Record:
+    """
+    One decision from a self-play game.
+
+    features is the position before the action, laid out as the first fields of a snapshot record (see
+    feature_names). leg_winner and leg_second are the camels that won and came second in the leg the action was taken
+    in, -1 for none. result is the final coin margin of the player who acted.
+    """
+
+    game: int
+    features: tuple[int, ...]
+    action: int
+    leg_winner: int
+    leg_second: int
+    result: int
+
+
+def feature_names(colors: tuple[str, ...]) -> list[str]:
+    """
+    Names the features of a position, which follow the layout of snapshot.record_struct: each camel's space and
+    height, the dice, the tickets taken per camel, both players' coins, each player's bets per camel as a bitmask over
+    the ticket stack, and the current player.
+
+    Args:
+        colors (tuple[str, ...]): The camel colors, in the order of GameManager.colors.
+
+    Returns:
+        list[str]: The name of each feature.
+    """
+    return [
+        *[f"{color}_{field}" for color in colors for field in ("space", "height")],
+        *[f"{color}_die" for color in colors],
+        *[f"{color}_taken" for color in colors],
+        "coins_1",
+        "coins_2",
+        *[f"bets_{p}_{color}" for p in (1, 2) for color in colors],
+        "turn",
+    ]
+
+
+def encode_action(action: tuple, colors: tuple[str, ...]) -> int:
+    """
+    Encodes an action as a small integer.
+
+    Args:
+        action (tuple): ("R", ...) to roll, ("B", color) to bet or ("H",) to pay for a hint.
+        colors (tuple[str, ...]): The camel colors.
+
+    Returns:
+        int: 0 for a roll, 1 + the camel's index for a bet, and HINT for a hint.
+    """
+    if action[0] == "B":
+        return 1 + colors.index(action[1])
+    return 0 if action[0] == "R" else HINT
+
+
+def play_records(
+    names: tuple[str, str],
+    num_games: int,
+    seed=0,
+    rules: Rules = DEFAULT_RULES,
+    time_limit: float = 0.1,
+):
+    """
+    Plays agents against each other without rendering and yields a record for every action.
+
+    A game's records are held back until the game ends, since they carry its final result, so at most one game is
+    buffered.
+
+    Args:
+        names (tuple[str, str]): The agents in each seat, as in agents.AGENTS.
+        num_games (int): The number of games to play.
+        seed: The seed for the camels, the dice and the agents. The same seed plays the same games.
+        rules (Rules): The rules to play by.
+        time_limit (float): The number of seconds a search agent may spend per move.
+
+    Yields:
+        Record: The records of each game in order.
+    """
+    colors = tuple(rules.colors)
+    index = {color: i for i, color in enumerate(colors)}
+    layout = record_struct(len(colors))
+    width = 6 * len(colors) + 3
+    for g in range(num_games):
+        agents = [
+            make_agent(name, time_limit, f"{seed}/{g}/{name}/{seat}")
+            for seat, name in enumerate(names)
+        ]
+        game = GameManager(
+            Player("Player 1", rules),
+            Player("Player 2", rules),
+            rng=GameRNG(seed).child(g),
+            rules=rules,
+        )
+        game.init_camels()
+        pending, leg, coins = [], [], ()
+        while not game.over:
+            player = game.turn
+            features = layout.unpack(pack_game(game))[:width]
+            action = agents[player].choose(game)
+            leg.append((features, encode_action(action, colors), player))
+            for event in game.apply(action):
+                if event.kind == "leg_end":
+                    winner = index.get(event.color.lower(), -1)
+                    second = index.get(event.second.lower(), -1)
+                    pending.extend((*entry, winner, second) for entry in leg)
+                    leg = []
+                    coins = event.coins
+        for features, action, player, winner, second in pending:
+            yield Record(
+                g, features, action, winner, second, coins[player] - coins[1 - player]
+            )
+
+
+def write_dataset(
+    path: str,
+    records,
+    num_camels: int = len(DEFAULT_RULES.colors),
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """
+    Writes records to a directory of chunked columns, one .npy file per column and chunk.
+
+    Records are copied into preallocated arrays of chunk_size rows and each chunk is saved in bulk once full, so
+    memory stays bounded by one chunk whatever the number of records.
+
+    Args:
+        path (str): The directory to write, created if needed.
+        records: An iterable of Record, such as play_records.
+        num_camels (int): The number of camels the games are played with.
+        chunk_size (int): The number of records per chunk.
+
+    Returns:
+        int: The number of records written.
+    """
+    os.makedirs(path, exist_ok=True)
+    width = 6 * num_camels + 3
+    arrays = {
+        name: np.empty((chunk_size, width) if name == "features" else chunk_size, dtype)
+        for name, dtype in COLUMNS.items()
+    }
+    count = chunk = rows = 0
+
+    def flush() -> None:
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}-{chunk:05d}.npy"), array[:rows])
+
+    for record in records:
+        arrays["game"][rows] = record.game
+        arrays["features"][rows] = record.features
+        arrays["action"][rows] = record.action
+        arrays["leg_winner"][rows] = record.leg_winner
+        arrays["leg_second"][rows] = record.leg_second
+        arrays["result"][rows] = record.result
+        rows += 1
+        count += 1
+        if rows == chunk_size:
+            flush()
+            chunk += 1
+            rows = 0
+    if rows:
+        flush()
+    return count
+
+
+class SelfPlayDataset:
+    """
+    A read-only view of a directory written by write_dataset. Every chunk is memory-mapped, so opening the dataset
+    reads only the .npy headers.
+    """
+
+    def __init__(self, path: str):
+        """
+        Maps every chunk of every column.
+
+        Args:
+            path (str): The directory.
+
+        Raises:
+            ValueError: If the columns do not have the same chunks and lengths.
+        """
+        files = sorted(os.listdir(path))
+        self.columns = {
+            name: [
+                np.load(os.path.join(path, file), mmap_mode="r")
+                for file in files
+                if file.startswith(f"{name}-") and file.endswith(".npy")
+            ]
+            for name in COLUMNS
+        }
+        lengths = [len(chunk) for chunk in self.columns["game"]]
+        for name, chunks in self.columns.items():
+            if [len(chunk) for chunk in chunks] != lengths:
+                raise ValueError(f"{path} has mismatched {name} chunks")
+        self.offsets = np.cumsum([0] + lengths)
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def __getitem__(self, index: int) -> Record:
+        """
+        Reads one record.
+
+        Args:
+            index (int): The record number.
+
+        Returns:
+            Record: The record.
+
+        Raises:
+            IndexError: If there is no such record.
+        """
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Record {index} out of range")
+        index %= len(self)
+        chunk = int(np.searchsorted(self.offsets, index, side="right")) - 1
+        row = index - int(self.offsets[chunk])
+        columns = {name: chunks[chunk][row] for name, chunks in self.columns.items()}
+        return Record(
+            int(columns["game"]),
+            tuple(int(value) for value in columns["features"]),
+            int(columns["action"]),
+            int(columns["leg_winner"]),
+            int(columns["leg_second"]),
+            int(columns["result"]),
+        )
+
+    def chunks(self):
+        """
+        Walks the dataset one chunk at a time.
+
+        Yields:
+            dict[str, np.ndarray]: The memory-mapped columns of each chunk.
+        """
+        for i in range(len(self.offsets) - 1):
+            yield {name: chunks[i] for name, chunks in self.columns.items()}
+
+
+def main() -> None:
+    """
+    Write a dataset of self-play games: python selfplay.py PATH [GAMES] [AGENT_1] [AGENT_2].
+    """
+    path = sys.argv[1]
+    num_games = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    names = tuple(sys.argv[3:5]) if len(sys.argv) > 4 else ("random", "random")
+    count = write_dataset(path, play_records(names, num_games))
+    print(f"Wrote {count} records from {num_games} games to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+from gamemanager import GameManager
+from gamestate import GameState
+from player import Player
+from compactboard import OFF_BOARD, decode_board
+from tickets import TicketTents
+from rules import Rules, DEFAULT_RULES
+from functools import lru_cache
+import mmap
+import struct
+
+MAGIC = b"CUPSNAP1"
+HEADER = struct.Struct("<8sBBBBQ")
+
+
+@lru_cache
+def record_struct(num_camels: int) -> struct.Struct:
+    """
+    Lays out one snapshot: each camel's space and height, the dice, the tickets taken per camel, both players' coins,
+    each player's bets per camel, the current player, the over flag, and the race's winning and second camels.
+
+    A bet is stored as a bitmask over positions in the camel's ticket stack, so the record has the same size
+    whatever has been bet.
+
+    Args:
+        num_camels (int): The number of camels.
+
+    Returns:
+        struct.Struct: The record layout.
+    """
+    n = num_camels
+    return struct.Struct(f"<{2 * n}b{n}B{n}B2h{2 * n}BB?bb")
+
+
+def bet_mask(bets: list[int], values: tuple[int, ...], color: str) -> int:
+    """
+    Finds which tickets of a stack a player holds.
+
+    Args:
+        bets (list[int]): The player's tickets on the camel, in the order taken.
+        values (tuple[int, ...]): The values of the camel's ticket stack, top ticket first.
+        color (str): The camel, for the error message.
+
+    Returns:
+        int: The bitmask of stack positions, bit i set for the i-th ticket from the top.
+
+    Raises:
+        ValueError: If the tickets cannot have been taken from the stack in that order.
+    """
+    mask, position = 0, 0
+    for ticket in bets:
+        while position < len(values) and values[position] != ticket:
+            position += 1
+        if position == len(values):
+            raise ValueError(f"Unexpected {color} bets {bets}")
+        mask |= 1 << position
+        position += 1
+    return mask
+
+
+@lru_cache
+def mask_values(values: tuple[int, ...]) -> tuple[tuple[int, ...], ...]:
+    """
+    Lists the tickets every bet bitmask stands for, so records can be decoded by lookup.
+
+    Args:
+        values (tuple[int, ...]): The values of a ticket stack, top ticket first.
+
+    Returns:
+        tuple[tuple[int, ...], ...]: The tickets, in the order taken, indexed by bitmask.
+    """
+    return tuple(
+        tuple(value for i, value in enumerate(values) if mask >> i & 1)
+        for mask in range(1 << len(values))
+    )
+
+
+def pack_game(game: GameManager) -> bytes:
+    """
+    Packs the state of a game into a fixed-size record. Player names and the rules are not stored.
+
+    Args:
+        game (GameManager): The game to pack.
+
+    Returns:
+        bytes: The record, record_struct(len(game.colors)).size bytes long.
+
+    Raises:
+        ValueError: If a ticket stack or a player's bets are not what the rules' tickets allow.
+    """
+    colors = game.colors
+    values = game.rules.tickets
+    board = [OFF_BOARD] * len(colors)
+    for space, stack in enumerate(game.board):
+        for height, camel in enumerate(stack):
+            board[colors.index(camel)] = (space, height)
+    if isinstance(game.cards, TicketTents):
+        taken = game.cards.taken
+    else:
+        taken = []
+        for color in colors:
+            count = len(values) - len(game.cards[color])
+            if tuple(game.cards[color]) != values[count:]:
+                raise ValueError(f"Unexpected {color} tickets {game.cards[color]}")
+            taken.append(count)
+    winner = second = -1
+    if game.over:
+        winner = colors.index(game.winning_camel.lower())
+        if game.second_camel:
+            second = colors.index(game.second_camel.lower())
+    return record_struct(len(colors)).pack(
+        *[value for position in board for value in position],
+        *[game.dice[color] for color in colors],
+        *taken,
+        *[player.coins for player in game.players],
+        *[
+            bet_mask(player.cards[color], values, color) if player.cards[color] else 0
+            for player in game.players
+            for color in colors
+        ],
+        game.turn,
+        game.over,
+        winner,
+        second,
+    )
+
+
+def unpack_game(
+    data,
+    offset: int = 0,
+    rules: Rules = DEFAULT_RULES,
+    names: tuple[str, str] = ("Player 1", "Player 2"),
+) -> GameManager:
+    """
+    Builds a game from a record written by pack_game.
+
+    Args:
+        data: A buffer holding the record, such as bytes or an mmap.
+        offset (int): The position of the record in data.
+        rules (Rules): The rules the game was played by.
+        names (tuple[str, str]): The names of the players.
+
+    Returns:
+        GameManager: A new game manager with new players.
+    """
+    n = len(rules.colors)
+    fields = record_struct(n).unpack_from(data, offset)
+    board = tuple(zip(fields[0 : 2 * n : 2], fields[1 : 2 * n : 2]))
+    dice = fields[2 * n : 3 * n]
+    taken = fields[3 * n : 4 * n]
+    coins = fields[4 * n : 4 * n + 2]
+    masks = fields[4 * n + 2 : 6 * n + 2]
+    turn, over, winner, second = fields[6 * n + 2 :]
+
+    game = GameManager(Player(names[0], rules), Player(names[1], rules), rules=rules)
+    colors = game.colors
+    bets = mask_values(rules.tickets)
+    game.board = decode_board(board, colors, rules.track_length)
+    game.dice = dict(zip(colors, dice))
+    game.cards = TicketTents(colors, taken, rules.tickets)
+    for p, player in enumerate(game.players):
+        player.coins = coins[p]
+        for color, mask in zip(colors, masks[p * n : (p + 1) * n]):
+            if mask:
+                player.cards[color].extend(bets[mask])
+    game.current_player = game.players[turn]
+    if over:
+        game.over = True
+        game.winning_camel = colors[winner].upper()
+        game.second_camel = colors[second].upper() if second >= 0 else ""
+    else:
+        game.reindex()
+        game.calculate_leg_winners()
+    return game
+
+
+def unpack_state(data, offset: int = 0, rules: Rules = DEFAULT_RULES) -> GameState:
+    """
+    Reads a record written by pack_game straight into a GameState, without building a GameManager.
+
+    Args:
+        data: A buffer holding the record, such as bytes or an mmap.
+        offset (int): The position of the record in data.
+        rules (Rules): The rules the game was played by.
+
+    Returns:
+        GameState: The state, equal to GameState.from_game(unpack_game(data, offset, rules)).
+    """
+    n = len(rules.colors)
+    fields = record_struct(n).unpack_from(data, offset)
+    bets = mask_values(rules.tickets)
+    masks = fields[4 * n + 2 : 6 * n + 2]
+    turn, _, winner, second = fields[6 * n + 2 :]
+    return GameState(
+        rules.colors,
+        tuple(zip(fields[0 : 2 * n : 2], fields[1 : 2 * n : 2])),
+        fields[2 * n : 3 * n],
+        fields[3 * n : 4 * n],
+        fields[4 * n : 4 * n + 2],
+        (
+            tuple(bets[mask] for mask in masks[:n]),
+            tuple(bets[mask] for mask in masks[n:]),
+        ),
+        turn,
+        winner,
+        second,
+        rules.track_length,
+        rules.faces,
+        rules.tickets,
+    )
+
+
+def write_snapshots(path: str, games, rules: Rules = DEFAULT_RULES) -> int:
+    """
+    Writes games to a flat file of fixed-size records that Snapshots can map.
+
+    Args:
+        path (str): The file to write.
+        games: An iterable of games played by rules.
+        rules (Rules): The rules the games are played by.
+
+    Returns:
+        int: The number of records written.
+    """
+    count = 0
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, 0, 0, 0, 0, 0))
+        for game in games:
+            file.write(pack_game(game))
+            count += 1
+        file.seek(0)
+        file.write(
+            HEADER.pack(
+                MAGIC,
+                len(rules.colors),
+                rules.track_length,
+                len(rules.faces),
+                len(rules.tickets),
+                count,
+            )
+        )
+    return count
+
+
+class Snapshots:
+    """
+    A read-only, memory-mapped file of game snapshots, indexed by record number.
+    """
+
+    def __init__(self, path: str, rules: Rules = DEFAULT_RULES):
+        """
+        Opens a file written by write_snapshots. Nothing is parsed beyond the header.
+
+        Args:
+            path (str): The snapshot file.
+            rules (Rules): The rules the games were played by.
+
+        Raises:
+            ValueError: If the file is not a snapshot file or was written under different rules.
+        """
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, num_camels, track_length, num_faces, num_tickets, self.count = (
+            HEADER.unpack_from(self.data)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        if (num_camels, track_length, num_faces, num_tickets) != (
+            len(rules.colors),
+            rules.track_length,
+            len(rules.faces),
+            len(rules.tickets),
+        ):
+            raise ValueError(f"{path} was written under different rules")
+        self.rules = rules
+        self.record_size = record_struct(num_camels).size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> GameManager:
+        """
+        Unpacks one snapshot.
+
+        Args:
+            index (int): The record number.
+
+        Returns:
+            GameManager: The game.
+        """
+        return unpack_game(self.data, self.offset(index), self.rules)
+
+    def offset(self, index: int) -> int:
+        """
+        Finds where a record starts in the file.
+
+        Args:
+            index (int): The record number.
+
+        Returns:
+            int: The byte offset of the record.
+
+        Raises:
+            IndexError: If there is no such record.
+        """
+        if not -self.count <= index < self.count:
+            raise IndexError(f"Snapshot {index} out of range")
+        return HEADER.size + self.record_size * (index % self.count)
+
+    def record(self, index: int) -> bytes:
+        """
+        Reads one packed record without unpacking it, for example to send to a worker process.
+
+        Args:
+            index (int): The record number.
+
+        Returns:
+            bytes: The record.
+        """
+        offset = self.offset(index)
+        return self.data[offset : offset + self.record_size]
+
+    def close(self) -> None:
+        """
+        Unmaps the file.
+        """
+        self.data.close()
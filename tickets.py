@@ -0,0 +1,115 @@
+from rules import DEFAULT_RULES
+from collections.abc import Mapping
+
+TICKET_VALUES = DEFAULT_RULES.tickets
+
+
+class TicketTents(Mapping):
+    """
+    The leg betting tickets left for each camel, stored as how many tickets have been taken from a fixed stack.
+
+    Taking a ticket is an index increment and a leg reset zeroes the indices in place, so playing a leg allocates
+    nothing. Reading a color returns its remaining tickets as a new list, top ticket first, so the tents compare
+    equal to the dict of lists GameManager used to keep. That read allocates, so hot paths such as legal_actions and
+    EV evaluation use remaining and top instead and indexing is kept for compatibility.
+    """
+
+    __slots__ = ("colors", "index", "taken", "values")
+
+    def __init__(
+        self,
+        colors: list[str],
+        taken: list[int] = None,
+        values: tuple[int, ...] = TICKET_VALUES,
+    ):
+        """
+        Initializes the tents.
+
+        Args:
+            colors (list[str]): The camel colors.
+            taken (list[int]): The number of tickets already taken per color. Defaults to none.
+            values (tuple[int, ...]): The values of the tickets in each stack, top ticket first.
+        """
+        self.colors = tuple(colors)
+        self.index = {color: i for i, color in enumerate(self.colors)}
+        self.taken = [0] * len(self.colors) if taken is None else list(taken)
+        self.values = tuple(values)
+
+    def __getitem__(self, color: str) -> list[int]:
+        return list(self.values[self.taken[self.index[color]] :])
+
+    def __setitem__(self, color: str, tickets: list[int]) -> None:
+        """
+        Sets the tickets left for a camel, which must be what is left of the stack after taking from the top.
+
+        Raises:
+            ValueError: If the tickets are not what is left of the stack.
+        """
+        taken = len(self.values) - len(tickets)
+        if taken < 0 or tuple(tickets) != self.values[taken:]:
+            raise ValueError(f"Unexpected {color} tickets {tickets}")
+        self.taken[self.index[color]] = taken
+
+    def __contains__(self, color) -> bool:
+        return color in self.index
+
+    def __iter__(self):
+        return iter(self.colors)
+
+    def __len__(self) -> int:
+        return len(self.colors)
+
+    def __repr__(self) -> str:
+        return f"TicketTents({dict(self)})"
+
+    def remaining(self, color: str) -> int:
+        """
+        Counts the tickets left for a camel.
+
+        Args:
+            color (str): The camel color.
+
+        Returns:
+            int: The number of tickets left.
+        """
+        return len(self.values) - self.taken[self.index[color]]
+
+    def top(self, color: str) -> int:
+        """
+        Looks up the value of the next ticket for a camel.
+
+        Args:
+            color (str): The camel color.
+
+        Returns:
+            int: The value of the top ticket, or 0 if none are left.
+        """
+        taken = self.taken[self.index[color]]
+        return self.values[taken] if taken < len(self.values) else 0
+
+    def take(self, color: str) -> int:
+        """
+        Takes the top ticket for a camel.
+
+        Args:
+            color (str): The camel color.
+
+        Returns:
+            int: The value of the ticket taken.
+
+        Raises:
+            IndexError: If there are no tickets left for the camel.
+        """
+        i = self.index[color]
+        taken = self.taken[i]
+        if taken >= len(self.values):
+            raise IndexError(f"There are no {color} tickets left")
+        self.taken[i] = taken + 1
+        return self.values[taken]
+
+    def reset(self) -> None:
+        """
+        Puts every ticket back, in place.
+        """
+        for i in range(len(self.taken)):
+            self.taken[i] = 0
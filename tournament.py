@@ -0,0 +1,232 @@
+from gamemanager import GameManager
+from player import Player
+from agents import make_agent
+from rng import GameRNG
+from dataclasses import dataclass
+from itertools import repeat
+from math import sqrt
+import time
+
+
+@dataclass(frozen=True, slots=True)
+class GameResult:
+    """
+    The outcome of one tournament game, from the point of view of the first agent, A.
+    """
+
+    pair: int
+    swapped: bool
+    margin: int
+    turns: int
+    seconds: float
+
+
+def play_match(
+    names: tuple[str, str], seed, pair: int, swapped: bool, time_limit: float = 1.0
+) -> GameResult:
+    """
+    Plays one game between two agents.
+
+    Both games of a pair share the seed "<seed>/<pair>", so they start from the same camels and draw dice from the
+    same stream, and only the seats are swapped.
+
+    Args:
+        names (tuple[str, str]): The names of agents A and B, as in agents.AGENTS.
+        seed: The seed of the tournament.
+        pair (int): The index of the pair of games.
+        swapped (bool): Whether B sits in the first seat.
+        time_limit (float): The number of seconds a search agent may spend per move.
+
+    Returns:
+        GameResult: The result.
+    """
+    start = time.perf_counter()
+    rng = GameRNG(seed).child(pair)
+    agents = [
+        make_agent(name, time_limit, f"{seed}/{pair}/{name}/{seat}")
+        for seat, name in enumerate(names)
+    ]
+    if swapped:
+        agents.reverse()
+    game = GameManager(Player("A"), Player("B"), rng=rng)
+    game.init_camels()
+    turns = 0
+    while not game.over:
+        game.apply(agents[game.turn].choose(game))
+        turns += 1
+    margin = game.players[0].coins - game.players[1].coins
+    return GameResult(
+        pair,
+        swapped,
+        -margin if swapped else margin,
+        turns,
+        time.perf_counter() - start,
+    )
+
+
+def play_pair(
+    names: tuple[str, str], seed, pair: int, time_limit: float = 1.0
+) -> tuple[GameResult, GameResult]:
+    """
+    Plays both games of a pair in one worker, once from each seat.
+
+    The two games start from the same camels and dice, so the second mostly hits the leg counts the first left in
+    this process's caches. Splitting a pair across workers would count every leg twice.
+
+    Args:
+        names (tuple[str, str]): The names of agents A and B.
+        seed: The seed of the tournament.
+        pair (int): The index of the pair.
+        time_limit (float): The number of seconds a search agent may spend per move.
+
+    Returns:
+        tuple[GameResult, GameResult]: The results, A in the first seat and then B.
+    """
+    return (
+        play_match(names, seed, pair, False, time_limit),
+        play_match(names, seed, pair, True, time_limit),
+    )
+
+
+class RunningMean:
+    """
+    A mean and variance updated one value at a time with Welford's algorithm.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float) -> None:
+        """
+        Adds a value.
+
+        Args:
+            value (float): The value.
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def stderr(self) -> float:
+        """
+        Estimates the standard error of the mean.
+
+        Returns:
+            float: The standard error, or 0 with fewer than two values.
+        """
+        if self.count < 2:
+            return 0.0
+        return sqrt(self.m2 / (self.count - 1) / self.count)
+
+
+class TournamentStats:
+    """
+    Aggregates tournament results as they stream in. Memory does not grow with the number of games: only the
+    pairs still waiting for their second game are kept.
+    """
+
+    def __init__(self, names: tuple[str, str]):
+        """
+        Initializes empty statistics.
+
+        Args:
+            names (tuple[str, str]): The names of agents A and B.
+        """
+        self.names = names
+        self.score = RunningMean()
+        self.margin = RunningMean()
+        self.paired_margin = RunningMean()
+        self.open_pairs = {}
+        self.turns = 0
+        self.seconds = 0.0
+
+    @property
+    def games(self) -> int:
+        """
+        The number of games added.
+        """
+        return self.score.count
+
+    def add(self, result: GameResult) -> None:
+        """
+        Adds the result of a game.
+
+        Args:
+            result (GameResult): The result.
+        """
+        self.score.add(1.0 if result.margin > 0 else 0.5 if result.margin == 0 else 0.0)
+        self.margin.add(result.margin)
+        other = self.open_pairs.pop(result.pair, None)
+        if other is None:
+            self.open_pairs[result.pair] = result.margin
+        else:
+            self.paired_margin.add((result.margin + other) / 2)
+        self.turns += result.turns
+        self.seconds += result.seconds
+
+    def report(self, elapsed: float, workers: int, z: float = 1.96) -> str:
+        """
+        Summarizes the tournament so far.
+
+        Args:
+            elapsed (float): The wall-clock seconds spent.
+            workers (int): The number of worker processes.
+            z (float): The number of standard errors for the confidence intervals, 1.96 for 95%.
+
+        Returns:
+            str: The win rate and coin margins of agent A with confidence intervals, and the speed in games per
+                second per core.
+        """
+        a, b = self.names
+        return "\n".join(
+            [
+                f"{a} vs {b}: {self.games} games, {self.turns / max(self.games, 1):.1f} turns per game",
+                f"{a} win rate {self.score.mean:.3f} ± {z * self.score.stderr():.3f} (ties count half)",
+                f"{a} mean coin margin {self.margin.mean:+.2f} ± {z * self.margin.stderr():.2f}",
+                f"{a} paired coin margin {self.paired_margin.mean:+.2f} ± {z * self.paired_margin.stderr():.2f}"
+                f" over {self.paired_margin.count} seat-swapped pairs",
+                f"{self.games / elapsed:.1f} games/s on {workers} workers,"
+                f" {self.games / elapsed / workers:.1f} games/s per core,"
+                f" {self.games / self.seconds if self.seconds else 0.0:.1f} games per second of game time",
+            ]
+        )
+
+
+def run_tournament(
+    names: tuple[str, str],
+    games: int,
+    seed=0,
+    parallel=None,
+    time_limit: float = 1.0,
+    progress=None,
+) -> TournamentStats:
+    """
+    Plays agent A against agent B, swapping seats every other game, and aggregates the results as they arrive.
+
+    Every pair of games is its own task (see play_pair), so results reach the parent two at a time as soon as their
+    pair and the ones before it have finished, and at most a couple of pairs per worker are in flight.
+
+    Args:
+        names (tuple[str, str]): The names of agents A and B, as in agents.AGENTS.
+        games (int): The number of games, rounded up to a whole number of pairs.
+        seed: The seed of the tournament. The same seed replays the same camels and dice.
+        parallel (ParallelEngine): The worker pool to play pairs on, or None to play them here.
+        time_limit (float): The number of seconds a search agent may spend per move.
+        progress: Called with the statistics after every game, or None.
+
+    Returns:
+        TournamentStats: The aggregated results.
+    """
+    pairs = (games + 1) // 2
+    args = (repeat(names), repeat(seed), range(pairs), repeat(time_limit))
+    results = parallel.map(play_pair, *args) if parallel else map(play_pair, *args)
+    stats = TournamentStats(names)
+    for pair in results:
+        for result in pair:
+            stats.add(result)
+            if progress is not None:
+                progress(stats)
+    return stats
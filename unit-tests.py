@@ -1,9 +1,52 @@
 import unittest
+from unittest import mock
 from gamemanager import GameManager
 from evbot import EVBot
 from player import Player
-from playgame import PlayGame
+from playgame import PlayGame, short_names
+from compactboard import (
+    encode_board,
+    decode_board,
+    move,
+    leaders,
+    canonicalize,
+    count_leg_outcomes,
+    count_leg_scenarios,
+)
+from legcache import LegCache
+from racesim import RaceSimulator
+from parallelengine import ParallelEngine
+from legtable import LegTable, build_table, canonical_boards
+from openingbook import OpeningBook, build_book, opening_boards
+from gamestate import GameState
+from tickets import TicketTents
+from rules import Rules, DEFAULT_RULES
+from snapshot import Snapshots, record_struct, write_snapshots
+from eventlog import EventLog, EventArchive
+from agents import (
+    RandomAgent,
+    EVAgent,
+    ExpectimaxAgent,
+    TranspositionTable,
+    MCTSAgent,
+    ChanceNode,
+    bet_evs,
+    make_agent,
+)
+from tournament import (
+    GameResult,
+    RunningMean,
+    TournamentStats,
+    play_match,
+    run_tournament,
+)
+from rng import GameRNG
 from copy import deepcopy
+import importlib.util
+import os
+import tempfile
+from itertools import permutations, product
+import random
 
 
 class TestPlayGame(unittest.TestCase):
@@ -133,6 +176,30 @@ class TestPlayGame(unittest.TestCase):
         self.assertEqual(self.game.current_player.name, "Alice")
         self.assertEqual(self.alice.coins, 2)
 
+    def test_5(self):
+        """
+        Test that short names for bets are unique when colors share a first letter.
+        """
+        self.assertEqual(
+            short_names(["red", "green", "blue", "yellow", "purple"]),
+            {"r": "red", "g": "green", "b": "blue", "y": "yellow", "p": "purple"},
+        )
+        names = short_names(DEFAULT_RULES.with_camels(7).colors)
+        self.assertEqual(names["blu"], "blue")
+        self.assertEqual(names["bla"], "black")
+        self.assertNotIn("b", names)
+        self.assertEqual(
+            sorted(names.values()), sorted(DEFAULT_RULES.with_camels(7).colors)
+        )
+
+    def test_6(self):
+        """
+        Test that a bot buying a hint does not wait for ENTER.
+        """
+        with mock.patch("builtins.input", side_effect=AssertionError):
+            self.game.take_turn("H", None, True)
+        self.assertEqual(self.alice.coins, 2)
+
 
 class TestPlayer(unittest.TestCase):
     """
@@ -258,7 +325,13 @@ class TestEVBot(unittest.TestCase):
         """
         Test a simulation for the given camel, roll, and game board.
         """
-        pass
+        board = [[] for _ in range(16)]
+        board[0].extend(["red", "green"])
+        board[1].append("blue")
+        actual = self.bot.simulate_move("red", 1, board)
+        self.assertListEqual(actual[0][1], ["blue", "red", "green"])
+        self.assertEqual(actual[1:], ("", ""))
+        self.assertListEqual(board[0], ["red", "green"])
 
     # Test EVBot.calculate_ev
     def test_2(self):
@@ -274,30 +347,1387 @@ class TestEVBot(unittest.TestCase):
 
         NOTE: Implicitly tests find_simulated_winner as well.
         """
-        pass
+        for color, roll in [("red", 2), ("blue", 1)]:
+            self.game.dice[color] = roll
+            self.game.move_camels(color, roll)
+        available_dice = [key for key in self.game.dice if self.game.dice[key] == 0]
+        win_counts = {color: 0 for color in self.game.colors}
+        second_counts = {color: 0 for color in self.game.colors}
+        for order in permutations(available_dice):
+            for combo in product([1, 2, 3], repeat=len(available_dice)):
+                board = deepcopy(self.game.board)
+                for camel, roll in zip(order, combo):
+                    board, winning_camel, second_camel = self.bot.simulate_move(
+                        camel, roll, board
+                    )
+                    if winning_camel:
+                        break
+                if not winning_camel:
+                    winning_camel, second_camel = self.bot.find_simulated_winner(board)
+                win_counts[winning_camel] += 1
+                if second_camel:
+                    second_counts[second_camel] += 1
+
+        wins, seconds = self.bot.count_leg_outcomes(
+            encode_board(self.game.board, self.game.colors),
+            tuple(self.game.colors.index(color) for color in available_dice),
+        )
+        self.assertEqual(wins, tuple(win_counts.values()))
+        self.assertEqual(seconds, tuple(second_counts.values()))
+        self.assertEqual(sum(wins), self.bot.count_leg_scenarios(3))
 
     def test_4(self):
         """
-        Test EV calculations for all camels.
+        Test EV calculations for all camels on random boards, where the cached counts are computed on a
+        color-canonical board and mapped back to real colors.
 
         NOTE: Implicitly tests find_simulated_winner as well.
         """
-        pass
+        random.seed(4)
+        colors = self.game.colors
+        for _ in range(20):
+            self.game.board = [[] for _ in range(16)]
+            self.game.dice = {color: 0 for color in colors}
+            self.game.init_camels()
+            for color in random.sample(colors, random.randint(1, 3)):
+                self.game.dice[color] = random.randint(1, 3)
+                self.game.move_camels(color, self.game.dice[color])
+            dice = tuple(
+                i for i, color in enumerate(colors) if not self.game.dice[color]
+            )
+            wins, seconds = self.bot.count_leg_outcomes(
+                encode_board(self.game.board, colors), dice
+            )
+            self.assertEqual(
+                EVBot(self.game, LegCache()).leg_outcomes(),
+                (wins, seconds, self.bot.count_leg_scenarios(len(dice))),
+            )
 
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "requires NumPy")
     def test_5(self):
         """
-        Test EV calculations for all camels.
+        Test EV calculations for all camels with the NumPy engine, including legs where a camel finishes.
 
         NOTE: Implicitly tests find_simulated_winner as well.
         """
-        pass
+        random.seed(5)
+        for _ in range(20):
+            self.game.board = [[] for _ in range(16)]
+            self.game.dice = {color: 0 for color in self.game.colors}
+            self.game.init_camels()
+            for _ in range(random.randint(0, 4)):
+                for color in self.game.colors:
+                    self.game.move_camels(color, random.randint(1, 3))
+            for color in random.sample(self.game.colors, random.randint(1, 3)):
+                self.game.dice[color] = 1
+            self.assertEqual(
+                EVBot(self.game, LegCache(), engine="numpy").leg_outcomes(),
+                EVBot(self.game, LegCache()).leg_outcomes(),
+            )
 
     def test_6(self):
         """
         Test EV calculations with the edge case that there
         are no remaining betting cards for some colors.
         """
-        pass
+        self.game.cards["red"] = []
+        self.game.cards["blue"] = []
+        result = self.bot.evaluate()
+        self.assertFalse(result["red"].bet_available)
+        self.assertFalse(result["blue"].bet_available)
+        self.assertTrue(result["green"].bet_available)
+        self.assertNotIn(result.color, ["red", "blue"])
+        self.assertEqual(self.bot.calculate_ev().count("BET NOT POSSIBLE"), 2)
+
+    def test_7(self):
+        """
+        Test the structured result against the leg probabilities and the rendered hint.
+        """
+        result = self.bot.evaluate()
+        prob_win, prob_second = self.bot.leg_probabilities()
+        self.assertEqual(tuple(camel.prob_win for camel in result.camels), prob_win)
+        self.assertAlmostEqual(sum(camel.prob_win for camel in result.camels), 1)
+        best = max(result.camels, key=lambda camel: camel.ev)
+        self.assertEqual(result.action, "B" if best.ev > 1 else "R")
+        self.assertEqual(result.to_dict()["camels"][0]["color"], "red")
+        self.assertEqual(self.bot.format_ev(result), self.bot.calculate_ev())
+
+    def test_8(self):
+        """
+        Test sampled EV estimates under a sample budget.
+        """
+        bot = EVBot(self.game, LegCache())
+        result = bot.evaluate(max_samples=2000, seed=8)
+        self.assertFalse(result.exact)
+        self.assertEqual(result.samples, 2000)
+        for camel, exact in zip(result.camels, self.bot.evaluate().camels):
+            low, high = camel.win_interval(z=5)
+            self.assertTrue(low <= exact.prob_win <= high)
+            self.assertGreaterEqual(camel.second_stderr, 0)
+        self.assertIn("±", bot.format_ev(result))
+
+    def test_9(self):
+        """
+        Test that generous budgets and cached legs fall back to exact enumeration.
+        """
+        self.game.dice.update(red=1, green=2)
+        bot = EVBot(self.game, LegCache())
+        self.assertTrue(bot.evaluate(max_samples=10**6).exact)
+        self.assertEqual(bot.evaluate(max_samples=10**6).samples, 162)
+        self.assertTrue(EVBot(self.game, LegCache()).evaluate(time_budget=60).exact)
+        self.assertTrue(bot.evaluate(time_budget=0.0, max_samples=10).exact)
+        for budget in [{"max_samples": 0}, {"max_samples": -1}, {"time_budget": -1}]:
+            with self.assertRaises(ValueError):
+                bot.evaluate(**budget)
+
+    def test_10(self):
+        """
+        Test that the two-ply evaluation allows for the opponent taking the next ticket.
+        """
+        self.game.board = [[] for _ in range(16)]
+        self.game.board[0] = ["green", "blue", "yellow", "purple"]
+        self.game.board[10] = ["red"]
+        self.game.dice = {"red": 1, "green": 0, "blue": 2, "yellow": 3, "purple": 1}
+        result = EVBot(self.game, LegCache()).evaluate_two_ply()
+        self.assertAlmostEqual(result.roll, 1)
+        self.assertAlmostEqual(result.bets[0], 2)
+        self.assertEqual(result.replies[0], ("B", "red"))
+        self.assertEqual((result.action, result.color), ("B", "red"))
+
+    def test_11(self):
+        """
+        Test that two-ply evaluations share one memo, and skip camels with no tickets left.
+        """
+        self.game.dice.update(red=1, green=2)
+        for _ in range(4):
+            self.game.apply(("B", "blue"))
+        memo = {}
+        result = EVBot(self.game, LegCache()).evaluate_two_ply(memo)
+        size = len(memo)
+        self.assertGreater(size, 0)
+        self.assertEqual(EVBot(self.game, LegCache()).evaluate_two_ply(memo), result)
+        self.assertEqual(len(memo), size)
+        self.assertIsNone(result.bets[2])
+        self.assertIsNone(result.replies[2])
+        best = max(value for value in result.bets if value is not None)
+        self.assertEqual(result.action, "B" if best > result.roll else "R")
+        self.assertEqual(result.to_dict()["colors"], tuple(self.game.colors))
+
+
+class TestCompactBoard(unittest.TestCase):
+    """
+    Unit test cases for the compact board encoding.
+    """
+
+    def setUp(self) -> None:
+        random.seed(0)
+        self.game = GameManager(Player("Alice"), Player("Bob"))
+        self.colors = self.game.colors
+
+    def test_0(self):
+        """
+        Encoding and decoding a board is lossless.
+        """
+        for _ in range(50):
+            self.game.board = [[] for _ in range(16)]
+            self.game.init_camels()
+            for _ in range(random.randint(0, 5)):
+                self.game.move_camels(random.choice(self.colors), random.randint(1, 3))
+            state = encode_board(self.game.board, self.colors)
+            self.assertEqual(decode_board(state, self.colors), self.game.board)
+
+    def test_1(self):
+        """
+        Compact moves match GameManager.move_camels, including finishing moves.
+        """
+        for _ in range(200):
+            self.game.board = [[] for _ in range(16)]
+            self.game.init_camels()
+            state = encode_board(self.game.board, self.colors)
+            self.game.over = False
+            while not self.game.over:
+                camel, roll = random.choice(self.colors), random.randint(1, 3)
+                self.game.move_camels(camel, roll)
+                state, winner, second = move(state, self.colors.index(camel), roll)
+                self.assertEqual(decode_board(state, self.colors), self.game.board)
+            self.assertEqual(self.colors[winner].upper(), self.game.winning_camel)
+            self.assertEqual(
+                self.colors[second].upper() if second >= 0 else "",
+                self.game.second_camel,
+            )
+
+    def test_2(self):
+        """
+        Compact leaders match GameManager.calculate_leg_winners.
+        """
+        for _ in range(50):
+            self.game.board = [[] for _ in range(16)]
+            self.game.init_camels()
+            for camel in self.colors:
+                self.game.move_camels(camel, random.randint(1, 3))
+            winner, second = leaders(encode_board(self.game.board, self.colors))
+            self.assertEqual(self.colors[winner], self.game.winning_camel)
+            self.assertEqual(self.colors[second], self.game.second_camel)
+
+
+class TestLegCache(unittest.TestCase):
+    """
+    Unit test cases for the LegCache class.
+    """
+
+    def setUp(self) -> None:
+        self.cache = LegCache(capacity=2)
+        self.game = GameManager(Player("Alice"), Player("Bob"))
+        self.game.board[0].extend(["red", "yellow"])
+        self.game.board[1].append("green")
+        self.game.board[2].extend(["blue", "purple"])
+        self.game.dice.update(red=1, green=2, blue=3)
+
+    def test_0(self):
+        """
+        The least recently used entry is evicted once the cache is full.
+        """
+        self.cache.put("a", 1)
+        self.cache.put("b", 2)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.cache.put("c", 3)
+        self.assertNotIn("b", self.cache)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(
+            (self.cache.hits, self.cache.misses, self.cache.evictions), (1, 1, 1)
+        )
+        self.assertEqual(len(self.cache), 2)
+
+    def test_1(self):
+        """
+        Repeated hints on the same leg hit the cache, even after tickets are taken.
+        """
+        first = EVBot(self.game, self.cache).calculate_ev()
+        self.game.cards = self.game.players[0].take_bet("yellow", self.game.cards)
+        EVBot(self.game, self.cache).calculate_ev()
+        self.game.cards = self.game.players[1].take_bet("yellow", self.game.cards)
+        EVBot(self.game, self.cache).calculate_ev()
+        self.assertEqual(self.cache.stats()["misses"], 1)
+        self.assertEqual(self.cache.stats()["hits"], 2)
+        self.assertNotEqual(first, EVBot(self.game, self.cache).calculate_ev())
+
+    def test_2(self):
+        """
+        Cached probabilities match a fresh count.
+        """
+        bot = EVBot(self.game, self.cache)
+        prob_win, prob_second = bot.leg_probabilities()
+        wins, seconds = bot.count_leg_outcomes(
+            encode_board(self.game.board, self.game.colors), (3, 4)
+        )
+        self.assertEqual(prob_win, tuple(count / 18 for count in wins))
+        self.assertEqual(prob_second, tuple(count / 18 for count in seconds))
+
+    def test_3(self):
+        """
+        Boards that only differ by camel colors share a cache entry.
+        """
+        game = GameManager(Player("Alice"), Player("Bob"))
+        swap = {"red": "blue", "blue": "red", "green": "purple", "purple": "green"}
+        game.board = [
+            [swap.get(camel, camel) for camel in stack] for stack in self.game.board
+        ]
+        game.dice.update(blue=1, purple=2, red=3)
+        first = EVBot(self.game, self.cache).leg_outcomes()
+        second = EVBot(game, self.cache).leg_outcomes()
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(second[0][0], first[0][2])
+        self.assertEqual(second[1][4], first[1][1])
+
+
+class TestRaceSimulator(unittest.TestCase):
+    """
+    Unit test cases for the RaceSimulator class.
+    """
+
+    def setUp(self) -> None:
+        self.game = GameManager(Player("Alice"), Player("Bob"))
+        self.game.board[0].extend(["red", "yellow"])
+        self.game.board[1].append("green")
+        self.game.board[2].extend(["blue", "purple"])
+
+    def test_0(self):
+        """
+        Races are reproducible from a seed, and every race has one winner and one loser.
+        """
+        simulator = RaceSimulator(self.game)
+        odds = simulator.simulate(samples=500, seed=1)
+        self.assertEqual(odds, simulator.simulate(samples=500, seed=1))
+        self.assertAlmostEqual(sum(odds.prob_win), 1)
+        self.assertAlmostEqual(sum(odds.prob_lose), 1)
+        self.assertEqual(odds.samples, 500)
+
+    def test_1(self):
+        """
+        A camel one step from the finish with the only die left always wins.
+        """
+        self.game.board = [[] for _ in range(16)]
+        self.game.board[15].append("red")
+        self.game.board[3].extend(["green", "blue", "yellow", "purple"])
+        self.game.dice = {color: 1 for color in self.game.colors}
+        self.game.dice["red"] = 0
+        odds = RaceSimulator(self.game).simulate(samples=100, seed=1)
+        self.assertEqual(odds.prob_win, (1.0, 0.0, 0.0, 0.0, 0.0))
+        self.assertEqual(odds.prob_lose, (0.0, 1.0, 0.0, 0.0, 0.0))
+
+    def test_2(self):
+        """
+        The simulation stops once the estimates converge.
+        """
+        odds = RaceSimulator(self.game).simulate(
+            samples=100_000, seed=1, tolerance=0.02, batch_size=200
+        )
+        self.assertLess(odds.samples, 100_000)
+        self.assertLessEqual(max(odds.win_stderr + odds.lose_stderr), 0.02)
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "requires NumPy")
+    def test_3(self):
+        """
+        The NumPy engine agrees with the pure-Python engine.
+        """
+        python = RaceSimulator(self.game).simulate(samples=4000, seed=1)
+        vectorized = RaceSimulator(self.game, engine="numpy").simulate(
+            samples=20_000, seed=1
+        )
+        self.assertEqual(
+            vectorized, RaceSimulator(self.game, "numpy").simulate(20_000, 1)
+        )
+        for p, q, stderr in zip(
+            python.prob_win, vectorized.prob_win, python.win_stderr
+        ):
+            self.assertLess(abs(p - q), 5 * stderr + 0.01)
+        for p, q, stderr in zip(
+            python.prob_lose, vectorized.prob_lose, python.lose_stderr
+        ):
+            self.assertLess(abs(p - q), 5 * stderr + 0.01)
+
+
+class TestParallelEngine(unittest.TestCase):
+    """
+    Unit test cases for the ParallelEngine class.
+    """
+
+    def setUp(self) -> None:
+        self.engine = ParallelEngine(workers=2)
+        self.game = GameManager(Player("Alice"), Player("Bob"))
+        self.game.board[0].extend(["red", "yellow"])
+        self.game.board[1].append("green")
+        self.game.board[2].extend(["blue", "purple"])
+        self.game.dice["red"] = 1
+
+    def tearDown(self) -> None:
+        self.engine.shutdown()
+
+    def test_0(self):
+        """
+        Leg counts split across workers match the serial count, and the workers persist between hints.
+        """
+        bot = EVBot(self.game, LegCache(), parallel=self.engine)
+        self.assertEqual(
+            bot.leg_outcomes(), EVBot(self.game, LegCache()).leg_outcomes()
+        )
+        executor = self.engine.executor
+        self.game.dice["green"] = 1
+        self.assertEqual(
+            bot.leg_outcomes(), EVBot(self.game, LegCache()).leg_outcomes()
+        )
+        self.assertIs(self.engine.executor, executor)
+
+    def test_1(self):
+        """
+        Race results depend only on the seed, not on the number of workers.
+        """
+        simulator = RaceSimulator(self.game)
+        serial = simulator.simulate(samples=900, seed=3, batch_size=100)
+        self.assertEqual(
+            simulator.simulate(
+                samples=900, seed=3, batch_size=100, parallel=self.engine
+            ),
+            serial,
+        )
+        with ParallelEngine(workers=3) as engine:
+            self.assertEqual(
+                simulator.simulate(
+                    samples=900, seed=3, batch_size=100, parallel=engine
+                ),
+                serial,
+            )
+
+
+class TestLegTable(unittest.TestCase):
+    """
+    Unit test cases for the LegTable class.
+    """
+
+    def setUp(self) -> None:
+        self.game = GameManager(Player("Alice"), Player("Bob"))
+        self.game.board[0].extend(["red", "yellow"])
+        self.game.board[1].append("green")
+        self.game.board[2].extend(["blue", "purple"])
+        self.game.dice["red"] = self.game.dice["green"] = 1
+        board, _, _ = canonicalize(encode_board(self.game.board, self.game.colors), ())
+        self.boards = [board] + list(canonical_boards())[::2000]
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "legtable.bin")
+        build_table(self.path, boards=self.boards)
+        self.table = LegTable(self.path)
+
+    def tearDown(self) -> None:
+        self.table.close()
+        self.directory.cleanup()
+
+    def test_0(self):
+        """
+        Every tabulated board and set of dice matches a fresh count.
+        """
+        for board in self.boards:
+            for dice in [(0,), (1, 3), (0, 2, 4)]:
+                wins, seconds = count_leg_outcomes(board, dice)
+                self.assertEqual(
+                    self.table.get(board, dice),
+                    (wins, seconds, count_leg_scenarios(len(dice))),
+                )
+
+    def test_1(self):
+        """
+        States that were not tabulated, or cannot be packed, are misses.
+        """
+        self.assertIsNone(self.table.get(self.boards[0], (0, 1, 2, 3)))
+        self.assertIsNone(self.table.get(((-1, -1),) * 5, (0,)))
+        self.assertIsNone(self.table.get(((15, 0),) * 4, (0,)))
+
+    def test_2(self):
+        """
+        EVBot answers from the table without counting, and agrees with the counted result.
+        """
+        cache = LegCache()
+        bot = EVBot(self.game, cache, table=self.table)
+        bot.count_leg_outcomes = None
+        counted = EVBot(self.game, LegCache())
+        counted.table = None
+        self.assertEqual(bot.leg_outcomes(), counted.leg_outcomes())
+        self.assertEqual(len(cache), 1)
+
+    def test_3(self):
+        """
+        Tables are counted and keyed under the rules they are built for, and refuse tracks too long to pack.
+        """
+        rules = Rules(track_length=8, faces=(1, 2))
+        board = ((0, 0), (0, 1), (3, 0), (5, 0), (5, 1))
+        path = os.path.join(self.directory.name, "short.bin")
+        build_table(path, max_dice=2, boards=[board], rules=rules)
+        table = LegTable(path)
+        wins, seconds = count_leg_outcomes(board, (1, 3), rules.faces, 8)
+        self.assertEqual(
+            table.get(board, (1, 3)), (wins, seconds, count_leg_scenarios(2, 2))
+        )
+        self.assertIsNone(table.get(((8, 0),) * 5, (0,)))
+        table.close()
+        with self.assertRaises(ValueError):
+            build_table(path, boards=[board], rules=Rules(track_length=24))
+
+
+class TestOpeningBook(unittest.TestCase):
+    """
+    Unit test cases for the OpeningBook class.
+    """
+
+    def setUp(self) -> None:
+        self.book = OpeningBook()
+        self.game = GameManager(Player("Alice"), Player("Bob"))
+        random.seed(11)
+        self.game.init_camels()
+
+    def test_0(self):
+        """
+        The book holds every board init_camels can deal.
+        """
+        self.assertEqual(len(self.book), len(set(opening_boards())))
+        self.assertEqual(len(self.book), 21)
+        for _ in range(50):
+            game = GameManager(Player("Alice"), Player("Bob"))
+            game.init_camels()
+            board, _, _ = canonicalize(encode_board(game.board, game.colors), ())
+            self.assertIn(board, self.book)
+
+    def test_1(self):
+        """
+        Every evaluator reproduces the first-leg counts in the book.
+        """
+        dice = tuple(range(5))
+        for board in opening_boards():
+            wins, seconds, total = self.book.get(board, dice)
+            self.assertEqual(count_leg_outcomes(board, dice), (wins, seconds))
+            self.assertEqual(sum(wins), total)
+            if importlib.util.find_spec("numpy"):
+                import numpyengine
+
+                self.assertEqual(
+                    numpyengine.count_leg_outcomes(board, dice, [1, 2, 3]),
+                    (wins, seconds),
+                )
+
+    def test_2(self):
+        """
+        The first hint of a game is answered from the book without counting.
+        """
+        cache = LegCache()
+        bot = EVBot(self.game, cache, book=self.book)
+        bot.count_leg_outcomes = None
+        counted = EVBot(self.game, LegCache())
+        counted.table = counted.book = None
+        self.assertEqual(bot.leg_outcomes(), counted.leg_outcomes())
+        self.assertEqual(len(cache), 1)
+
+    def test_3(self):
+        """
+        The stored race equity matches a fresh simulation, and is only offered before the first roll.
+        """
+        odds = self.book.race_odds(self.game)
+        fresh = RaceSimulator(self.game).simulate(samples=4000, seed=5)
+        self.assertEqual(odds.colors, fresh.colors)
+        for c in range(5):
+            self.assertLess(
+                abs(odds.prob_win[c] - fresh.prob_win[c]),
+                5 * fresh.win_stderr[c],
+            )
+            self.assertLess(
+                abs(odds.prob_lose[c] - fresh.prob_lose[c]),
+                5 * fresh.lose_stderr[c],
+            )
+        self.game.dice["red"] = 1
+        self.assertIsNone(self.book.race_odds(self.game))
+
+    def test_4(self):
+        """
+        Books cover the openings and count the legs of the rules they are built for.
+        """
+        rules = Rules.with_camels(3, track_length=8, faces=(1, 2), start_spaces=2)
+        boards = set(opening_boards(rules))
+        self.assertEqual(len(boards), 4)
+        for _ in range(20):
+            game = GameManager(
+                Player("Alice", rules), Player("Bob", rules), rules=rules
+            )
+            game.init_camels()
+            board, _, _ = canonicalize(encode_board(game.board, game.colors), ())
+            self.assertIn(board, boards)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.bin")
+            self.assertEqual(build_book(path, rules=rules), 4)
+            book = OpeningBook(path)
+        self.assertEqual(
+            (book.num_camels, book.track_length, book.num_faces), (3, 8, 2)
+        )
+        for board in boards:
+            wins, seconds, _ = book.get(board, (0, 1, 2))
+            self.assertEqual(
+                count_leg_outcomes(board, (0, 1, 2), rules.faces, 8), (wins, seconds)
+            )
+
+
+class TestGameState(unittest.TestCase):
+    """
+    Unit test cases for the GameState class.
+    """
+
+    def setUp(self) -> None:
+        random.seed(12)
+        self.game = GameManager(Player("Alice"), Player("Bob"))
+        self.game.init_camels()
+        self.state = GameState.from_game(self.game)
+
+    def random_action(self, state: GameState) -> tuple:
+        action = random.choice(state.legal_actions())
+        if action == ("R",):
+            action = random.choice(state.roll_outcomes())[1]
+        return action
+
+    def test_0(self):
+        """
+        Stepping a GameState follows GameManager.apply through whole games.
+        """
+        for _ in range(20):
+            game = GameManager(Player("Alice"), Player("Bob"))
+            game.init_camels()
+            state = GameState.from_game(game)
+            while not state.over:
+                action = self.random_action(state)
+                game.apply(action)
+                state = state.with_action(action)
+                self.assertEqual(GameState.from_game(game), state)
+            self.assertTrue(game.over)
+
+    def test_1(self):
+        """
+        Actions leave the parent state untouched and share the fields they do not change.
+        """
+        parent = self.state
+        child = parent.with_action(("B", "red"))
+        self.assertEqual(parent, GameState.from_game(self.game))
+        self.assertIs(child.board, parent.board)
+        self.assertIs(child.dice, parent.dice)
+        self.assertEqual(child.bets[0][0], (5,))
+        grandchild = child.with_action(("R", "blue", 2))
+        self.assertIs(grandchild.bets, child.bets)
+        self.assertEqual(
+            len({parent, child, grandchild, child.with_action(("R", "blue", 2))}), 3
+        )
+
+    def test_2(self):
+        """
+        States convert to a GameManager and back without loss, mid-leg and after the race.
+        """
+        state = self.state
+        for _ in range(7):
+            state = state.with_action(self.random_action(state))
+        self.assertEqual(GameState.from_game(state.to_game()), state)
+        while not state.over:
+            state = state.with_action(self.random_action(state))
+        game = state.to_game(("Alice", "Bob"))
+        self.assertTrue(game.over)
+        self.assertEqual(game.player_names, ["Alice", "Bob"])
+        self.assertEqual(GameState.from_game(game), state)
+
+    def test_3(self):
+        """
+        Chance outcomes cover every unrolled die and face, and illegal actions are rejected.
+        """
+        state = self.state.with_action(("R", "green", 1))
+        outcomes = state.roll_outcomes()
+        self.assertEqual(len(outcomes), 12)
+        self.assertAlmostEqual(sum(p for p, _ in outcomes), 1)
+        self.assertNotIn("green", {action[1] for _, action in outcomes})
+        with self.assertRaises(ValueError):
+            state.with_action(("R", "green", 2))
+        with self.assertRaises(ValueError):
+            state.with_action(("R", "red", 4))
+        for _ in range(4):
+            state = state.with_action(("B", "red"))
+        with self.assertRaises(IndexError):
+            state.with_action(("B", "red"))
+
+    def test_4(self):
+        """
+        Bets held are valued at their EV from the leg odds.
+        """
+        self.assertEqual(self.state.expected_payouts(), (0.0, 0.0))
+        odds = EVBot(self.game, LegCache()).evaluate()
+        state = self.state.with_action(("B", "red")).with_action(("B", "blue"))
+        memo = {}
+        payouts = state.expected_payouts(memo)
+        self.assertAlmostEqual(payouts[0], odds["red"].ev)
+        self.assertAlmostEqual(payouts[1], odds["blue"].ev)
+        self.assertGreater(len(memo), 0)
+
+    def test_5(self):
+        """
+        Taking a batch of actions matches taking them one at a time, and rejects random rolls and moves after the race.
+        """
+        for _ in range(20):
+            state, actions = self.state, []
+            while not state.over:
+                actions.append(self.random_action(state))
+                state = state.with_action(actions[-1])
+                if len(actions) % 9 == 0:
+                    self.assertEqual(self.state.with_actions(actions), state)
+            self.assertEqual(self.state.with_actions(actions), state)
+        self.assertIs(self.state.with_actions([]), self.state)
+        with self.assertRaises(ValueError):
+            self.state.with_actions([("R",)])
+        with self.assertRaises(ValueError):
+            self.state.with_actions(actions + [("H",)])
+
+
+class TestGameRNG(unittest.TestCase):
+    """
+    Unit test cases for the GameRNG class.
+    """
+
+    def play(self, seed) -> tuple:
+        game = GameManager(Player("Alice"), Player("Bob"), rng=GameRNG(seed))
+        game.init_camels()
+        while not game.over:
+            game.apply(("R",))
+        return GameState.from_game(game)
+
+    def test_0(self):
+        """
+        A seed reproduces a whole game, and different seeds give different games.
+        """
+        self.assertEqual(self.play(7), self.play(7))
+        self.assertNotEqual(self.play(7), self.play(8))
+
+    def test_1(self):
+        """
+        Child streams are reproducible, distinct, and spawn never hands out the same stream twice.
+        """
+        rng = GameRNG(3)
+        draws = lambda stream: [stream.draw(5) for _ in range(50)]
+        self.assertEqual(draws(rng.child(0)), draws(GameRNG(3).child(0)))
+        first, second = rng.spawn(2)
+        third = rng.spawn(1)[0]
+        self.assertEqual(third.seed, "3/2")
+        self.assertEqual(len({tuple(draws(s)) for s in [first, second, third]}), 3)
+
+    def test_2(self):
+        """
+        Every die and face is equally likely for any number of dice.
+        """
+        rng = GameRNG(5)
+        for num_dice in range(1, 6):
+            counts = {}
+            for _ in range(3000 * num_dice):
+                draw = rng.draw(num_dice)
+                counts[draw] = counts.get(draw, 0) + 1
+            self.assertEqual(set(counts), set(product(range(num_dice), range(3))))
+            for count in counts.values():
+                self.assertLess(abs(count - 1000), 150)
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "requires NumPy")
+class TestBatchGames(unittest.TestCase):
+    """
+    Unit test cases for the BatchGames class.
+    """
+
+    def test_0(self):
+        """
+        New games are dealt like GameManager.init_camels.
+        """
+        from batchengine import BatchGames
+
+        games = BatchGames(500, seed=1)
+        openings = set(opening_boards())
+        for game in range(len(games)):
+            board, _, _ = canonicalize(games.board(game), ())
+            self.assertIn(board, openings)
+
+    def test_1(self):
+        """
+        Every game in a batch plays out exactly like GameState under the same actions and rolls.
+        """
+        import numpy as np
+        from batchengine import BatchGames, ROLL
+
+        def random_bets(games, mask):
+            camel = games.rng.integers(len(games.colors), size=len(games))
+            bet = (games.rng.random(len(games)) < 0.3) & games.legal_bets()[
+                camel, np.arange(len(games))
+            ]
+            return np.where(bet, camel, ROLL)
+
+        games = BatchGames(200, seed=2)
+        states = [
+            GameState(
+                games.colors,
+                games.board(game),
+                (0,) * 5,
+                (0,) * 5,
+                (3, 3),
+                (((),) * 5,) * 2,
+            )
+            for game in range(len(games))
+        ]
+        while not games.over.all():
+            actions, camels, rolls = games.step((random_bets, random_bets))
+            for game, state in enumerate(states):
+                if state.over:
+                    continue
+                if actions[game] == ROLL:
+                    action = ("R", games.colors[camels[game]], int(rolls[game]))
+                else:
+                    action = ("B", games.colors[actions[game]])
+                states[game] = state.with_action(action)
+        for game, state in enumerate(states):
+            self.assertTrue(state.over)
+            self.assertEqual(state.board, games.board(game))
+            self.assertEqual(state.coins, tuple(games.coins[:, game]))
+            self.assertEqual(
+                (state.winner, state.second),
+                (games.winner[game], games.second[game]),
+            )
+
+    def test_2(self):
+        """
+        Batches can start from a position, and betting on good odds beats always rolling.
+        """
+        from batchengine import BatchGames, EVThreshold, always_roll
+
+        random.seed(6)
+        game = GameManager(Player("Alice"), Player("Bob"))
+        game.init_camels()
+        state = GameState.from_game(game).with_action(("B", "red"))
+        games = BatchGames.from_state(state, 300, seed=3)
+        self.assertEqual(games.board(299), state.board)
+        self.assertEqual(games.bet_value[0, 0, 0], 5)
+        self.assertTrue((games.turn == 1).all())
+        coins = games.play((always_roll, EVThreshold()))
+        self.assertTrue(games.over.all())
+        self.assertGreater(coins[1].mean(), coins[0].mean())
+
+
+class TestTicketTents(unittest.TestCase):
+    """
+    Unit test cases for the TicketTents class.
+    """
+
+    def test_0(self):
+        """
+        Taking tickets walks down the stack and the tents read like a dict of lists.
+        """
+        tents = TicketTents(["red", "green"])
+        self.assertEqual(dict(tents), {"red": [5, 3, 2, 2], "green": [5, 3, 2, 2]})
+        self.assertEqual(tents.take("red"), 5)
+        self.assertEqual(tents.top("red"), 3)
+        self.assertEqual(tents.remaining("red"), 3)
+        self.assertEqual(tents, {"red": [3, 2, 2], "green": [5, 3, 2, 2]})
+
+    def test_1(self):
+        """
+        An empty stack cannot be taken from, and reset refills every stack in place.
+        """
+        tents = TicketTents(["red"])
+        for _ in range(4):
+            tents.take("red")
+        self.assertEqual(tents.top("red"), 0)
+        with self.assertRaises(IndexError):
+            tents.take("red")
+        taken = tents.taken
+        tents.reset()
+        self.assertIs(tents.taken, taken)
+        self.assertEqual(tents["red"], [5, 3, 2, 2])
+
+    def test_2(self):
+        """
+        Stacks can be set to what is left after taking from the top, and nothing else.
+        """
+        tents = TicketTents(["red"])
+        tents["red"] = [2]
+        self.assertEqual(tents.remaining("red"), 1)
+        with self.assertRaises(ValueError):
+            tents["red"] = [3, 5]
+
+    def test_3(self):
+        """
+        Legal actions, EV evaluation and state capture read the tents without building ticket lists.
+        """
+        game = GameManager(Player("Alice"), Player("Bob"))
+        game.init_camels()
+        game.apply(("B", "red"))
+        expected = game.legal_actions(), EVBot(game, LegCache()).evaluate()
+        with mock.patch.object(TicketTents, "__getitem__", side_effect=AssertionError):
+            self.assertEqual(game.legal_actions(), expected[0])
+            self.assertEqual(EVBot(game, LegCache()).evaluate(), expected[1])
+            self.assertEqual(GameState.from_game(game).tickets, (1, 0, 0, 0, 0))
+
+
+class TestRules(unittest.TestCase):
+    """
+    Unit test cases for the Rules class.
+    """
+
+    def setUp(self) -> None:
+        self.rules = Rules.with_camels(
+            3, track_length=8, faces=(1, 2), tickets=(4, 1), starting_coins=1
+        )
+
+    def test_0(self):
+        """
+        Rules pick their colors from the palette and reject unplayable parameters.
+        """
+        self.assertEqual(self.rules.colors, ("red", "green", "blue"))
+        self.assertEqual(DEFAULT_RULES.race, (16, (1, 2, 3)))
+        with self.assertRaises(ValueError):
+            Rules(("red", "red"))
+        with self.assertRaises(ValueError):
+            Rules(faces=(0, 1))
+        with self.assertRaises(ValueError):
+            Rules.with_camels(8)
+
+    def test_1(self):
+        """
+        Games under other rules use their track, camels, dice and tickets all the way to the end.
+        """
+        random.seed(3)
+        game = GameManager(
+            Player("Alice", self.rules), Player("Bob", self.rules), rules=self.rules
+        )
+        game.init_camels()
+        self.assertEqual(len(game.board), 8)
+        self.assertEqual(sum(map(len, game.board[:3])), 3)
+        self.assertEqual(game.players[0].coins, 1)
+        self.assertEqual(
+            game.legal_actions()[1:4], [("B", "red"), ("B", "green"), ("B", "blue")]
+        )
+        self.assertEqual(game.apply(("B", "red"))[0].value, 4)
+        with self.assertRaises(ValueError):
+            game.apply(("R", "green", 3))
+        state = GameState.from_game(game)
+        self.assertEqual(
+            (state.track_length, state.faces, state.ticket_values), (8, (1, 2), (4, 1))
+        )
+        self.assertEqual(GameState.from_game(state.to_game()), state)
+        while not game.over:
+            events = game.apply(("R",))
+            self.assertIn(events[0].value, (1, 2))
+        self.assertIn(game.winning_camel.lower(), self.rules.colors)
+
+    def test_2(self):
+        """
+        EVBot counts legs on the rules' track and die, and keeps them apart from standard legs in the cache.
+        """
+        random.seed(5)
+        game = GameManager(
+            Player("Alice", self.rules), Player("Bob", self.rules), rules=self.rules
+        )
+        game.init_camels()
+        bot = EVBot(game, LegCache())
+        wins, seconds, total = bot.leg_outcomes()
+        self.assertEqual(total, 6 * 2**3)
+        board = encode_board(game.board, game.colors)
+        expected = count_leg_outcomes(board, (0, 1, 2), (1, 2), 8)
+        self.assertEqual((wins, seconds), expected)
+        key = next(iter(bot.cache.entries))
+        self.assertEqual(key[2], self.rules.race)
+        bot = EVBot(game, LegCache())
+        wins, seconds, total, exact = bot.estimate_leg_outcomes(max_samples=20, seed=1)
+        self.assertFalse(exact)
+        self.assertEqual(sum(wins), 20)
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    Unit test cases for the binary snapshot format.
+    """
+
+    def play(self, seed: int, turns: int) -> GameManager:
+        random.seed(seed)
+        game = GameManager(Player("Alice"), Player("Bob"))
+        game.init_camels()
+        for _ in range(turns):
+            if game.over:
+                break
+            game.apply(random.choice(game.legal_actions()))
+        return game
+
+    def test_0(self):
+        """
+        Games round-trip through fixed-size records at every stage, including after the race is over.
+        """
+        size = record_struct(5).size
+        for seed in range(30):
+            game = self.play(seed, seed * 4)
+            data = game.to_bytes()
+            self.assertEqual(len(data), size)
+            copy = GameManager.from_bytes(data, names=("Alice", "Bob"))
+            self.assertEqual(GameState.from_game(copy), GameState.from_game(game))
+            self.assertEqual(copy.player_names, game.player_names)
+        game = self.play(0, 1000)
+        self.assertTrue(GameManager.from_bytes(game.to_bytes()).over)
+
+    def test_1(self):
+        """
+        Split bets on the same camel keep which player holds which ticket.
+        """
+        game = self.play(4, 0)
+        for action in [("B", "red"), ("B", "red"), ("B", "red")]:
+            game.apply(action)
+        copy = GameManager.from_bytes(game.to_bytes())
+        self.assertEqual(copy.players[0].cards["red"], [5, 2])
+        self.assertEqual(copy.players[1].cards["red"], [3])
+        self.assertEqual(copy.cards["red"], [2])
+        self.assertIs(copy.current_player, copy.players[1])
+
+    def test_2(self):
+        """
+        Snapshot files are mapped and indexed by record, and refuse to open under other rules.
+        """
+        games = [self.play(seed, 10) for seed in range(5)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.bin")
+            self.assertEqual(write_snapshots(path, games), 5)
+            snapshots = Snapshots(path)
+            self.assertEqual(len(snapshots), 5)
+            self.assertEqual(snapshots.record(-1), games[4].to_bytes())
+            self.assertEqual(
+                GameState.from_game(snapshots[2]), GameState.from_game(games[2])
+            )
+            with self.assertRaises(IndexError):
+                snapshots[5]
+            snapshots.close()
+            with self.assertRaises(ValueError):
+                Snapshots(path, Rules.with_camels(4))
+
+
+class TestEventLog(unittest.TestCase):
+    """
+    Unit test cases for the EventLog and EventArchive classes.
+    """
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "games.log")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def log_games(self, seeds) -> list[GameManager]:
+        games = []
+        with EventLog(self.path) as log:
+            for seed in seeds:
+                random.seed(seed)
+                game = GameManager(Player("Alice"), Player("Bob"))
+                game.init_camels()
+                log.start(game)
+                while not game.over:
+                    log.record(game, game.apply(random.choice(game.legal_actions())))
+                games.append(game)
+        return games
+
+    def test_0(self):
+        """
+        Archived games replay to their final state and reproduce the logged events through GameManager.
+        """
+        games = self.log_games(range(3))
+        archive = EventArchive(self.path)
+        self.assertEqual(len(archive), 3)
+        for i, game in enumerate(games):
+            self.assertEqual(archive.replay(i), GameState.from_game(game))
+            self.assertEqual(archive.events(i)[-1].kind, "game_end")
+            reproduced = archive.reproduce(i)
+            self.assertEqual(GameState.from_game(reproduced), GameState.from_game(game))
+        archive.close()
+
+    def test_1(self):
+        """
+        Seeking from the checkpoints gives the same state as stepping every action from the opening.
+        """
+        self.log_games([7])
+        archive = EventArchive(self.path)
+        self.assertGreater(len(archive.checkpoints[0][0]), 1)
+        state = archive.replay(0, 0)
+        for turn, action in enumerate(archive.actions(0), 1):
+            state = state.with_action(action)
+            self.assertEqual(archive.replay(0, turn), state)
+        self.assertEqual(turn, archive.lengths[0])
+        with self.assertRaises(IndexError):
+            archive.replay(0, turn + 1)
+        archive.close()
+
+    def test_2(self):
+        """
+        Logs are appended to across sessions and refuse other rules.
+        """
+        self.log_games([1])
+        self.log_games([2, 3])
+        archive = EventArchive(self.path)
+        self.assertEqual(len(archive), 3)
+        archive.close()
+        with self.assertRaises(ValueError):
+            EventLog(self.path, Rules.with_camels(4))
+        with self.assertRaises(ValueError):
+            EventArchive(self.path, Rules(track_length=20))
+
+
+class TestAgents(unittest.TestCase):
+    """
+    Unit test cases for the agents.
+    """
+
+    def setUp(self) -> None:
+        random.seed(8)
+        self.game = GameManager(Player("Alice"), Player("Bob"))
+        self.game.init_camels()
+
+    def runaway(self) -> GameManager:
+        """
+        Red is far ahead with only the green die left to roll, so a red bet is nearly a sure 5 coins.
+        """
+        self.game.board = [[] for _ in range(16)]
+        self.game.board[0] = ["green", "blue", "yellow", "purple"]
+        self.game.board[10] = ["red"]
+        self.game.dice = {"red": 1, "green": 0, "blue": 2, "yellow": 3, "purple": 1}
+        return self.game
+
+    def test_0(self):
+        """
+        The simple agents choose legal actions, and EVAgent follows EVBot.
+        """
+        for agent in [RandomAgent(seed=1), EVAgent(LegCache())]:
+            for _ in range(10):
+                action = agent.choose(self.game)
+                self.assertIn(action, self.game.legal_actions())
+                self.assertNotEqual(action, ("H",))
+                self.game.apply(action)
+        self.assertEqual(EVAgent(LegCache()).choose(self.runaway()), ("B", "red"))
+
+    def test_1(self):
+        """
+        Expectimax takes the sure bet and values it from the leg counts.
+        """
+        agent = ExpectimaxAgent(time_limit=10, max_depth=1)
+        self.assertEqual(agent.choose(self.runaway()), ("B", "red"))
+        state = GameState.from_game(self.game).with_action(("B", "red"))
+        self.assertAlmostEqual(agent.evaluate(state), 5)
+        self.assertEqual(agent.depths, [1])
+
+    def test_2(self):
+        """
+        Repeated searches hit the bounded transposition table, and a time limit stops deepening.
+        """
+        agent = ExpectimaxAgent(table_size=50)
+        state = GameState.from_game(self.game)
+        value, action = agent.search(state, 2)
+        self.assertEqual(agent.search(state, 2), (value, action))
+        stats = agent.stats()
+        self.assertGreater(stats["hits"], 0)
+        self.assertLessEqual(stats["table_size"], 50)
+        agent = ExpectimaxAgent(time_limit=0.05)
+        self.assertIn(agent.choose(self.game), self.game.legal_actions())
+        self.assertLess(agent.depths[0], agent.max_depth)
+        self.assertGreater(agent.stats()["nodes_per_second"], 0)
+
+    def test_3(self):
+        """
+        The transposition table keys positions on their changing fields, and the search never buys a hint.
+        """
+        state = GameState.from_game(self.game)
+        table = TranspositionTable(8)
+        key = table.key(state)
+        self.assertEqual(key, table.key(GameState.from_game(self.game)))
+        self.assertNotEqual(key, table.key(state.with_action(("R",))))
+        table.put(key, (1, 2.0, ("R",)))
+        self.assertEqual(table.get(key), (1, 2.0, ("R",)))
+        self.assertIsNone(table.get(key + 8))
+        self.assertEqual(len(table), 1)
+        agent = ExpectimaxAgent(time_limit=10, max_depth=2)
+        for _ in range(3):
+            action = agent.choose(self.game)
+            self.assertNotEqual(action, ("H",))
+            self.game.apply(action)
+
+    def test_4(self):
+        """
+        Agents drop their leg counts when the track or die changes, so every count they keep fits the new rules.
+        """
+        rules = Rules(track_length=8, faces=(1, 2))
+        for agent in [
+            EVAgent(LegCache(), two_ply=True),
+            ExpectimaxAgent(time_limit=10, max_depth=1),
+            MCTSAgent(time_limit=None, iterations=30, seed=1),
+        ]:
+            agent.choose(self.game)
+            game = GameManager(
+                Player("Alice", rules), Player("Bob", rules), rules=rules
+            )
+            game.init_camels()
+            agent.choose(game)
+            self.assertGreater(len(agent.memo), 0)
+            for (board, dice), counts in agent.memo.items():
+                if len(dice) <= 2:
+                    wins, seconds = count_leg_outcomes(board, dice, rules.faces, 8)
+                    self.assertEqual((list(wins), list(seconds)), tuple(counts))
+
+
+class TestTournament(unittest.TestCase):
+    """
+    Unit test cases for the tournament runner.
+    """
+
+    def test_0(self):
+        """
+        Both games of a pair start from the same camels and replay exactly from the seed.
+        """
+        first = play_match(("random", "roll"), 5, 3, False)
+        again = play_match(("random", "roll"), 5, 3, False)
+        self.assertEqual(
+            (first.pair, first.swapped, first.margin, first.turns),
+            (again.pair, again.swapped, again.margin, again.turns),
+        )
+        swapped = play_match(("roll", "roll"), 5, 3, True)
+        straight = play_match(("roll", "roll"), 5, 3, False)
+        self.assertEqual(swapped.margin, -straight.margin)
+        self.assertEqual(swapped.turns, straight.turns)
+
+    def test_1(self):
+        """
+        Statistics stream in with Welford means, and only unfinished pairs are kept.
+        """
+        mean = RunningMean()
+        for value in [2, 4, 4, 4, 5, 5, 7, 9]:
+            mean.add(value)
+        self.assertAlmostEqual(mean.mean, 5)
+        self.assertAlmostEqual(mean.stderr(), (32 / 7 / 8) ** 0.5)
+        stats = TournamentStats(("a", "b"))
+        for result in [
+            GameResult(0, False, 4, 30, 0.1),
+            GameResult(1, False, 0, 30, 0.1),
+            GameResult(0, True, -2, 30, 0.1),
+        ]:
+            stats.add(result)
+        self.assertEqual(stats.games, 3)
+        self.assertAlmostEqual(stats.score.mean, 0.5)
+        self.assertEqual(stats.open_pairs, {1: 0})
+        self.assertEqual(stats.paired_margin.count, 1)
+        self.assertAlmostEqual(stats.paired_margin.mean, 1)
+        self.assertIn("3 games", stats.report(1.0, 1))
+
+    def test_2(self):
+        """
+        A tournament gives the same results on worker processes as in this one.
+        """
+        progress = []
+        here = run_tournament(("random", "roll"), 12, seed=2, progress=progress.append)
+        self.assertEqual(here.games, 12)
+        self.assertEqual(len(progress), 12)
+        self.assertEqual(here.open_pairs, {})
+        with ParallelEngine(2) as parallel:
+            there = run_tournament(("random", "roll"), 12, seed=2, parallel=parallel)
+        for field in ["score", "margin", "paired_margin"]:
+            self.assertAlmostEqual(
+                getattr(here, field).mean, getattr(there, field).mean
+            )
+        self.assertEqual(here.turns, there.turns)
+
+
+class TestMCTSAgent(unittest.TestCase):
+    """
+    Unit test cases for the MCTS agent.
+    """
+
+    def setUp(self) -> None:
+        random.seed(8)
+        self.game = GameManager(Player("Alice"), Player("Bob"))
+        self.game.init_camels()
+
+    def test_0(self):
+        """
+        A fixed iteration budget is spent exactly, and the near-sure bet is found.
+        """
+        agent = MCTSAgent(time_limit=None, iterations=200, seed=1)
+        self.assertIn(agent.choose(self.game), self.game.legal_actions())
+        stats = agent.stats()
+        self.assertEqual(stats["iterations"], 200)
+        self.assertGreater(stats["tree_size"], 0)
+        self.assertGreater(stats["tree_bytes"], 0)
+        self.game.board = [[] for _ in range(16)]
+        self.game.board[0] = ["green", "blue", "yellow", "purple"]
+        self.game.board[10] = ["red"]
+        self.game.dice = {"red": 1, "green": 0, "blue": 2, "yellow": 3, "purple": 1}
+        evs = bet_evs(GameState.from_game(self.game), {})
+        self.assertAlmostEqual(evs[0], 5)
+        agent = MCTSAgent(time_limit=None, iterations=300, seed=1, rollout="random")
+        self.assertEqual(agent.choose(self.game), ("B", "red"))
+
+    def test_1(self):
+        """
+        The subtree of the position actually reached is kept for the next move.
+        """
+        agent = MCTSAgent(time_limit=None, iterations=500, seed=2)
+        self.game.apply(agent.choose(self.game))
+        node = agent.root
+        while isinstance(node, ChanceNode) or node.state.turn == 1:
+            action = next(iter(node.children))
+            node = node.children[action]
+            if action != ("R",):
+                self.game.apply(action)
+        visits = node.visits
+        agent.choose(self.game)
+        stats = agent.stats()
+        self.assertEqual(stats["reuse_ratio"], 0.5)
+        self.assertEqual(stats["inherited_visits"], visits)
+        self.assertIsNone(
+            agent.find(GameState.from_game(GameManager(Player("A"), Player("B"))))
+        )
+
+    def test_2(self):
+        """
+        Both rollout policies play to the end, a time limit bounds the move, and bad settings are rejected.
+        """
+        state = GameState.from_game(self.game)
+        for rollout in ["random", "ev"]:
+            agent = MCTSAgent(time_limit=None, iterations=1, seed=3, rollout=rollout)
+            self.assertIn(agent.rollout(state), (0.0, 1.0))
+        agent = make_agent("mcts", 0.05, seed=4)
+        self.assertIsInstance(agent, MCTSAgent)
+        self.assertIn(agent.choose(self.game), self.game.legal_actions())
+        self.assertGreater(agent.stats()["iterations_per_second"], 0)
+        with self.assertRaises(ValueError):
+            MCTSAgent(time_limit=None)
+        with self.assertRaises(ValueError):
+            MCTSAgent(rollout="greedy")
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "requires NumPy")
+class TestSelfPlay(unittest.TestCase):
+    """
+    Unit test cases for the self-play dataset.
+    """
+
+    def test_0(self):
+        """
+        Records replay from the seed, and carry their leg and the final margin of the player who acted.
+        """
+        from selfplay import play_records, feature_names
+
+        records = list(play_records(("random", "roll"), 3, seed=4))
+        self.assertEqual(records, list(play_records(("random", "roll"), 3, seed=4)))
+        self.assertEqual(
+            len(records[0].features), len(feature_names(DEFAULT_RULES.colors))
+        )
+        for record in records:
+            turn = record.features[-1]
+            final = [r for r in records if r.game == record.game][-1]
+            sign = 1 if turn == final.features[-1] else -1
+            self.assertEqual(record.result, sign * final.result)
+            self.assertIn(record.leg_winner, range(5))
+        self.assertEqual(sorted({record.game for record in records}), [0, 1, 2])
+
+    def test_1(self):
+        """
+        Chunked columns read back through memory maps exactly as written.
+        """
+        import numpy as np
+        from selfplay import SelfPlayDataset, play_records, write_dataset
+
+        records = list(play_records(("random", "random"), 2, seed=1))
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(
+                write_dataset(directory, iter(records), chunk_size=16), len(records)
+            )
+            dataset = SelfPlayDataset(directory)
+            self.assertEqual(len(dataset), len(records))
+            self.assertEqual([dataset[i] for i in range(len(dataset))], records)
+            self.assertEqual(dataset[-1], records[-1])
+            chunks = list(dataset.chunks())
+            self.assertEqual(len(chunks), (len(records) + 15) // 16)
+            self.assertIsInstance(chunks[0]["features"], np.memmap)
+            with self.assertRaises(IndexError):
+                dataset[len(records)]
+            os.remove(os.path.join(directory, "action-00000.npy"))
+            with self.assertRaises(ValueError):
+                SelfPlayDataset(directory)
+
+    def test_2(self):
+        """
+        Actions are encoded as small integers.
+        """
+        from selfplay import HINT, encode_action, feature_names
+
+        colors = DEFAULT_RULES.colors
+        self.assertEqual(encode_action(("R",), colors), 0)
+        self.assertEqual(encode_action(("R", "blue", 2), colors), 0)
+        self.assertEqual(encode_action(("B", colors[2]), colors), 3)
+        self.assertEqual(encode_action(("H",), colors), HINT)
+        self.assertEqual(
+            feature_names(colors)[:2], [f"{colors[0]}_space", f"{colors[0]}_height"]
+        )
 
 
 class TestGameManager(unittest.TestCase):
@@ -529,6 +1959,193 @@ class TestGameManager(unittest.TestCase):
         )
         self.assertEqual(self.game_manager.current_player, expected_player)
 
+    # Test the headless GameManager.legal_actions and GameManager.apply
+    def test_19(self):
+        """
+        A fresh game offers a roll, a bet on every camel and a hint.
+        """
+        self.assertEqual(
+            self.game_manager.legal_actions(),
+            [("R",)] + [("B", color) for color in self.game_manager.colors] + [("H",)],
+        )
+        self.game_manager.cards["red"] = []
+        self.game_manager.current_player.coins = 0
+        self.assertNotIn(("B", "red"), self.game_manager.legal_actions())
+        self.assertNotIn(("H",), self.game_manager.legal_actions())
+
+    def test_20(self):
+        """
+        Bets and rolls pass the turn and report what happened; hints keep it.
+        """
+        self.game_manager.board[0].extend(["red", "green"])
+        events = self.game_manager.apply(("B", "blue"))
+        self.assertEqual(
+            [(e.kind, e.player, e.color, e.value) for e in events],
+            [("bet", 0, "blue", 5)],
+        )
+        self.assertEqual(self.game_manager.turn, 1)
+        events = self.game_manager.apply(("R", "red", 2))
+        self.assertEqual(
+            [(e.kind, e.player, e.color, e.value) for e in events],
+            [("roll", 1, "red", 2)],
+        )
+        self.assertEqual(self.game_manager.board[2], ["red", "green"])
+        self.assertEqual(self.game_manager.players[1].coins, 4)
+        self.assertEqual(self.game_manager.turn, 0)
+        events = self.game_manager.apply(("H",))
+        self.assertEqual([(e.kind, e.player) for e in events], [("hint", 0)])
+        self.assertEqual(self.game_manager.turn, 0)
+        self.assertEqual(self.game_manager.players[0].coins, 2)
+
+    def test_21(self):
+        """
+        Rolling the last die scores and resets the leg, and the other player starts the next one.
+        """
+        self.game_manager.board[0].extend(["red", "green", "blue"])
+        self.game_manager.board[1].extend(["yellow", "purple"])
+        self.game_manager.dice.update(red=1, green=1, blue=1, yellow=1)
+        self.game_manager.players[0].cards["purple"] = [5]
+        self.game_manager.players[1].cards["red"] = [5]
+        events = self.game_manager.apply(("R", "purple", 3))
+        self.assertEqual([e.kind for e in events], ["roll", "leg_end"])
+        self.assertEqual((events[1].color, events[1].second), ("purple", "yellow"))
+        self.assertEqual(events[1].coins, (9, 2))
+        self.assertEqual(self.game_manager.turn, 1)
+        self.assertTrue(all(roll == 0 for roll in self.game_manager.dice.values()))
+        self.assertEqual(self.game_manager.players[0].cards["purple"], [])
+
+    def test_22(self):
+        """
+        Crossing the finish line scores the final leg's bets and ends the game.
+        """
+        self.game_manager.board[14].extend(["red", "green"])
+        self.game_manager.players[1].cards["green"] = [5, 3]
+        self.game_manager.players[1].cards["red"] = [2]
+        events = self.game_manager.apply(("R", "red", 3))
+        self.assertEqual([e.kind for e in events], ["roll", "leg_end", "game_end"])
+        self.assertEqual((events[2].color, events[2].second), ("green", "red"))
+        self.assertEqual(events[2].coins, (4, 12))
+        self.assertEqual(events[2].value, 1)
+        self.assertEqual(self.game_manager.legal_actions(), [])
+        with self.assertRaises(ValueError):
+            self.game_manager.apply(("R",))
+
+    def test_23(self):
+        """
+        Illegal actions are rejected without changing the game, and random play always finishes.
+        """
+        self.game_manager.board[0].append("red")
+        self.game_manager.dice["red"] = 2
+        for action in [("R", "red", 1), ("R", "green", 4), ("B", "pink"), ("X",)]:
+            with self.assertRaises(ValueError):
+                self.game_manager.apply(action)
+        self.assertEqual(self.game_manager.turn, 0)
+        random.seed(3)
+        game = GameManager(Player("Alice"), Player("Bob"))
+        game.init_camels()
+        while not game.over:
+            game.apply(random.choice(game.legal_actions()))
+        self.assertIn(game.winning_camel.lower(), game.colors)
+
+    # Test the GameManager camel position index
+    def test_24(self):
+        """
+        The index and leader pointer stay in sync with the board through whole games.
+        """
+        random.seed(4)
+        for _ in range(20):
+            game = GameManager(Player("Alice"), Player("Bob"), debug=True)
+            game.init_camels()
+            while not game.over:
+                game.apply(("R",))
+                for camel, (space, height) in game.positions.items():
+                    self.assertEqual(game.board[space][height], camel)
+
+    def test_25(self):
+        """
+        Direct edits to the board are picked up when the edited camels are moved or the board is replaced.
+        """
+        self.game_manager.debug = True
+        self.game_manager.board[4].extend(["red", "green"])
+        self.game_manager.move_camels("green", 2)
+        self.assertEqual(self.game_manager.locate("green"), (6, 0))
+        self.assertEqual(self.game_manager.locate("red"), (4, 0))
+        self.assertEqual(self.game_manager.leader, 6)
+        self.game_manager.board = [[] for _ in range(16)]
+        self.game_manager.board[1].append("blue")
+        self.game_manager.calculate_leg_winners()
+        self.assertEqual(self.game_manager.winning_camel, "blue")
+        self.assertIsNone(self.game_manager.locate("red"))
+
+    def test_26(self):
+        """
+        The consistency check reports edits that were made without reindexing.
+        """
+        self.game_manager.board[2].append("red")
+        self.game_manager.reindex()
+        self.game_manager.check_index()
+        self.game_manager.board[9].append("green")
+        with self.assertRaises(RuntimeError):
+            self.game_manager.check_index()
+
+    def test_27(self):
+        """
+        Resetting a leg reuses the ticket tents, dice and bet lists instead of rebuilding them.
+        """
+        self.game_manager.init_camels()
+        cards, dice = self.game_manager.cards, self.game_manager.dice
+        self.game_manager.apply(("B", "red"))
+        bets = self.game_manager.players[0].cards["red"]
+        self.assertEqual(bets, [5])
+        self.game_manager.leg_reset()
+        self.assertIs(self.game_manager.cards, cards)
+        self.assertIs(self.game_manager.dice, dice)
+        self.assertIs(self.game_manager.players[0].cards["red"], bets)
+        self.assertEqual(bets, [])
+        self.assertEqual(self.game_manager.cards["red"], [5, 3, 2, 2])
+        with self.assertRaises(AttributeError):
+            self.game_manager.players[0].bets = []
+
+    def test_28(self):
+        """
+        In-place board edits are picked up without reindexing, and a leg without a second camel has none, as in
+        compactboard.leaders.
+        """
+        game = self.game_manager
+
+        def expected() -> tuple[str, str]:
+            winner, second = leaders(encode_board(game.board, game.colors))
+            return tuple(game.colors[c] if c >= 0 else "" for c in (winner, second))
+
+        game.board[2].extend(["red", "yellow"])
+        game.calculate_leg_winners()
+        self.assertEqual((game.winning_camel, game.second_camel), ("yellow", ""))
+        game.board[5].append("blue")
+        game.calculate_leg_winners()
+        self.assertEqual(game.leader, 5)
+        self.assertEqual((game.winning_camel, game.second_camel), ("blue", "yellow"))
+        game.board[2].clear()
+        game.calculate_leg_winners()
+        self.assertEqual((game.winning_camel, game.second_camel), ("blue", ""))
+        self.assertEqual((game.winning_camel, game.second_camel), expected())
+
+    def test_29(self):
+        """
+        move_camels picks up in-place board edits before moving, so the leaders match a fresh scan.
+        """
+        game = self.game_manager
+        game.board[1].extend(["red", "yellow"])
+        game.board[3].extend(["green", "blue"])
+        game.reindex()
+        game.board[1].remove("yellow")
+        game.board[12].append("yellow")
+        game.move_camels("red", 1)
+        self.assertEqual(game.board[2], ["red"])
+        self.assertEqual((game.winning_camel, game.second_camel), ("yellow", "blue"))
+        moved = (game.winning_camel, game.second_camel)
+        game.calculate_leg_winners()
+        self.assertEqual((game.winning_camel, game.second_camel), moved)
+
 
 if __name__ == "__main__":
     unittest.main()